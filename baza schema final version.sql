@@ -14,7 +14,7 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(255) UNIQUE NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
     role VARCHAR(50) DEFAULT 'customer' CHECK (role IN ('customer', 'admin', 'manager')),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     last_login TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
 );
@@ -51,8 +51,13 @@ CREATE TABLE IF NOT EXISTS products (
     sku VARCHAR(100) UNIQUE NOT NULL,
     weight DECIMAL(8,2) DEFAULT 0,
     is_active BOOLEAN DEFAULT TRUE,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Поисковый вектор: название важнее описания (веса A и B)
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED
 );
 
 -- Таблица атрибутов товаров
@@ -98,7 +103,7 @@ CREATE TABLE IF NOT EXISTS addresses (
 CREATE TABLE IF NOT EXISTS orders (
     order_id SERIAL PRIMARY KEY,
     customer_id INTEGER NOT NULL REFERENCES customers(customer_id),
-    order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    order_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     status VARCHAR(50) DEFAULT 'pending' CHECK (status IN ('pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled', 'refunded')),
     total_amount DECIMAL(10,2) NOT NULL CHECK (total_amount >= 0),
     shipping_address_id INTEGER NOT NULL REFERENCES addresses(address_id),
@@ -149,28 +154,125 @@ CREATE TABLE IF NOT EXISTS product_images (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Счётчики для дашборда, поддерживаются триггерами
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name VARCHAR(50) PRIMARY KEY,
+    value DECIMAL(14,2) NOT NULL DEFAULT 0
+);
+
+-- Выручка по дням (без отменённых заказов), поддерживается триггером
+CREATE TABLE IF NOT EXISTS daily_revenue (
+    day DATE PRIMARY KEY,
+    orders_count INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0
+);
+
+-- Изменения счётчиков и выручки по дням. Триггеры только добавляют сюда
+-- строки, поэтому параллельные заказы не ждут друг друга на блокировке одной
+-- строки stats_counters или daily_revenue. fold_stats_deltas переносит
+-- изменения в основные таблицы (из refresh_sales_reports и, когда их много,
+-- из fold_stats_deltas_if_needed), при чтении они прибавляются к ним
+CREATE TABLE IF NOT EXISTS stats_counter_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    name VARCHAR(50) NOT NULL,
+    value DECIMAL(14,2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS daily_revenue_deltas (
+    delta_id BIGSERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    orders_count INTEGER NOT NULL,
+    revenue DECIMAL(14,2) NOT NULL
+);
 
+-- Начальные значения по уже имеющимся данным
+INSERT INTO stats_counters (name, value) VALUES
+('total_users', (SELECT COUNT(*) FROM users)),
+('active_products', (SELECT COUNT(*) FROM products WHERE is_active = TRUE)),
+('total_orders', (SELECT COUNT(*) FROM orders)),
+('total_revenue', (SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE status != 'cancelled'))
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO daily_revenue (day, orders_count, revenue)
+SELECT DATE(order_date), COUNT(*), SUM(total_amount)
+FROM orders
+WHERE status != 'cancelled'
+GROUP BY DATE(order_date)
+ON CONFLICT (day) DO NOTHING;
+
+-- Удалённые товары: по ним локальные снимки каталога убирают строки
+CREATE TABLE IF NOT EXISTS deleted_products (
+    product_id INTEGER PRIMARY KEY,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Корзины клиентов: сохраняются между запусками приложения.
+-- price - цена на момент добавления, перед оформлением она сверяется с products
+CREATE TABLE IF NOT EXISTS carts (
+    customer_id INTEGER NOT NULL REFERENCES customers(customer_id) ON DELETE CASCADE,
+    product_id INTEGER NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    price DECIMAL(10,2) NOT NULL CHECK (price >= 0),
+    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (customer_id, product_id)
+);
+
+
+
+-- Ключи постраничного вывода (created_at, id) < (?, ?) не могут быть NULL:
+-- сравнение с NULL не истинно, и такие строки выпадали бы из страниц.
+-- Для баз, созданных до NOT NULL в CREATE TABLE
+UPDATE users SET created_at = 'epoch' WHERE created_at IS NULL;
+ALTER TABLE users ALTER COLUMN created_at SET NOT NULL;
+UPDATE products SET created_at = COALESCE(updated_at, 'epoch') WHERE created_at IS NULL;
+ALTER TABLE products ALTER COLUMN created_at SET NOT NULL;
+UPDATE orders SET order_date = COALESCE(updated_at, 'epoch') WHERE order_date IS NULL;
+ALTER TABLE orders ALTER COLUMN order_date SET NOT NULL;
+
+-- Поисковый вектор для баз, созданных до его появления в CREATE TABLE
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+) STORED;
 
 -- ОПТИМИЗИРОВАННЫЕ ИНДЕКСЫ
 
--- 1. ПОЛЬЗОВАТЕЛИ (2 индекса)
+-- 1. ПОЛЬЗОВАТЕЛИ (3 индекса)
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_customers_user_id ON customers(user_id);
+-- Постраничный вывод в админке: (created_at, user_id) < (?, ?)
+CREATE INDEX IF NOT EXISTS idx_users_keyset ON users(created_at DESC, user_id DESC);
 
--- 2. ТОВАРЫ (4 индекса)
+-- 2. ТОВАРЫ (9 индексов)
 CREATE INDEX IF NOT EXISTS idx_products_category_active ON products(category_id, is_active);
 CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
 CREATE INDEX IF NOT EXISTS idx_products_sku ON products(sku);
-CREATE INDEX IF NOT EXISTS idx_products_name_search ON products USING gin(to_tsvector('russian', name));
+-- Полнотекстовый поиск по названию и описанию (search_vector); прежний индекс
+-- только по названию им заменён
+DROP INDEX IF EXISTS idx_products_name_search;
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING gin(search_vector);
+-- Триграммы: поиск с опечатками и по части SKU
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING gin(name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_sku_trgm ON products USING gin(sku gin_trgm_ops);
+-- Постраничный вывод каталога: (created_at, product_id) < (?, ?)
+CREATE INDEX IF NOT EXISTS idx_products_keyset ON products(created_at DESC, product_id DESC);
+CREATE INDEX IF NOT EXISTS idx_products_category_keyset ON products(category_id, created_at DESC, product_id DESC)
+    WHERE is_active = TRUE;
+-- Синхронизация снимка каталога: изменения после метки updated_at
+CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);
+CREATE INDEX IF NOT EXISTS idx_deleted_products_deleted_at ON deleted_products(deleted_at);
 
 -- 3. СКЛАД (2 индекса)
 CREATE INDEX IF NOT EXISTS idx_inventory_product_id ON inventory(product_id);
 CREATE INDEX IF NOT EXISTS idx_inventory_low_stock ON inventory(quantity) WHERE quantity < low_stock_threshold;
+CREATE INDEX IF NOT EXISTS idx_inventory_last_updated ON inventory(last_updated);
 
--- 4. ЗАКАЗЫ (3 индекса)
+-- 4. ЗАКАЗЫ (4 индекса)
 CREATE INDEX IF NOT EXISTS idx_orders_customer_date ON orders(customer_id, order_date);
 CREATE INDEX IF NOT EXISTS idx_orders_status_date ON orders(status, order_date);
 CREATE INDEX IF NOT EXISTS idx_orders_payment_status ON orders(payment_status);
+-- Постраничный вывод заказов: (order_date, order_id) < (?, ?)
+CREATE INDEX IF NOT EXISTS idx_orders_keyset ON orders(order_date DESC, order_id DESC);
 
 -- 5. ПОЗИЦИИ ЗАКАЗА (2 индекса)
 CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
@@ -183,6 +285,9 @@ CREATE INDEX IF NOT EXISTS idx_reviews_product_id ON reviews(product_id);
 CREATE INDEX IF NOT EXISTS idx_product_images_product_id ON product_images(product_id);
 CREATE INDEX IF NOT EXISTS idx_product_images_primary ON product_images(product_id, is_primary);
 
+-- Корзины: удаление товара каскадно чистит строки корзин
+CREATE INDEX IF NOT EXISTS idx_carts_product_id ON carts(product_id);
+
 -- ФУНКЦИИ И ТРИГГЕРЫ
 
 -- Функция для обновления поля updated_at
@@ -194,6 +299,61 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Функция для обновления поля last_updated складских остатков
+CREATE OR REPLACE FUNCTION update_last_updated_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.last_updated = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Смена изображения меняет товар для снимков каталога
+CREATE OR REPLACE FUNCTION touch_product_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE products SET updated_at = CURRENT_TIMESTAMP
+    WHERE product_id = COALESCE(NEW.product_id, OLD.product_id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Функция для учёта удалённых товаров
+CREATE OR REPLACE FUNCTION log_product_deletion()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO deleted_products (product_id) VALUES (OLD.product_id)
+    ON CONFLICT (product_id) DO UPDATE SET deleted_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Уведомление клиентов об изменённых товарах (канал product_changes).
+-- Полезная нагрузка - id через запятую; если товаров больше 500,
+-- отправляется «*» (обновить всё), чтобы не упереться в лимит 8000 байт
+CREATE OR REPLACE FUNCTION notify_product_changes()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT product_id) INTO changed_ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT product_id) INTO changed_ids FROM new_rows;
+    END IF;
+
+    IF changed_ids IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF cardinality(changed_ids) > 500 THEN
+        PERFORM pg_notify('product_changes', '*');
+    ELSE
+        PERFORM pg_notify('product_changes', array_to_string(changed_ids, ','));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Функция для создания записи в inventory
 CREATE OR REPLACE FUNCTION create_inventory_record()
 RETURNS TRIGGER AS $$
@@ -216,6 +376,216 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Функция оформления заказа одним вызовом
+-- p_items: [{"product_id": 1, "quantity": 2, "price": 100.00}, ...]
+-- Если адрес не передан, берётся адрес клиента или создаётся адрес по умолчанию.
+-- Строки склада блокируются в порядке product_id, поэтому встречные заказы
+-- не взаимоблокируются. Если какого-то товара не хватает, заказ не создаётся:
+-- ошибка с SQLSTATE 'ST001', в DETAIL - JSON-массив
+-- [{"product_id", "name", "requested", "available"}, ...]
+CREATE OR REPLACE FUNCTION place_order(
+    p_customer_id INTEGER,
+    p_address_id INTEGER,
+    p_payment_method VARCHAR,
+    p_items JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_address_id INTEGER := p_address_id;
+    v_order_id INTEGER;
+    v_shortages JSONB;
+BEGIN
+    PERFORM 1
+    FROM inventory
+    WHERE product_id IN (
+        SELECT r.product_id
+        FROM jsonb_to_recordset(p_items) AS r(product_id INTEGER)
+    )
+    ORDER BY product_id
+    FOR UPDATE;
+
+    SELECT jsonb_agg(jsonb_build_object(
+               'product_id', r.product_id,
+               'name', p.name,
+               'requested', r.quantity,
+               'available', COALESCE(inv.quantity - inv.reserved_quantity, 0)
+           ) ORDER BY r.product_id)
+    INTO v_shortages
+    FROM (
+        SELECT product_id, SUM(quantity) AS quantity
+        FROM jsonb_to_recordset(p_items) AS r(product_id INTEGER, quantity INTEGER)
+        GROUP BY product_id
+    ) AS r
+    LEFT JOIN inventory inv ON inv.product_id = r.product_id
+    LEFT JOIN products p ON p.product_id = r.product_id
+    WHERE COALESCE(inv.quantity - inv.reserved_quantity, 0) < r.quantity;
+
+    IF v_shortages IS NOT NULL THEN
+        RAISE EXCEPTION 'insufficient stock'
+            USING ERRCODE = 'ST001', DETAIL = v_shortages::TEXT;
+    END IF;
+
+    IF v_address_id IS NULL THEN
+        SELECT address_id INTO v_address_id
+        FROM addresses
+        WHERE customer_id = p_customer_id
+        ORDER BY is_default DESC, address_id
+        LIMIT 1;
+    END IF;
+
+    IF v_address_id IS NULL THEN
+        INSERT INTO addresses (customer_id, address_type, street, city, postal_code, country)
+        VALUES (p_customer_id, 'home', 'ул. Примерная, д. 1', 'Москва', '101000', 'Russia')
+        RETURNING address_id INTO v_address_id;
+    END IF;
+
+    INSERT INTO orders (customer_id, total_amount, shipping_address_id, payment_method)
+    VALUES (p_customer_id, 0, v_address_id, p_payment_method)
+    RETURNING order_id INTO v_order_id;
+
+    INSERT INTO order_items (order_id, product_id, quantity, unit_price)
+    SELECT v_order_id, i.product_id, i.quantity, i.price
+    FROM jsonb_to_recordset(p_items) AS i(product_id INTEGER, quantity INTEGER, price DECIMAL(10,2));
+
+    -- Одна строка на товар, даже если он встречается в нескольких позициях
+    UPDATE inventory inv
+    SET reserved_quantity = inv.reserved_quantity + i.quantity
+    FROM (
+        SELECT product_id, SUM(quantity) AS quantity
+        FROM jsonb_to_recordset(p_items) AS r(product_id INTEGER, quantity INTEGER)
+        GROUP BY product_id
+    ) AS i
+    WHERE inv.product_id = i.product_id;
+
+    -- Счётчики дашборда пишутся в таблицы изменений, так что второй проход
+    -- триггера по заказу не блокирует общих строк
+    UPDATE orders
+    SET total_amount = (SELECT COALESCE(SUM(subtotal), 0) FROM order_items WHERE order_id = v_order_id)
+    WHERE order_id = v_order_id;
+
+    RETURN v_order_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Функции поддержания счётчиков дашборда (пишут только в таблицы изменений)
+CREATE OR REPLACE FUNCTION bump_stats_counter(p_name VARCHAR, p_delta DECIMAL)
+RETURNS VOID AS $$
+BEGIN
+    IF p_delta <> 0 THEN
+        INSERT INTO stats_counter_deltas (name, value) VALUES (p_name, p_delta);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION add_daily_revenue(p_day DATE, p_orders INTEGER, p_revenue DECIMAL)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO daily_revenue_deltas (day, orders_count, revenue)
+    VALUES (p_day, p_orders, p_revenue);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Перенести накопленные изменения в stats_counters и daily_revenue.
+-- Строки изменений удаляются и прибавляются в одной транзакции, так что
+-- параллельный перенос или чтение не учтут их дважды
+CREATE OR REPLACE FUNCTION fold_stats_deltas()
+RETURNS VOID AS $$
+BEGIN
+    WITH folded AS (
+        DELETE FROM stats_counter_deltas RETURNING name, value
+    )
+    UPDATE stats_counters s
+    SET value = s.value + f.value
+    FROM (SELECT name, SUM(value) AS value FROM folded GROUP BY name) AS f
+    WHERE s.name = f.name;
+
+    WITH folded AS (
+        DELETE FROM daily_revenue_deltas RETURNING day, orders_count, revenue
+    )
+    INSERT INTO daily_revenue (day, orders_count, revenue)
+    SELECT day, SUM(orders_count), SUM(revenue)
+    FROM folded
+    GROUP BY day
+    ON CONFLICT (day) DO UPDATE
+    SET orders_count = daily_revenue.orders_count + EXCLUDED.orders_count,
+        revenue = daily_revenue.revenue + EXCLUDED.revenue;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Перенести изменения, если их накопилось p_threshold и больше. Вызывается
+-- перед чтением дашборда, поэтому таблицы изменений не растут без предела,
+-- даже когда отчёты никто не обновляет. Проверка читает не больше
+-- p_threshold строк каждой таблицы
+CREATE OR REPLACE FUNCTION fold_stats_deltas_if_needed(p_threshold INTEGER)
+RETURNS BOOLEAN AS $$
+BEGIN
+    IF (SELECT COUNT(*) FROM (SELECT 1 FROM stats_counter_deltas LIMIT p_threshold) AS d) < p_threshold
+       AND (SELECT COUNT(*) FROM (SELECT 1 FROM daily_revenue_deltas LIMIT p_threshold) AS d) < p_threshold THEN
+        RETURN FALSE;
+    END IF;
+    PERFORM fold_stats_deltas();
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_users_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_stats_counter('total_users', 1);
+    ELSE
+        PERFORM bump_stats_counter('total_users', -1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_products_counter()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_delta INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.is_active THEN
+            v_delta := v_delta - 1;
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.is_active THEN
+            v_delta := v_delta + 1;
+        END IF;
+    END IF;
+    PERFORM bump_stats_counter('active_products', v_delta);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Старая версия заказа вычитается, новая прибавляется
+CREATE OR REPLACE FUNCTION update_orders_counters()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM bump_stats_counter('total_orders', 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM bump_stats_counter('total_orders', -1);
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.status != 'cancelled' THEN
+            PERFORM bump_stats_counter('total_revenue', -OLD.total_amount);
+            PERFORM add_daily_revenue(DATE(OLD.order_date), -1, -OLD.total_amount);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.status != 'cancelled' THEN
+            PERFORM bump_stats_counter('total_revenue', NEW.total_amount);
+            PERFORM add_daily_revenue(DATE(NEW.order_date), 1, NEW.total_amount);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Триггеры для автообновления updated_at
 CREATE TRIGGER update_products_updated_at 
     BEFORE UPDATE ON products 
@@ -225,6 +595,40 @@ CREATE TRIGGER update_orders_updated_at
     BEFORE UPDATE ON orders 
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TRIGGER update_inventory_last_updated
+    BEFORE UPDATE ON inventory
+    FOR EACH ROW EXECUTE FUNCTION update_last_updated_column();
+
+-- Триггеры для синхронизации снимков каталога
+CREATE TRIGGER touch_product_on_image_change
+    AFTER INSERT OR UPDATE OR DELETE ON product_images
+    FOR EACH ROW EXECUTE FUNCTION touch_product_updated_at();
+
+CREATE TRIGGER log_product_deletions
+    AFTER DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION log_product_deletion();
+
+-- Уведомления об изменении товаров и остатков: по одному на оператор
+CREATE TRIGGER notify_products_insert
+    AFTER INSERT ON products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_product_changes();
+
+CREATE TRIGGER notify_products_update
+    AFTER UPDATE ON products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_product_changes();
+
+CREATE TRIGGER notify_products_delete
+    AFTER DELETE ON products
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_product_changes();
+
+CREATE TRIGGER notify_inventory_update
+    AFTER UPDATE ON inventory
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_product_changes();
+
 -- Триггер для создания записи в inventory при добавлении товара
 CREATE TRIGGER create_inventory_after_product
     AFTER INSERT ON products
@@ -235,6 +639,19 @@ CREATE TRIGGER log_order_status_changes
     AFTER UPDATE OF status ON orders
     FOR EACH ROW EXECUTE FUNCTION log_order_status_change();
 
+-- Триггеры счётчиков дашборда
+CREATE TRIGGER update_users_counter
+    AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION update_users_counter();
+
+CREATE TRIGGER update_products_counter
+    AFTER INSERT OR DELETE OR UPDATE OF is_active ON products
+    FOR EACH ROW EXECUTE FUNCTION update_products_counter();
+
+CREATE TRIGGER update_orders_counters
+    AFTER INSERT OR DELETE OR UPDATE OF status, total_amount, order_date ON orders
+    FOR EACH ROW EXECUTE FUNCTION update_orders_counters();
+
 -- ПОЛЕЗНЫЕ ПРЕДСТАВЛЕНИЯ
 
 -- Представление для товаров с информацией о категории и остатках
@@ -277,6 +694,74 @@ JOIN addresses a ON o.shipping_address_id = a.address_id
 JOIN order_items oi ON o.order_id = oi.order_id
 GROUP BY o.order_id, c.customer_id, a.address_id;
 
+-- МАТЕРИАЛИЗОВАННЫЕ ОТЧЁТЫ
+-- Обновляются функцией refresh_sales_reports() через
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY (нужен уникальный индекс),
+-- поэтому чтение отчётов во время обновления не блокируется.
+
+-- Продажи по дням
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_daily_sales AS
+SELECT
+    DATE(o.order_date) as order_day,
+    COUNT(o.order_id) as order_count,
+    SUM(o.total_amount) as total_sales,
+    AVG(o.total_amount) as avg_order_value
+FROM orders o
+GROUP BY DATE(o.order_date);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_daily_sales_day ON mv_daily_sales(order_day);
+
+-- Выручка категорий по дням (без отменённых заказов)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_category_sales_daily AS
+SELECT
+    DATE(o.order_date) as order_day,
+    c.category_id,
+    c.name as category,
+    SUM(oi.quantity) as total_sold,
+    SUM(oi.subtotal) as revenue
+FROM categories c
+JOIN products p ON c.category_id = p.category_id
+JOIN order_items oi ON p.product_id = oi.product_id
+JOIN orders o ON oi.order_id = o.order_id
+WHERE o.status != 'cancelled'
+GROUP BY DATE(o.order_date), c.category_id, c.name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_category_sales_daily
+    ON mv_category_sales_daily(order_day, category_id);
+
+-- Время последнего обновления отчётов
+CREATE TABLE IF NOT EXISTS report_refreshes (
+    view_name VARCHAR(100) PRIMARY KEY,
+    refreshed_at TIMESTAMP NOT NULL
+);
+
+-- Обновить отчёты, если они старше p_max_age; возвращает время обновления.
+-- Заодно переносит изменения счётчиков дашборда (вызывается периодически)
+CREATE OR REPLACE FUNCTION refresh_sales_reports(p_max_age INTERVAL DEFAULT INTERVAL '0')
+RETURNS TIMESTAMP AS $$
+DECLARE
+    v_refreshed_at TIMESTAMP;
+BEGIN
+    PERFORM fold_stats_deltas();
+
+    SELECT MIN(refreshed_at) INTO v_refreshed_at FROM report_refreshes;
+    IF v_refreshed_at IS NOT NULL AND v_refreshed_at > CURRENT_TIMESTAMP - p_max_age THEN
+        RETURN v_refreshed_at;
+    END IF;
+
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_daily_sales;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_category_sales_daily;
+
+    v_refreshed_at := CURRENT_TIMESTAMP;
+    INSERT INTO report_refreshes (view_name, refreshed_at) VALUES
+    ('mv_daily_sales', v_refreshed_at),
+    ('mv_category_sales_daily', v_refreshed_at)
+    ON CONFLICT (view_name) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+
+    RETURN v_refreshed_at;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ДАННЫЕ ДЛЯ ТЕСТИРОВАНИЯ
 
 -- Вставка тестовых пользователей
@@ -347,6 +832,9 @@ INSERT INTO reviews (product_id, customer_id, rating, comment, created_at, is_ap
 (3, 1, 5, 'Отличный ноутбук! Работает быстро, батарея держит долго.', '2024-01-12 09:00:00', true),
 (2, 2, 4, 'Хороший смартфон, но цена завышена.', '2024-01-18 14:20:00', true);
 
+-- Заполнение отчётов по тестовым данным
+SELECT refresh_sales_reports();
+
 -- ПРОВЕРОЧНЫЕ ЗАПРОСЫ
 
 -- Проверка пользователей
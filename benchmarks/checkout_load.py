@@ -0,0 +1,136 @@
+"""Нагрузочный тест резервирования: много одновременных заказов одного товара.
+
+Создаёт два тестовых товара с остатком --stock и запускает --checkouts
+параллельных заказов по --threads потоков. Часть заказов содержит оба
+товара в разном порядке, чтобы проверить отсутствие взаимоблокировок.
+В конце проверяет, что резерв не превышает остаток и совпадает с суммой
+успешных заказов, и удаляет тестовые данные.
+
+    python benchmarks/checkout_load.py --host /tmp --checkouts 500 --stock 200
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import connect, make_parser, percentile
+
+from clientapp import InsufficientStockError
+
+
+def create_test_products(db_manager, stock):
+    marker = f"LOAD-{int(time.time() * 1000)}"
+    with db_manager.borrow() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT category_id FROM categories ORDER BY category_id LIMIT 1")
+        category_id = cursor.fetchone()[0]
+        product_ids = []
+        for suffix in ("A", "B"):
+            cursor.execute("""
+            INSERT INTO products (name, price, category_id, sku)
+            VALUES (%s, 100, %s, %s) RETURNING product_id
+            """, (f"Нагрузочный тест {suffix}", category_id, f"{marker}-{suffix}"))
+            product_ids.append(cursor.fetchone()[0])
+        cursor.execute("UPDATE inventory SET quantity = %s WHERE product_id = ANY(%s)",
+                       (stock, product_ids))
+        cursor.execute("SELECT customer_id FROM customers ORDER BY customer_id LIMIT 1")
+        customer_id = cursor.fetchone()[0]
+        connection.commit()
+        cursor.close()
+    return product_ids, customer_id
+
+
+def drop_test_products(db_manager, product_ids):
+    with db_manager.borrow() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        DELETE FROM orders WHERE order_id IN (
+            SELECT order_id FROM order_items WHERE product_id = ANY(%s)
+        )
+        """, (product_ids,))
+        cursor.execute("DELETE FROM products WHERE product_id = ANY(%s)", (product_ids,))
+        connection.commit()
+        cursor.close()
+
+
+def main():
+    parser = make_parser(__doc__.splitlines()[0])
+    parser.add_argument("--checkouts", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--pool", type=int, default=20)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--keep", action="store_true", help="не удалять тестовые данные")
+    args = parser.parse_args()
+
+    db_manager = connect(args, pool_min=args.pool, pool_max=args.pool)
+    (hot_id, other_id), customer_id = create_test_products(db_manager, args.stock)
+
+    results = {'ok': 0, 'rejected': 0, 'failed': 0}
+    reserved = {hot_id: 0, other_id: 0}
+    latencies = []
+    lock = threading.Lock()
+
+    def checkout(number):
+        # Каждый третий заказ берёт оба товара, чередуя порядок позиций
+        items = [{'product_id': hot_id, 'quantity': 1, 'price': 100}]
+        if number % 3 == 1:
+            items.append({'product_id': other_id, 'quantity': 1, 'price': 100})
+        elif number % 3 == 2:
+            items.insert(0, {'product_id': other_id, 'quantity': 1, 'price': 100})
+
+        started = time.perf_counter()
+        try:
+            order_id = db_manager.create_order(customer_id, items)
+            outcome = 'ok' if order_id else 'failed'
+        except InsufficientStockError:
+            outcome = 'rejected'
+        elapsed = time.perf_counter() - started
+
+        with lock:
+            results[outcome] += 1
+            latencies.append(elapsed)
+            if outcome == 'ok':
+                for item in items:
+                    reserved[item['product_id']] += item['quantity']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(checkout, range(args.checkouts)))
+    total_time = time.perf_counter() - started
+
+    with db_manager.borrow() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT product_id, quantity, reserved_quantity FROM inventory
+        WHERE product_id = ANY(%s) ORDER BY product_id
+        """, ([hot_id, other_id],))
+        inventory = cursor.fetchall()
+        cursor.close()
+
+    print(f"Заказов: {args.checkouts}, потоков: {args.threads}, соединений: {args.pool}")
+    print(f"Успешно: {results['ok']}, отклонено по остатку: {results['rejected']}, "
+          f"ошибок: {results['failed']}")
+    print(f"Время: {total_time:.2f} с, {args.checkouts / total_time:.0f} заказов/с")
+    print(f"Задержка p50/p95/p99: {percentile(latencies, 0.5) * 1000:.1f} / "
+          f"{percentile(latencies, 0.95) * 1000:.1f} / {percentile(latencies, 0.99) * 1000:.1f} мс")
+    print(f"Пул: {db_manager.get_pool_stats()}")
+
+    consistent = True
+    for product_id, quantity, reserved_quantity in inventory:
+        print(f"Товар {product_id}: остаток {quantity}, резерв {reserved_quantity}, "
+              f"по успешным заказам {reserved[product_id]}")
+        if reserved_quantity > quantity or reserved_quantity != reserved[product_id]:
+            consistent = False
+
+    if not args.keep:
+        drop_test_products(db_manager, [hot_id, other_id])
+    db_manager.close()
+
+    if not consistent or results['failed']:
+        print("ОШИБКА: резерв не совпадает с заказами")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""Общие параметры подключения и статистика для скриптов нагрузочных тестов"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientapp import DatabaseManager, percentile  # noqa: E402,F401
+
+
+def make_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", default="5432")
+    parser.add_argument("--dbname", default="electronics_store")
+    parser.add_argument("--user", default="postgres")
+    parser.add_argument("--password", default="password")
+    return parser
+
+
+def connect(args, pool_min=None, pool_max=None):
+    """DatabaseManager, подключённый по параметрам командной строки"""
+    db_manager = DatabaseManager()
+    if not db_manager.connect(host=args.host, port=args.port, database=args.dbname,
+                              user=args.user, password=args.password,
+                              pool_min=pool_min, pool_max=pool_max):
+        sys.exit("Не удалось подключиться к базе данных")
+    return db_manager
@@ -0,0 +1,226 @@
+"""Замеры методов DatabaseManager на синтетических данных разного объёма.
+
+Для каждого масштаба из --scales (число товаров) база заполняется заново
+генератором generate_dataset.py (заказов --orders-per-product на товар),
+после чего каждый метод вызывается --repeats раз. Результаты (среднее,
+p50, p95, число строк) записываются в JSON с хэшем коммита, чтобы
+сравнивать ветки между собой:
+
+    python benchmarks/db_suite.py --host /tmp --dbname bench --scales 10000,100000,1000000
+    python benchmarks/db_suite.py --host /tmp --dbname bench --compare bench-1a2b3c4.json
+
+База --dbname очищается, не запускайте на рабочей.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from common import connect, make_parser, percentile
+
+from generate_dataset import build_parser, generate
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), text=True, stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def sample_context(db_manager):
+    """Параметры запросов, подобранные по данным: крупная категория, активный клиент и т.п."""
+    with db_manager.borrow() as connection:
+        cursor = connection.cursor()
+        cursor.execute("""
+        SELECT category_id FROM products GROUP BY category_id ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        category_id = cursor.fetchone()[0]
+        cursor.execute("""
+        SELECT customer_id FROM orders GROUP BY customer_id ORDER BY COUNT(*) DESC LIMIT 1
+        """)
+        customer_id = cursor.fetchone()[0]
+        cursor.execute("""
+        SELECT u.email FROM users u JOIN customers c ON c.user_id = u.user_id
+        WHERE c.customer_id = %s
+        """, (customer_id,))
+        email = cursor.fetchone()[0]
+        cursor.execute("""
+        SELECT p.product_id, p.price FROM products p JOIN inventory i ON i.product_id = p.product_id
+        WHERE p.is_active ORDER BY i.quantity - i.reserved_quantity DESC LIMIT 1
+        """)
+        product_id, price = cursor.fetchone()
+        cursor.close()
+        connection.rollback()
+
+    # Курсор пятидесятой страницы каталога - глубокая прокрутка
+    deep_cursor = None
+    for _ in range(50):
+        _, next_cursor = db_manager.get_products_page(cursor=deep_cursor)
+        if next_cursor is None:
+            break
+        deep_cursor = next_cursor
+
+    return {
+        'category_id': category_id,
+        'customer_id': customer_id,
+        'email': email,
+        'deep_cursor': deep_cursor,
+        'order_items': [{'product_id': product_id, 'quantity': 1, 'price': price}],
+    }
+
+
+def benchmark_cases(db_manager, context):
+    """(название, вызов) для каждого замеряемого метода"""
+    return [
+        ("get_products_page", lambda: db_manager.get_products_page()),
+        ("get_products_page категория",
+         lambda: db_manager.get_products_page(category_id=context['category_id'])),
+        ("get_products_page поиск", lambda: db_manager.get_products_page(search_text="Samsung")),
+        ("get_products_page страница 50",
+         lambda: db_manager.get_products_page(cursor=context['deep_cursor'])),
+        ("get_products", lambda: db_manager.get_products(category_id=context['category_id'])),
+        ("get_categories", db_manager.get_categories),
+        ("get_product", lambda: db_manager.get_product(context['order_items'][0]['product_id'])),
+        ("get_category", lambda: db_manager.get_category(context['category_id'])),
+        ("get_all_products_page", lambda: db_manager.get_all_products_page()),
+        ("get_all_users_page", lambda: db_manager.get_all_users_page()),
+        ("get_all_orders_page", lambda: db_manager.get_all_orders_page()),
+        ("get_user_orders", lambda: db_manager.get_user_orders(context['customer_id'])),
+        ("get_dashboard_stats", db_manager.get_dashboard_stats),
+        ("get_sales_report", db_manager.get_sales_report),
+        ("get_category_sales", db_manager.get_category_sales),
+        ("authenticate", lambda: db_manager.authenticate(context['email'], "123456")),
+        ("refresh_sales_reports", lambda: db_manager.refresh_sales_reports(max_age=0)),
+        # Последним: добавляет заказы и меняет данные для остальных замеров
+        ("create_order", lambda: db_manager.create_order(context['customer_id'], context['order_items'])),
+    ]
+
+
+def result_size(result):
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, (list, dict)):
+        return len(result)
+    return None
+
+
+def measure(fn, repeats):
+    fn()  # прогрев: кэш страниц и подготовленных операторов
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'rows': result_size(result),
+    }
+
+
+def table_counts(db_manager):
+    counts = {}
+    with db_manager.borrow() as connection:
+        cursor = connection.cursor()
+        for table in ("products", "customers", "orders", "order_items"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        cursor.close()
+        connection.rollback()
+    return counts
+
+
+def run_scale(db_manager, args, products):
+    if products:
+        dataset_args = build_parser().parse_args([
+            "--products", str(products),
+            "--orders", str(products * args.orders_per_product),
+            "--items-per-order", str(args.items_per_order),
+            "--seed", str(args.seed),
+            "--truncate",
+        ])
+        generate(db_manager, dataset_args)
+
+    counts = table_counts(db_manager)
+    print(f"\nТоваров {counts['products']:,}, заказов {counts['orders']:,}, "
+          f"позиций {counts['order_items']:,}")
+    context = sample_context(db_manager)
+
+    results = {}
+    for name, fn in benchmark_cases(db_manager, context):
+        results[name] = measure(fn, args.repeats)
+        row = results[name]
+        print(f"  {name:<32}{row['mean_ms']:>10.2f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}")
+    return {'products': products or counts['products'], 'counts': counts, 'results': results}
+
+
+def compare(current, baseline_path):
+    """Печатает отношение p50 текущего прогона к прогону из baseline_path"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {scale['products']: scale['results'] for scale in baseline['scales']}
+
+    print(f"\nСравнение с {baseline['revision']} (p50, было -> стало)")
+    for scale in current['scales']:
+        old_results = previous.get(scale['products'])
+        if not old_results:
+            continue
+        print(f"Товаров {scale['products']:,}")
+        for name, row in scale['results'].items():
+            old = old_results.get(name)
+            if not old:
+                continue
+            ratio = row['p50_ms'] / old['p50_ms'] if old['p50_ms'] else float('inf')
+            print(f"  {name:<32}{old['p50_ms']:>10.2f}{row['p50_ms']:>10.2f}{ratio:>8.2f}x")
+
+
+def main():
+    parser = make_parser(__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000,1000000",
+                        help="число товаров через запятую; 0 - замерить имеющиеся данные")
+    parser.add_argument("--orders-per-product", type=int, default=10)
+    parser.add_argument("--items-per-order", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--search-mode", choices=["fulltext", "ilike"], default="fulltext")
+    parser.add_argument("--output", help="по умолчанию bench-<коммит>-<время>.json")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    db_manager = connect(args)
+    db_manager.search_mode = args.search_mode
+    revision = git_revision()
+    report = {
+        'revision': revision,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'repeats': args.repeats,
+        'search_mode': args.search_mode,
+        'scales': [],
+    }
+
+    print(f"{'':<34}{'среднее':>10}{'p50':>10}{'p95':>10}  (мс)")
+    for products in (int(value) for value in args.scales.split(",")):
+        report['scales'].append(run_scale(db_manager, args, products))
+    db_manager.close()
+
+    output = args.output or f"bench-{revision}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    print(f"\nРезультаты записаны в {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
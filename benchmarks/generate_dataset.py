@@ -0,0 +1,374 @@
+"""Генератор большого синтетического набора данных для electronics_store.
+
+Заполняет базу через COPY: категории, пользователи с профилями и адресами,
+товары, заказы и позиции заказов. Распределения неравномерные, как в жизни:
+популярность категорий, товаров и активность клиентов подчиняются закону
+Ципфа, цены логнормальны вокруг базовой цены категории, заказов в последние
+месяцы больше, чем в начале периода.
+
+После загрузки пересчитываются остатки, счётчики дашборда и отчёты,
+выполняется ANALYZE. Схема должна быть создана заранее.
+
+    python benchmarks/generate_dataset.py --host /tmp --products 1000000 \\
+        --orders 10000000 --items-per-order 3
+"""
+import hashlib
+import io
+import itertools
+import math
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from common import connect, make_parser
+
+COPY_BATCH = 50000
+# Не даёт сумме заказа (до 20 позиций по 4 шт.) выйти за DECIMAL(10,2)
+MAX_PRICE = 999999
+
+ROOT_CATEGORIES = [
+    "Электроника", "Бытовая техника", "Компьютеры", "Аудио", "Фото и видео",
+    "Игры", "Умный дом", "Аксессуары",
+]
+PRODUCT_KINDS = [
+    "Смартфон", "Ноутбук", "Телевизор", "Наушники", "Планшет", "Монитор",
+    "Холодильник", "Пылесос", "Колонка", "Камера", "Роутер", "Часы",
+]
+BRANDS = [
+    "Samsung", "Apple", "Xiaomi", "Sony", "LG", "Huawei", "Lenovo", "Asus",
+    "Philips", "Bosch", "Honor", "Realme", "JBL", "Canon", "Dell", "HP",
+]
+DESCRIPTION_WORDS = [
+    "беспроводной", "мощный", "компактный", "тихий", "быстрый", "экран",
+    "батарея", "процессор", "память", "камера", "звук", "шумоподавление",
+    "дисплей", "гарантия", "энергосбережение", "подсветка", "корпус",
+    "алюминиевый", "водозащита", "зарядка", "встроенный", "модуль",
+]
+FIRST_NAMES = ["Иван", "Мария", "Алексей", "Ольга", "Дмитрий", "Анна", "Сергей", "Елена"]
+LAST_NAMES = ["Иванов", "Петрова", "Смирнов", "Кузнецова", "Попов", "Соколова", "Лебедев"]
+CITIES = ["Москва", "Санкт-Петербург", "Новосибирск", "Екатеринбург", "Казань", "Самара"]
+ORDER_STATUSES = (["delivered", "shipped", "processing", "confirmed", "pending", "cancelled", "refunded"],
+                  [60, 10, 5, 5, 10, 8, 2])
+PAYMENT_METHODS = (["card", "online", "cash"], [60, 30, 10])
+PAYMENT_STATUS = {
+    'pending': 'pending', 'confirmed': 'paid', 'processing': 'paid', 'shipped': 'paid',
+    'delivered': 'paid', 'cancelled': 'failed', 'refunded': 'refunded',
+}
+
+
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса распределения Ципфа для random.choices"""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def copy_rows(cursor, table, columns, rows):
+    """COPY строк партиями по COPY_BATCH; значения уже без табуляций и переводов строк"""
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    total = 0
+    while True:
+        batch = list(itertools.islice(rows, COPY_BATCH))
+        if not batch:
+            return total
+        buffer = io.StringIO()
+        for row in batch:
+            buffer.write("\t".join(r"\N" if value is None else str(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+        total += len(batch)
+
+
+def max_id(cursor, table, column):
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def random_timestamp(rng, start, span_seconds, recent_bias=1.0):
+    """Момент в [start, start + span]; при recent_bias > 1 ближе к концу периода"""
+    fraction = rng.random() ** (1.0 / recent_bias)
+    return (start + timedelta(seconds=fraction * span_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class DatasetGenerator:
+    def __init__(self, connection, args):
+        self.connection = connection
+        self.cursor = connection.cursor()
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime.now().replace(microsecond=0)
+        self.tag = f"{int(time.time()):x}"
+
+    def step(self, title, fn):
+        started = time.perf_counter()
+        count = fn()
+        self.connection.commit()
+        elapsed = time.perf_counter() - started
+        rate = f", {count / elapsed:,.0f} строк/с" if count and elapsed > 0 else ""
+        print(f"{title}: {count or 0:,} за {elapsed:.1f} с{rate}")
+
+    def run(self):
+        if self.args.truncate:
+            self.step("Очистка", self.truncate)
+
+        # Без триггеров и проверок FK строки грузятся в разы быстрее; остатки,
+        # счётчики и отчёты пересчитываются в конце. Требует прав суперпользователя.
+        try:
+            self.cursor.execute("SET session_replication_role = replica")
+        except Exception as e:
+            self.connection.rollback()
+            print(f"Триггеры остаются включёнными: {e}".strip())
+
+        self.step("Категории", self.generate_categories)
+        self.step("Пользователи", self.generate_users)
+        self.step("Клиенты", self.generate_customers)
+        self.step("Адреса", self.generate_addresses)
+        self.step("Товары", self.generate_products)
+        self.step("Заказы и позиции", self.generate_orders)
+
+        self.cursor.execute("SET session_replication_role = DEFAULT")
+        self.step("Последовательности", self.reset_sequences)
+        self.step("Остатки", self.fill_inventory)
+        self.step("Счётчики дашборда", self.rebuild_counters)
+        self.step("Отчёты", self.refresh_reports)
+        self.step("ANALYZE", self.analyze)
+
+    def truncate(self):
+        self.cursor.execute("""
+        TRUNCATE users, customers, categories, products, inventory, addresses,
+                 orders, order_items, reviews, order_status_log, product_images,
+                 product_attribute_values
+        RESTART IDENTITY CASCADE
+        """)
+
+    def generate_categories(self):
+        self.cursor.execute("SELECT category_id FROM categories WHERE parent_category_id IS NOT NULL")
+        leaves = [row[0] for row in self.cursor.fetchall()]
+        missing = self.args.categories - len(leaves)
+        if missing <= 0:
+            self.category_ids = leaves
+            return 0
+
+        first_id = max_id(self.cursor, "categories", "category_id") + 1
+        roots = list(range(first_id, first_id + len(ROOT_CATEGORIES)))
+        new_leaves = list(range(roots[-1] + 1, roots[-1] + 1 + missing))
+
+        def rows():
+            for category_id, name in zip(roots, ROOT_CATEGORIES):
+                yield category_id, f"{name} {self.tag}", f"Раздел «{name}»", None
+            for number, category_id in enumerate(new_leaves):
+                kind = PRODUCT_KINDS[number % len(PRODUCT_KINDS)]
+                yield category_id, f"{kind} {number + 1}", f"Категория {kind.lower()}", roots[number % len(roots)]
+
+        count = copy_rows(self.cursor, "categories",
+                          ["category_id", "name", "description", "parent_category_id"], rows())
+        self.category_ids = leaves + new_leaves
+        return count
+
+    def generate_users(self):
+        self.first_user_id = max_id(self.cursor, "users", "user_id") + 1
+        password_hash = hashlib.md5(b"123456").hexdigest()
+        start = self.now - timedelta(days=3 * 365)
+        span = 3 * 365 * 86400
+
+        def rows():
+            for number in range(self.args.customers):
+                user_id = self.first_user_id + number
+                yield (user_id, f"user{user_id}.{self.tag}@example.com", password_hash, "customer",
+                       random_timestamp(self.rng, start, span, 1.5), "t")
+
+        return copy_rows(self.cursor, "users",
+                         ["user_id", "email", "password_hash", "role", "created_at", "is_active"], rows())
+
+    def generate_customers(self):
+        self.first_customer_id = max_id(self.cursor, "customers", "customer_id") + 1
+
+        def rows():
+            for number in range(self.args.customers):
+                yield (self.first_customer_id + number, self.first_user_id + number,
+                       self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES),
+                       f"+7-9{self.rng.randrange(10 ** 9):09d}")
+
+        return copy_rows(self.cursor, "customers",
+                         ["customer_id", "user_id", "first_name", "last_name", "phone"], rows())
+
+    def generate_addresses(self):
+        self.first_address_id = max_id(self.cursor, "addresses", "address_id") + 1
+
+        def rows():
+            for number in range(self.args.customers):
+                yield (self.first_address_id + number, self.first_customer_id + number, "home",
+                       f"ул. Тестовая, д. {self.rng.randint(1, 200)}", self.rng.choice(CITIES),
+                       f"{self.rng.randint(100000, 699999)}", "Russia", "t")
+
+        return copy_rows(self.cursor, "addresses",
+                         ["address_id", "customer_id", "address_type", "street", "city",
+                          "postal_code", "country", "is_default"], rows())
+
+    def generate_products(self):
+        self.first_product_id = max_id(self.cursor, "products", "product_id") + 1
+        self.prices = array('d')
+
+        categories = self.category_ids[:]
+        self.rng.shuffle(categories)
+        category_weights = zipf_cum_weights(len(categories), 1.1)
+        # Базовая цена категории - от 500 до 150 000 руб. (равномерно по логарифму)
+        base_prices = {category_id: math.exp(self.rng.uniform(math.log(500), math.log(150000)))
+                       for category_id in categories}
+        start = self.now - timedelta(days=3 * 365)
+        span = 3 * 365 * 86400
+
+        def rows():
+            for number in range(self.args.products):
+                product_id = self.first_product_id + number
+                category_id = self.rng.choices(categories, cum_weights=category_weights)[0]
+                price = round(min(base_prices[category_id] * self.rng.lognormvariate(0, 0.6), MAX_PRICE), 2)
+                self.prices.append(price)
+                kind = self.rng.choice(PRODUCT_KINDS)
+                brand = self.rng.choice(BRANDS)
+                description = " ".join(self.rng.sample(DESCRIPTION_WORDS, 8))
+                created_at = random_timestamp(self.rng, start, span, 2.0)
+                yield (product_id, f"{brand} {kind} {product_id}", f"{kind} {brand}: {description}",
+                       f"{price:.2f}", f"{price * 0.75:.2f}", category_id,
+                       f"GEN-{self.tag}-{product_id}", self.rng.randint(100, 20000),
+                       "t" if self.rng.random() < 0.95 else "f", created_at, created_at)
+
+        return copy_rows(self.cursor, "products",
+                         ["product_id", "name", "description", "price", "cost_price", "category_id",
+                          "sku", "weight", "is_active", "created_at", "updated_at"], rows())
+
+    def generate_orders(self):
+        first_order_id = max_id(self.cursor, "orders", "order_id") + 1
+        first_item_id = max_id(self.cursor, "order_items", "order_item_id") + 1
+        product_weights = zipf_cum_weights(len(self.prices), 0.9)
+        customer_weights = zipf_cum_weights(self.args.customers, 0.7)
+        # Популярность не должна совпадать с порядком product_id
+        product_offsets = list(range(len(self.prices)))
+        self.rng.shuffle(product_offsets)
+        customer_offsets = range(self.args.customers)
+        # Вероятность ещё одной позиции при среднем items_per_order
+        more_items = 1.0 - 1.0 / max(self.args.items_per_order, 1.0)
+        start = self.now - timedelta(days=2 * 365)
+        span = 2 * 365 * 86400
+        item_ids = itertools.count(first_item_id)
+        total_items = 0
+
+        for batch_start in range(0, self.args.orders, COPY_BATCH):
+            batch_size = min(COPY_BATCH, self.args.orders - batch_start)
+            orders = []
+            items = []
+            customers = self.rng.choices(customer_offsets, cum_weights=customer_weights, k=batch_size)
+            for number, customer_offset in enumerate(customers):
+                order_id = first_order_id + batch_start + number
+                count = 1
+                while self.rng.random() < more_items and count < 20:
+                    count += 1
+                total = 0.0
+                for product_offset in self.rng.choices(product_offsets, cum_weights=product_weights, k=count):
+                    quantity = 1 if self.rng.random() < 0.8 else self.rng.randint(2, 4)
+                    price = self.prices[product_offset]
+                    total += quantity * price
+                    items.append((next(item_ids), order_id, self.first_product_id + product_offset,
+                                  quantity, f"{price:.2f}"))
+                status = self.rng.choices(*ORDER_STATUSES)[0]
+                order_date = random_timestamp(self.rng, start, span, 1.8)
+                orders.append((order_id, self.first_customer_id + customer_offset, order_date, status,
+                               f"{total:.2f}", self.first_address_id + customer_offset,
+                               self.rng.choices(*PAYMENT_METHODS)[0], PAYMENT_STATUS[status], order_date))
+
+            copy_rows(self.cursor, "orders",
+                      ["order_id", "customer_id", "order_date", "status", "total_amount",
+                       "shipping_address_id", "payment_method", "payment_status", "updated_at"], iter(orders))
+            total_items += copy_rows(self.cursor, "order_items",
+                                     ["order_item_id", "order_id", "product_id", "quantity", "unit_price"],
+                                     iter(items))
+            self.connection.commit()
+            print(f"  заказов {batch_start + batch_size:,} из {self.args.orders:,}", end="\r")
+
+        print()
+        return self.args.orders + total_items
+
+    def reset_sequences(self):
+        for table, column in [("users", "user_id"), ("customers", "customer_id"),
+                              ("categories", "category_id"), ("products", "product_id"),
+                              ("addresses", "address_id"), ("orders", "order_id"),
+                              ("order_items", "order_item_id"), ("inventory", "inventory_id")]:
+            self.cursor.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{table}', '{column}'),
+                          GREATEST((SELECT MAX({column}) FROM {table}), 1))
+            """)
+        return 0
+
+    def fill_inventory(self):
+        self.cursor.execute("""
+        INSERT INTO inventory (product_id, quantity)
+        SELECT product_id, (random() * 200)::INTEGER
+        FROM products
+        WHERE product_id >= %s
+        ON CONFLICT (product_id) DO UPDATE SET quantity = EXCLUDED.quantity
+        """, (self.first_product_id,))
+        return self.cursor.rowcount
+
+    def rebuild_counters(self):
+        self.cursor.execute("""
+        INSERT INTO stats_counters (name, value) VALUES
+        ('total_users', (SELECT COUNT(*) FROM users)),
+        ('active_products', (SELECT COUNT(*) FROM products WHERE is_active = TRUE)),
+        ('total_orders', (SELECT COUNT(*) FROM orders)),
+        ('total_revenue', (SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE status != 'cancelled'))
+        ON CONFLICT (name) DO UPDATE SET value = EXCLUDED.value
+        """)
+        self.cursor.execute("TRUNCATE daily_revenue, stats_counter_deltas, daily_revenue_deltas")
+        self.cursor.execute("""
+        INSERT INTO daily_revenue (day, orders_count, revenue)
+        SELECT DATE(order_date), COUNT(*), SUM(total_amount)
+        FROM orders
+        WHERE status != 'cancelled'
+        GROUP BY DATE(order_date)
+        """)
+        return self.cursor.rowcount
+
+    def refresh_reports(self):
+        self.cursor.execute("SELECT refresh_sales_reports()")
+        return 0
+
+    def analyze(self):
+        self.connection.autocommit = True
+        self.cursor.execute("ANALYZE")
+        self.connection.autocommit = False
+        return 0
+
+
+def build_parser():
+    parser = make_parser(__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--items-per-order", type=float, default=3.0,
+                        help="среднее число позиций в заказе")
+    parser.add_argument("--customers", type=int, help="по умолчанию orders / 10")
+    parser.add_argument("--categories", type=int, default=40, help="число конечных категорий")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="удалить имеющиеся данные")
+    return parser
+
+
+def generate(db_manager, args):
+    """Заполнить базу по параметрам build_parser()"""
+    args.customers = args.customers or max(args.orders // 10, 1)
+    with db_manager.borrow() as connection:
+        DatasetGenerator(connection, args).run()
+
+
+def main():
+    args = build_parser().parse_args()
+    db_manager = connect(args)
+    started = time.perf_counter()
+    generate(db_manager, args)
+    db_manager.close()
+    print(f"Готово за {time.perf_counter() - started:.1f} с")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""Замеры отрисовки каталога и таблицы товаров админки без дисплея.
+
+Виджеты ProductCatalogWidget и AdminProductsWidget работают с заглушкой
+DatabaseManager, которая отдаёт синтетические страницы товаров. Для каждого
+размера из --sizes в отдельном процессе (чтобы пик RSS относился к одному
+замеру) измеряются:
+
+- создание виджета;
+- время до первой страницы на экране и до её первой отрисовки;
+- загрузка всех строк постранично и отрисовка конца списка;
+- среднее время догрузки страницы в начале и в конце списка;
+- пик RSS процесса и число виджетов Qt.
+
+Догрузка страницы не должна дорожать с длиной списка: если в конце она
+медленнее, чем в начале, больше чем в --max-page-growth раз, скрипт
+завершается с кодом 1.
+
+    python benchmarks/gui_render.py --sizes 100,1000,10000,100000 --json gui.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from common import DatabaseManager  # noqa: E402
+
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication, QWidget  # noqa: E402
+
+WIDGETS = ("catalog", "admin")
+WAIT_TIMEOUT = 120
+# Сколько страниц усредняется в начале и в конце списка
+EDGE_PAGES = 10
+
+
+class StubDatabaseManager:
+    """Заглушка DatabaseManager: страницы синтетических товаров без базы"""
+
+    PAGE_SIZE = DatabaseManager.PAGE_SIZE
+
+    def __init__(self, count, page_size=None):
+        self.count = count
+        self.page_size = page_size or self.PAGE_SIZE
+        self.current_user = {'customer_id': 1}
+
+    @contextmanager
+    def cancel_scope(self, token):
+        yield token
+
+    def get_categories(self):
+        return [(category_id, f"Категория {category_id}") for category_id in range(1, 21)]
+
+    def _page(self, cursor, limit, make_row):
+        offset = cursor or 0
+        limit = limit or self.page_size
+        rows = [make_row(number) for number in range(offset, min(offset + limit, self.count))]
+        return rows, (offset + limit if offset + limit < self.count else None)
+
+    def catalog_row(self, number):
+        return (number + 1, f"Товар {number + 1}", f"Описание товара {number + 1}, " * 3,
+                Decimal("1000.00") + number % 997, f"Категория {number % 20 + 1}",
+                number % 50, None)
+
+    def admin_row(self, number):
+        price = Decimal("1000.00") + number % 997
+        return (number + 1, f"Товар {number + 1}", f"Описание товара {number + 1}", price,
+                price * Decimal("0.75"), f"Категория {number % 20 + 1}", f"SKU-{number + 1}",
+                number % 10 != 0, number % 50, None)
+
+    def get_products_page(self, category_id=None, search_text=None, cursor=None, limit=None):
+        return self._page(cursor, limit, self.catalog_row)
+
+    def get_all_products_page(self, cursor=None, limit=None):
+        return self._page(cursor, limit, self.admin_row)
+
+    def get_cart(self, customer_id):
+        return []
+
+    def save_cart(self, customer_id, lines, clear=False):
+        return True
+
+
+def wait_until(app, condition):
+    """Обрабатывает события, пока condition() не станет истинным"""
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    # Таймер будит цикл, если событий из потоков долго нет
+    timer = QTimer()
+    timer.start(50)
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("виджет не получил данные вовремя")
+        app.processEvents(QEventLoop.WaitForMoreEvents)
+    timer.stop()
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def run_child(widget_name, count, page_size):
+    """Один замер в текущем процессе; возвращает словарь результатов"""
+    from clientapp import AdminProductsWidget, ProductCatalogWidget
+
+    app = QApplication.instance() or QApplication([])
+    db_manager = StubDatabaseManager(count, page_size)
+
+    started = time.perf_counter()
+    if widget_name == "catalog":
+        widget = ProductCatalogWidget(db_manager, 'customer')
+        model, view = widget.products_model, widget.products_view
+
+        def fetch_more():
+            widget.load_more_products()
+    else:
+        widget = AdminProductsWidget(db_manager)
+        model, view = widget.products_model, widget.products_table
+
+        def fetch_more():
+            model.fetchMore()
+    widget.resize(1280, 800)
+    widget.show()
+    construct_ms = elapsed_ms(started)
+
+    wait_until(app, lambda: model.rowCount() > 0)
+    first_page_ms = elapsed_ms(started)
+    widget.grab()
+    first_paint_ms = elapsed_ms(started)
+
+    load_started = time.perf_counter()
+    page_ms = []
+    while model.rowCount() < count:
+        rows = model.rowCount()
+        page_started = time.perf_counter()
+        fetch_more()
+        wait_until(app, lambda: model.rowCount() > rows)
+        # Отложенная раскладка представления тоже входит во время страницы
+        app.processEvents()
+        page_ms.append(elapsed_ms(page_started))
+    load_all_ms = elapsed_ms(load_started)
+
+    paint_started = time.perf_counter()
+    view.scrollToBottom()
+    app.processEvents()
+    widget.grab()
+    last_paint_ms = elapsed_ms(paint_started)
+
+    return {
+        'widget': widget_name,
+        'items': count,
+        'rows': model.rowCount(),
+        'construct_ms': construct_ms,
+        'first_page_ms': first_page_ms,
+        'first_paint_ms': first_paint_ms,
+        'load_all_ms': load_all_ms,
+        'last_paint_ms': last_paint_ms,
+        'pages': len(page_ms),
+        'first_pages_ms': round(sum(page_ms[:EDGE_PAGES]) / max(1, len(page_ms[:EDGE_PAGES])), 2),
+        'last_pages_ms': round(sum(page_ms[-EDGE_PAGES:]) / max(1, len(page_ms[-EDGE_PAGES:])), 2),
+        # ru_maxrss в Linux - килобайты
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'child_widgets': len(widget.findChildren(QWidget)),
+        'app_widgets': len(QApplication.allWidgets()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--widgets", default=",".join(WIDGETS))
+    parser.add_argument("--page-size", type=int, default=StubDatabaseManager.PAGE_SIZE)
+    parser.add_argument("--max-page-growth", type=float, default=3.0,
+                        help="допустимое отношение времени страницы в конце списка к началу")
+    parser.add_argument("--json", help="записать результаты в файл")
+    parser.add_argument("--child", nargs=2, metavar=("WIDGET", "ITEMS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], int(args.child[1]), args.page_size)))
+        return 0
+
+    results = []
+    failures = []
+    print(f"{'Виджет':<9}{'строк':>8}{'создание':>10}{'1-я стр.':>10}{'1-я отр.':>10}"
+          f"{'все стр.':>10}{'отр. конца':>11}{'стр. нач.':>10}{'стр. кон.':>10}"
+          f"{'RSS, МБ':>9}{'виджетов':>10}")
+    for widget_name in args.widgets.split(","):
+        for count in (int(value) for value in args.sizes.split(",")):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--page-size", str(args.page_size),
+                 "--child", widget_name, str(count)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            row = json.loads(output.strip().splitlines()[-1])
+            results.append(row)
+            print(f"{row['widget']:<9}{row['items']:>8}{row['construct_ms']:>10.1f}"
+                  f"{row['first_page_ms']:>10.1f}{row['first_paint_ms']:>10.1f}"
+                  f"{row['load_all_ms']:>10.1f}{row['last_paint_ms']:>11.1f}"
+                  f"{row['first_pages_ms']:>10.2f}{row['last_pages_ms']:>10.2f}"
+                  f"{row['peak_rss_mb']:>9.1f}{row['app_widgets']:>10}")
+            # На паре страниц сравнивать нечего, а доли миллисекунды - шум таймера
+            if (row['pages'] >= 2 * EDGE_PAGES
+                    and row['last_pages_ms'] > args.max_page_growth * max(row['first_pages_ms'], 1.0)):
+                failures.append(row)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': datetime.now().isoformat(timespec='seconds'),
+                       'page_size': args.page_size, 'results': results},
+                      f, ensure_ascii=False, indent=2)
+
+    for row in failures:
+        print(f"Страница {row['widget']} на {row['items']} строк дорожает: "
+              f"{row['first_pages_ms']:.2f} -> {row['last_pages_ms']:.2f} мс")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Сравнение обычных и подготовленных запросов DatabaseManager.
+
+Для каждого запроса из горячего пути выполняет --iterations вызовов
+обычным execute и через PREPARE/EXECUTE на одном соединении и печатает
+среднее время вызова и время планирования на сервере
+(Planning Time из EXPLAIN ANALYZE).
+
+    python benchmarks/prepared_statements.py --host /tmp --iterations 500
+"""
+import hashlib
+import json
+import sys
+import time
+
+from common import connect, make_parser
+
+
+def hot_queries(db_manager):
+    """(название, запрос, параметры) для запросов горячего пути"""
+    queries = []
+
+    query, params, order_by, order_params = db_manager._catalog_query(None, None)
+    queries.append(("Каталог, первая страница",
+                    query + " ORDER BY " + order_by + " LIMIT %s",
+                    params + order_params + [db_manager.PAGE_SIZE + 1]))
+
+    query, params, _, _ = db_manager._catalog_query(1, None)
+    queries.append(("Каталог, категория",
+                    query + " ORDER BY p.created_at DESC, p.product_id DESC LIMIT %s",
+                    params + [db_manager.PAGE_SIZE + 1]))
+
+    queries.append(("Вход", """
+            SELECT u.user_id, u.role, u.email, c.customer_id, c.first_name, c.last_name
+            FROM users u
+            LEFT JOIN customers c ON u.user_id = c.user_id
+            WHERE u.email = %s AND u.is_active = TRUE
+            AND (u.password_hash = %s OR u.password_hash = %s)
+            """, ['ivanov@mail.ru', hashlib.md5(b'123456').hexdigest(), '123456']))
+
+    queries.append(("Заказы клиента", """
+            SELECT o.order_id, o.order_date, o.status, o.total_amount,
+                   COUNT(oi.order_item_id) as items_count
+            FROM orders o
+            JOIN order_items oi ON o.order_id = oi.order_id
+            WHERE o.customer_id = %s
+            GROUP BY o.order_id
+            ORDER BY o.order_date DESC
+            """, [1]))
+    return queries
+
+
+def planning_time(cursor, statement, params):
+    cursor.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, params)
+    return cursor.fetchone()[0][0]['Planning Time']
+
+
+def measure(cursor, query, params, iterations, prepare):
+    # Первые вызовы прогревают кэш и дают серверу выбрать общий план
+    for _ in range(10):
+        cursor.execute(query, params, prepare=prepare)
+        cursor.fetchall()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        cursor.execute(query, params, prepare=prepare)
+        cursor.fetchall()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def main():
+    parser = make_parser(__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--json", help="записать результаты в файл")
+    args = parser.parse_args()
+
+    db_manager = connect(args)
+    db_manager.search_mode = 'ilike'
+    results = []
+
+    with db_manager.borrow() as connection:
+        cursor = connection.cursor()
+        for title, query, params in hot_queries(db_manager):
+            plain_ms = measure(cursor, query, params, args.iterations, prepare=False)
+            prepared_ms = measure(cursor, query, params, args.iterations, prepare=True)
+
+            plain_planning = planning_time(cursor, query, params)
+            name, names = connection.prepared[" ".join(query.split())]
+            execute = f"EXECUTE {name}" + (" (" + ", ".join(["%s"] * len(names)) + ")" if names else "")
+            prepared_planning = planning_time(cursor, execute, params)
+            connection.rollback()
+
+            results.append({
+                'query': title,
+                'plain_ms': round(plain_ms, 3),
+                'prepared_ms': round(prepared_ms, 3),
+                'plain_planning_ms': plain_planning,
+                'prepared_planning_ms': prepared_planning,
+            })
+        cursor.close()
+        stats = dict(connection.prepare_stats)
+    db_manager.close()
+
+    print(f"{'Запрос':<28}{'обычный, мс':>14}{'PREPARE, мс':>14}{'план обычн.':>14}{'план PREP.':>14}")
+    for row in results:
+        print(f"{row['query']:<28}{row['plain_ms']:>14.3f}{row['prepared_ms']:>14.3f}"
+              f"{row['plain_planning_ms']:>14.3f}{row['prepared_planning_ms']:>14.3f}")
+    print(f"Кэш операторов: {stats}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'iterations': args.iterations, 'results': results, 'cache': stats},
+                      f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,22 @@
+import time
+
+# Начало загрузки модуля - для отчёта о времени запуска (StartupReport)
+_IMPORT_STARTED = time.perf_counter()
+
+import functools
+import heapq
+import itertools
+import json
+import os
+import re
 import sys
+import threading
+import types
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 import psycopg2
-from psycopg2 import sql
+import psycopg2.extensions
+from psycopg2 import errorcodes, sql
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QLabel, QLineEdit, QPushButton,
                              QTableWidget, QTableWidgetItem, QTabWidget,
@@ -8,54 +24,830 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QFormLayout, QGroupBox, QHeaderView, QDialog,
                              QDialogButtonBox, QDateEdit, QCheckBox, QGridLayout,
                              QScrollArea, QFrame, QListWidget, QListWidgetItem,
-                             QSplitter, QToolBar, QAction, QStatusBar, QInputDialog)
-from PyQt5.QtCore import Qt, QDate, QSize, QEvent
-from PyQt5.QtGui import QPixmap, QIcon, QFont, QPainter
-from PyQt5.QtChart import (QChart, QChartView, QLineSeries, QBarSeries,
-                           QBarSet, QValueAxis, QBarCategoryAxis, QPieSeries,
-                           QPieSlice)
-import hashlib
+                             QSplitter, QToolBar, QAction, QStatusBar, QInputDialog,
+                             QTableView, QStyledItemDelegate, QStyle,
+                             QAbstractItemView, QStyleOptionViewItem)
+from PyQt5.QtCore import (Qt, QDate, QSize, QRect, QEvent, QObject, QRunnable, QThreadPool,
+                          QTimer, QEventLoop, QAbstractListModel, QAbstractTableModel, QModelIndex,
+                          QPersistentModelIndex, QItemSelection,
+                          QBuffer, QByteArray, QIODevice, QSocketNotifier, pyqtSignal)
+from PyQt5.QtGui import QPixmap, QImage, QImageReader, QIcon, QFont, QPainter, QColor, QRegion
 from datetime import datetime, timedelta
-import random
-from urllib.request import urlopen
-from io import BytesIO
-import urllib.request
-from urllib.parse import urlparse
+from decimal import Decimal
 
 
 class ImageLoadedEvent(QEvent):
     """Событие загрузки изображения"""
     EVENT_TYPE = QEvent.Type(QEvent.registerEventType())
 
-    def __init__(self, pixmap):
+    def __init__(self, image_url, image):
         super().__init__(self.EVENT_TYPE)
-        self.pixmap = pixmap
+        self.image_url = image_url
+        # QImage или текст ошибки
+        self.image = image
+
+
+# SQLSTATE ошибки place_order при нехватке товара
+INSUFFICIENT_STOCK_PGCODE = 'ST001'
+RETRYABLE_PGCODES = (errorcodes.SERIALIZATION_FAILURE, errorcodes.DEADLOCK_DETECTED)
+
+
+class PoolExhaustedError(Exception):
+    """Все соединения пула заняты дольше допустимого времени ожидания"""
+
+
+class InsufficientStockError(Exception):
+    """Товара на складе меньше, чем в заказе.
+
+    shortages - список словарей product_id, name, requested, available
+    по каждой позиции, которой не хватает.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        lines = ", ".join(f"{item['name'] or item['product_id']}: "
+                          f"нужно {item['requested']}, доступно {item['available']}"
+                          for item in shortages)
+        super().__init__(f"Недостаточно товара на складе ({lines})")
+
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+class PerformanceMetrics:
+    """Метрики обращений к базе и сети.
+
+    По каждому имени (метод DatabaseManager, «HTTP хост») хранит число
+    вызовов, ошибок, строк и байт и последние SAMPLES задержек, по которым
+    считаются перцентили. Запросы SQL дольше slow_threshold_ms попадают в
+    журнал медленных запросов с текстом и параметрами, а при explain_slow
+    для SELECT дополнительно снимается EXPLAIN (ANALYZE, BUFFERS).
+    """
+
+    SAMPLES = 1000
+    SLOW_LOG_SIZE = 100
+    # Параметры этих методов не пишутся в журнал (пароли)
+    SENSITIVE_METHODS = {'authenticate'}
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, slow_threshold_ms=200, explain_slow=False):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.explain_slow = explain_slow
+        self.slow_log = deque(maxlen=self.SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._local = threading.local()
+
+    @classmethod
+    def shared(cls):
+        """Общие метрики приложения; первые вызовы из нескольких потоков получат один объект"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _frames(self):
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def current_frame(self):
+        """Учётная запись выполняющегося в этом потоке вызова или None"""
+        frames = self._frames()
+        return frames[-1] if frames else None
+
+    @contextmanager
+    def track(self, name):
+        """Замерить вызов; строки, байты и ошибки добавляются в кадр по ходу"""
+        frame = {'name': name, 'rows': 0, 'bytes': 0, 'error': False}
+        frames = self._frames()
+        frames.append(frame)
+        started = time.perf_counter()
+        try:
+            yield frame
+        except Exception:
+            frame['error'] = True
+            raise
+        finally:
+            frames.pop()
+            self._record(frame, time.perf_counter() - started)
+
+    def _record(self, frame, elapsed):
+        with self._lock:
+            entry = self._entries.get(frame['name'])
+            if entry is None:
+                entry = self._entries[frame['name']] = {
+                    'calls': 0, 'errors': 0, 'rows': 0, 'bytes': 0,
+                    'latencies': deque(maxlen=self.SAMPLES),
+                }
+            entry['calls'] += 1
+            entry['errors'] += frame['error']
+            entry['rows'] += frame['rows']
+            entry['bytes'] += frame['bytes']
+            entry['latencies'].append(elapsed * 1000)
+
+    def statement_finished(self, cursor, query, params, elapsed):
+        """Учесть выполненный запрос SQL и записать его, если он медленный"""
+        frame = self.current_frame()
+        if frame is not None and cursor.description is not None and cursor.rowcount > 0:
+            frame['rows'] += cursor.rowcount
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms < self.slow_threshold_ms:
+            return
+
+        method = frame['name'] if frame else None
+        sql_text = " ".join(query.split())
+        plan = None
+        if self.explain_slow and sql_text[:6].upper() == "SELECT":
+            plan = self._explain(cursor.connection, query, params)
+        self.slow_log.appendleft({
+            'time': datetime.now(),
+            'method': method or "SQL",
+            'elapsed_ms': elapsed_ms,
+            'sql': sql_text,
+            'params': "***" if method in self.SENSITIVE_METHODS else repr(params),
+            'plan': plan,
+        })
+
+    def _explain(self, connection, query, params):
+        # Отдельный курсор без учёта метрик; точка сохранения защищает
+        # транзакцию вызывающего кода, если EXPLAIN завершится ошибкой
+        cursor = connection.cursor(cursor_factory=psycopg2.extensions.cursor)
+        try:
+            cursor.execute("SAVEPOINT explain_capture")
+            try:
+                cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                cursor.execute("RELEASE SAVEPOINT explain_capture")
+                return plan
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT explain_capture")
+                return f"EXPLAIN error: {e}"
+        except Exception as e:
+            print(f"Error capturing query plan: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def snapshot(self):
+        """Список метрик по именам с перцентилями задержки, мс"""
+        with self._lock:
+            entries = [(name, dict(entry, latencies=list(entry['latencies'])))
+                       for name, entry in self._entries.items()]
+
+        result = []
+        for name, entry in sorted(entries):
+            latencies = entry.pop('latencies')
+            entry.update(name=name,
+                         p50=percentile(latencies, 0.5),
+                         p95=percentile(latencies, 0.95),
+                         p99=percentile(latencies, 0.99))
+            result.append(entry)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+        self.slow_log.clear()
+
+
+def instrument_methods(*exclude):
+    """Декоратор класса: обернуть публичные методы в PerformanceMetrics.track"""
+
+    def wrap(name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with PerformanceMetrics.shared().track(name):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def decorate(cls):
+        for name, value in list(vars(cls).items()):
+            if name.startswith('_') or name in exclude or not isinstance(value, types.FunctionType):
+                continue
+            setattr(cls, name, wrap(name, value))
+        return cls
+
+    return decorate
+
+
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def to_prepared_sql(query):
+    """Заменить плейсхолдеры psycopg2 на $1..$n для PREPARE.
+
+    Возвращает (текст, имена): для %(name)s - имена параметров по номерам,
+    для %s - None на каждый номер.
+    """
+    names = []
+    numbers = {}
+
+    def replace(match):
+        if match.group(0) == '%%':
+            return '%'
+        name = match.group(1)
+        if name is None:
+            names.append(None)
+            return f"${len(names)}"
+        if name not in numbers:
+            names.append(name)
+            numbers[name] = len(names)
+        return f"${numbers[name]}"
+
+    return _PLACEHOLDER_RE.sub(replace, query), names
+
+
+class PreparingCursor(psycopg2.extensions.cursor):
+    """Курсор, который умеет выполнять запрос как подготовленный оператор.
+
+    Каждый запрос учитывается в PerformanceMetrics.
+    """
+
+    def execute(self, query, vars=None, prepare=False):
+        metrics = PerformanceMetrics.shared()
+        started = time.perf_counter()
+        try:
+            if prepare and isinstance(self.connection, PreparedStatementConnection):
+                result = self.connection.execute_prepared(self, query, vars)
+            else:
+                result = super().execute(query, vars)
+        except Exception:
+            frame = metrics.current_frame()
+            if frame is not None:
+                frame['error'] = True
+            raise
+        metrics.statement_finished(self, query, vars, time.perf_counter() - started)
+        return result
+
+
+class PreparedStatementConnection(psycopg2.extensions.connection):
+    """Соединение с кэшем серверных подготовленных операторов.
+
+    cursor.execute(query, params, prepare=True) при первом вызове делает
+    PREPARE, дальше только EXECUTE, так что разбор и планирование запроса
+    на сервере не повторяются. Кэш - LRU на MAX_PREPARED операторов по
+    тексту запроса с нормализованными пробелами, вытесненные операторы
+    освобождаются через DEALLOCATE. Подготовленные операторы живут в
+    сессии, поэтому новое соединение начинает с пустым кэшем, а если
+    сервер их потерял (DISCARD ALL), запрос подготавливается заново.
+    Внутри открытой транзакции оператор выполняется после точки сохранения,
+    поэтому и тогда неудачный PREPARE или EXECUTE откатывается без потери
+    транзакции.
+    """
+
+    MAX_PREPARED = 64
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = PreparingCursor
+        self.prepared = OrderedDict()
+        self.unpreparable = set()
+        self._statement_numbers = itertools.count(1)
+        self.prepare_stats = {'prepared': 0, 'hits': 0, 'evicted': 0}
+
+    def execute_prepared(self, cursor, query, params=None):
+        key = " ".join(query.split())
+        if key in self.unpreparable:
+            return psycopg2.extensions.cursor.execute(cursor, query, params)
+
+        # Ошибка вне транзакции ничего не откатывает, её можно повторить.
+        # В транзакции откатываться можно только до точки сохранения
+        in_transaction = self.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        if in_transaction:
+            self._control("SAVEPOINT prepared_statement")
+        result = self._execute_prepared(cursor, key, query, params, in_transaction)
+        if in_transaction:
+            self._control("RELEASE SAVEPOINT prepared_statement")
+        return result
+
+    def _control(self, statement):
+        # Отдельный курсор, чтобы не затереть результат запроса в cursor
+        with psycopg2.extensions.cursor(self) as control:
+            control.execute(statement)
+
+    def _undo(self, in_transaction):
+        """Откатить неудачный оператор"""
+        if in_transaction:
+            self._control("ROLLBACK TO SAVEPOINT prepared_statement")
+        else:
+            self.rollback()
+
+    def _execute_prepared(self, cursor, key, query, params, in_transaction, retry=True):
+        entry = self.prepared.get(key)
+        if entry is None:
+            text, names = to_prepared_sql(query)
+            name = f"ps_{next(self._statement_numbers)}"
+            while len(self.prepared) >= self.MAX_PREPARED:
+                _, (evicted, _) = self.prepared.popitem(last=False)
+                psycopg2.extensions.cursor.execute(cursor, f"DEALLOCATE {evicted}")
+                self.prepare_stats['evicted'] += 1
+            try:
+                psycopg2.extensions.cursor.execute(cursor, f"PREPARE {name} AS {text}")
+            except psycopg2.Error as e:
+                if not (e.pgcode and e.pgcode.startswith('42')):
+                    raise
+                # Сервер не может вывести типы параметров - выполняем как обычно
+                self._undo(in_transaction)
+                self.unpreparable.add(key)
+                return psycopg2.extensions.cursor.execute(cursor, query, params)
+            entry = self.prepared[key] = (name, names)
+            self.prepare_stats['prepared'] += 1
+        else:
+            self.prepared.move_to_end(key)
+            self.prepare_stats['hits'] += 1
+
+        name, names = entry
+        if not names:
+            args = []
+        elif names[0] is None:
+            args = list(params)
+        else:
+            args = [params[param_name] for param_name in names]
+
+        statement = f"EXECUTE {name}"
+        if args:
+            statement += " (" + ", ".join(["%s"] * len(args)) + ")"
+        try:
+            return psycopg2.extensions.cursor.execute(cursor, statement, args)
+        except psycopg2.Error as e:
+            if not (retry and e.pgcode == errorcodes.INVALID_SQL_STATEMENT_NAME):
+                raise
+            self._undo(in_transaction)
+            self.prepared.clear()
+            return self._execute_prepared(cursor, key, query, params, in_transaction, retry=False)
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений PostgreSQL.
+
+    Держит от min_size до max_size соединений. Если все соединения заняты,
+    getconn ждёт освобождения не дольше timeout секунд. Перед выдачей
+    соединение проверяется: закрытые отбрасываются, а давно простаивавшие
+    пингуются запросом SELECT 1.
+    """
+
+    def __init__(self, min_size=1, max_size=10, timeout=5.0, ping_interval=30.0, **connect_kwargs):
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.connect_kwargs = connect_kwargs
+        self._condition = threading.Condition()
+        self._idle = []
+        self._last_used = {}
+        self._size = 0
+        self._closed = False
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'exhausted': 0,
+            'created': 0,
+            'discarded': 0,
+        }
+
+        for _ in range(self.min_size):
+            self._size += 1
+            self._idle.append(self._open())
+
+    def _open(self):
+        connection = psycopg2.connect(**self.connect_kwargs)
+        with self._condition:
+            self.stats['created'] += 1
+        return connection
+
+    def _is_healthy(self, connection):
+        if connection.closed:
+            return False
+        idle_for = time.monotonic() - self._last_used.get(connection, 0.0)
+        if idle_for < self.ping_interval:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection):
+        with self._condition:
+            self._last_used.pop(connection, None)
+            self.stats['discarded'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout=None):
+        """Взять соединение из пула (ждёт, если пул исчерпан)"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolExhaustedError("Пул соединений закрыт")
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Резервируем место, само соединение откроем вне блокировки
+                    self._size += 1
+                    connection = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if not waited:
+                    self.stats['waits'] += 1
+                    waited = True
+                if remaining <= 0:
+                    self.stats['exhausted'] += 1
+                    raise PoolExhaustedError(
+                        f"Нет свободных соединений ({self.max_size}) за {timeout:.1f} с"
+                    )
+                self._condition.wait(remaining)
+
+            self.stats['checkouts'] += 1
+            if waited:
+                self.stats['wait_time'] += time.monotonic() - started
+
+        if connection is not None and not self._is_healthy(connection):
+            self._discard(connection)
+            connection = None
+
+        if connection is None:
+            try:
+                connection = self._open()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+        return connection
+
+    def putconn(self, connection, discard=False):
+        """Вернуть соединение в пул"""
+        if not discard and not connection.closed:
+            try:
+                if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                discard = True
+
+        with self._condition:
+            if discard or self._closed or connection.closed:
+                self._size -= 1
+                self._discard(connection)
+            else:
+                self._last_used[connection] = time.monotonic()
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def get_stats(self):
+        """Снимок статистики пула"""
+        with self._condition:
+            stats = dict(self.stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+        return stats
+
+    def closeall(self):
+        """Закрыть все соединения пула"""
+        with self._condition:
+            self._closed = True
+            for connection in self._idle:
+                self._discard(connection)
+            self._size -= len(self._idle)
+            self._idle = []
+            self._condition.notify_all()
+
+
+def make_prefix_tsquery(text):
+    """Строка для to_tsquery: каждое слово ищется по префиксу, слова через AND"""
+    words = re.findall(r'\w+', text.lower())
+    return ' & '.join(f'{word}:*' for word in words)
 
 
+def escape_like(text):
+    """Экранировать спецсимволы шаблона LIKE"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class QueryCancelToken:
+    """Позволяет прервать на сервере запросы, выполняемые под этим токеном"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = []
+        self.cancelled = False
+
+    def attach(self, connection):
+        with self._lock:
+            if self.cancelled:
+                raise psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+            self._connections.append(connection)
+
+    def detach(self, connection):
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+
+    def cancel(self):
+        """Отменить выполняющийся запрос (connection.cancel() потокобезопасен).
+
+        Отмена идёт под той же блокировкой, что и detach: соединение, уже
+        возвращённое в пул, не может получить отмену, предназначенную для
+        запроса предыдущего владельца.
+        """
+        with self._lock:
+            self.cancelled = True
+            for connection in self._connections:
+                try:
+                    connection.cancel()
+                except Exception as e:
+                    print(f"Error cancelling query: {e}")
+
+
+class EntityCache:
+    """Потокобезопасный LRU-кэш строк по первичному ключу (identity map).
+
+    Запись - (вид, ключ): 'product' - строка админки как в get_all_products_page,
+    'category' - как в get_all_categories_with_parents, 'user' - как в
+    get_all_users_page, 'list' - небольшие справочники (корневые категории).
+    Хранится не больше capacity записей, вытесняются давно не читанные.
+    Записи видов из ttls живут не дольше заданного числа секунд: их изменения
+    в других клиентах не приходят уведомлениями.
+
+    Методы записи DatabaseManager сбрасывают только затронутые записи. Чтобы
+    ответ запроса, начатого до сброса, не вернул в кэш старую строку, put
+    принимает поколение вида, взятое до запроса, и ничего не кладёт, если
+    с тех пор вид сбрасывался.
+    """
+
+    def __init__(self, capacity=10000, ttls=None):
+        self.capacity = capacity
+        self.ttls = dict(ttls or {})
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Момент (time.monotonic), после которого запись вида из ttls устарела
+        self._expires = {}
+        self._generations = {}
+        self.stats = {}
+
+    def _kind_stats(self, kind):
+        return self.stats.setdefault(kind, {'hits': 0, 'misses': 0, 'evictions': 0,
+                                            'invalidations': 0, 'expirations': 0})
+
+    def _lookup(self, entry):
+        """Значение записи или None, если её нет или она устарела; вызывать под _lock"""
+        value = self._entries.get(entry)
+        expires = self._expires.get(entry)
+        if value is not None and expires is not None and time.monotonic() >= expires:
+            del self._entries[entry]
+            del self._expires[entry]
+            self._kind_stats(entry[0])['expirations'] += 1
+            return None
+        return value
+
+    def generation(self, kind):
+        with self._lock:
+            return self._generations.get(kind, 0)
+
+    def get(self, kind, key):
+        """Значение из кэша или None; учитывается в попаданиях и промахах"""
+        with self._lock:
+            value = self._lookup((kind, key))
+            if value is None:
+                self._kind_stats(kind)['misses'] += 1
+                return None
+            self._entries.move_to_end((kind, key))
+            self._kind_stats(kind)['hits'] += 1
+            return value
+
+    def peek(self, kind, key):
+        """Значение без учёта в статистике и без изменения порядка LRU"""
+        with self._lock:
+            return self._lookup((kind, key))
+
+    def put(self, kind, key, value, generation=None):
+        self.put_many(kind, [(key, value)], generation)
+
+    def put_rows(self, kind, rows, generation=None):
+        """Запомнить строки, ключ - первый столбец"""
+        self.put_many(kind, ((row[0], row) for row in rows), generation)
+
+    def put_many(self, kind, items, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generations.get(kind, 0):
+                return
+            ttl = self.ttls.get(kind)
+            expires = time.monotonic() + ttl if ttl is not None else None
+            for key, value in items:
+                self._entries[(kind, key)] = value
+                self._entries.move_to_end((kind, key))
+                if expires is not None:
+                    self._expires[(kind, key)] = expires
+            while len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                self._expires.pop(evicted, None)
+                self._kind_stats(evicted[0])['evictions'] += 1
+
+    def invalidate(self, kind, keys=None, where=None):
+        """Сбросить записи вида: ключи keys, строки, для которых where(строка), или все"""
+        with self._lock:
+            self._generations[kind] = self._generations.get(kind, 0) + 1
+            stale = [entry for entry, value in self._entries.items()
+                     if entry[0] == kind
+                     and (keys is None or entry[1] in keys)
+                     and (where is None or where(value))]
+            for entry in stale:
+                del self._entries[entry]
+                self._expires.pop(entry, None)
+            self._kind_stats(kind)['invalidations'] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            for kind in {entry[0] for entry in self._entries}:
+                self._generations[kind] = self._generations.get(kind, 0) + 1
+            self._entries.clear()
+            self._expires.clear()
+
+    def get_stats(self):
+        """Снимок статистики по видам: попадания, промахи, доля попаданий, размер"""
+        with self._lock:
+            sizes = {}
+            for kind, _ in self._entries:
+                sizes[kind] = sizes.get(kind, 0) + 1
+            stats = {}
+            for kind, counters in self.stats.items():
+                lookups = counters['hits'] + counters['misses']
+                stats[kind] = dict(counters, size=sizes.get(kind, 0),
+                                   hit_ratio=counters['hits'] / lookups if lookups else 0.0)
+            return stats
+
+
+@instrument_methods('borrow', 'cancel_scope', 'get_pool_stats', 'get_cache_stats', 'invalidate_products')
 class DatabaseManager:
+    # Размер страницы для get_*_page по умолчанию
+    PAGE_SIZE = 100
+    # Попыток оформить заказ при ошибках сериализации и взаимоблокировках
+    ORDER_ATTEMPTS = 5
+    # Товаров в одной пачке get_catalog_changes
+    CATALOG_SYNC_BATCH = 5000
+    # Канал pg_notify с id изменённых товаров (см. notify_product_changes)
+    PRODUCT_CHANGES_CHANNEL = 'product_changes'
+    # Сколько изменений счётчиков дашборда может накопиться до переноса
+    # в stats_counters (см. fold_stats_deltas_if_needed)
+    STATS_FOLD_THRESHOLD = 1000
+    # Секунд жизни категорий в entity_cache: об их изменениях в других
+    # клиентах сервер не уведомляет
+    CATEGORY_CACHE_TTL = 60
+
     def __init__(self):
         self.connection = None
+        self.pool = None
         self.current_user = None
+        # Адрес сервера, по нему различаются локальные снимки каталога
+        self.server_name = None
+        self._connect_params = None
+        # 'fulltext' - tsvector с ранжированием и триграммный поиск опечаток,
+        # 'ilike' - прежний поиск подстроки без индексов
+        self.search_mode = 'fulltext'
+        self._connection_lock = threading.RLock()
+        self._local = threading.local()
+        # Строки товаров, категорий и пользователей по id
+        self.entity_cache = EntityCache(ttls={'category': self.CATEGORY_CACHE_TTL,
+                                              'list': self.CATEGORY_CACHE_TTL})
 
     def connect(self, host="localhost", database="electronics_store",
-                user="postgres", password="password", port="5432"):
+                user="postgres", password="password", port="5432",
+                pool_min=None, pool_max=None):
+        """Подключиться к базе; при заданном pool_max включается режим пула"""
         try:
-            self.connection = psycopg2.connect(
+            params = dict(
                 host=host,
                 database=database,
                 user=user,
                 password=password,
                 port=port
             )
+            params['connection_factory'] = PreparedStatementConnection
+            self.connection = psycopg2.connect(**params)
+            self.server_name = f"{user}@{host}:{port}/{database}"
+            self._connect_params = dict(host=host, database=database, user=user,
+                                        password=password, port=port)
+            if pool_max:
+                self.pool = ConnectionPool(min_size=pool_min or 1, max_size=pool_max, **params)
             return True
         except Exception as e:
             print(f"Database connection error: {e}")
             return False
 
-    def authenticate(self, email, password):
+    @contextmanager
+    def borrow(self):
+        """Выдаёт соединение для одного обращения к базе.
+
+        В режиме пула каждый поток получает собственное соединение,
+        без пула все обращения идут через общее соединение по очереди.
+        При исключении транзакция откатывается. Незавершённая транзакция
+        (после чтения) по выходу откатывается и на общем соединении, как
+        в пуле, чтобы каждое обращение начиналось вне транзакции.
+        """
+        token = getattr(self._local, 'cancel_token', None)
+
+        if self.pool is None:
+            with self._connection_lock:
+                depth = getattr(self._local, 'borrow_depth', 0)
+                self._local.borrow_depth = depth + 1
+                try:
+                    if token:
+                        token.attach(self.connection)
+                    yield self.connection
+                except Exception:
+                    if not self.connection.closed:
+                        self.connection.rollback()
+                    raise
+                else:
+                    # Вложенное обращение не трогает транзакцию внешнего
+                    if depth == 0 and not self.connection.closed and \
+                            self.connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                        self.connection.rollback()
+                finally:
+                    self._local.borrow_depth = depth
+                    if token:
+                        token.detach(self.connection)
+            return
+
+        connection = self.pool.getconn()
+        try:
+            if token:
+                token.attach(connection)
+            yield connection
+        finally:
+            if token:
+                token.detach(connection)
+            self.pool.putconn(connection)
+
+    @contextmanager
+    def cancel_scope(self, token):
+        """Привязать токен отмены к запросам текущего потока"""
+        previous = getattr(self._local, 'cancel_token', None)
+        self._local.cancel_token = token
         try:
-            cursor = self.connection.cursor()
+            yield token
+        finally:
+            self._local.cancel_token = previous
+
+    def open_listen_connection(self, *channels):
+        """Отдельное соединение в режиме autocommit, подписанное на каналы LISTEN"""
+        connection = psycopg2.connect(**self._connect_params)
+        connection.autocommit = True
+        cursor = connection.cursor()
+        for channel in channels:
+            cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        cursor.close()
+        return connection
+
+    def get_pool_stats(self):
+        """Статистика пула соединений (None, если пул не используется)"""
+        return self.pool.get_stats() if self.pool else None
+
+    def get_cache_stats(self):
+        """Статистика кэша сущностей по видам"""
+        return self.entity_cache.get_stats()
+
+    def invalidate_products(self, product_ids=None):
+        """Сбросить кэш товаров product_ids (None - всех), например по уведомлению сервера"""
+        self.entity_cache.invalidate('product', product_ids)
+
+    def close(self):
+        if self.pool:
+            self.pool.closeall()
+        if self.connection and not self.connection.closed:
+            self.connection.close()
 
+    def authenticate(self, email, password):
+        import hashlib
+
+        try:
             # Для демонстрации используем простую проверку
             password_hash_md5 = hashlib.md5(password.encode()).hexdigest()
 
@@ -67,9 +859,11 @@ class DatabaseManager:
             AND (u.password_hash = %s OR u.password_hash = %s)
             """
 
-            cursor.execute(query, (email, password_hash_md5, password))
-            result = cursor.fetchone()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (email, password_hash_md5, password), prepare=True)
+                result = cursor.fetchone()
+                cursor.close()
 
             if result:
                 self.current_user = {
@@ -86,54 +880,220 @@ class DatabaseManager:
             print(f"Authentication error: {e}")
             return False
 
-    def get_products(self, category_id=None, search_text=None):
-        try:
-            cursor = self.connection.cursor()
-            query = """
+    def _catalog_query(self, category_id, search_text, extra_columns=""):
+        """Запрос каталога без ORDER BY: (query, params, order_by, order_params)"""
+        query = f"""
             SELECT p.product_id, p.name, p.description, p.price, c.name as category_name,
                    i.quantity - i.reserved_quantity as available_quantity,
-                   pi.image_url as image_url
+                   pi.image_url as image_url{extra_columns}
             FROM products p
             JOIN categories c ON p.category_id = c.category_id
             JOIN inventory i ON p.product_id = i.product_id
             LEFT JOIN product_images pi ON p.product_id = pi.product_id AND pi.is_primary = TRUE
             WHERE p.is_active = TRUE
             """
-            params = []
+        params = []
+
+        if category_id:
+            query += " AND p.category_id = %s"
+            params.append(category_id)
+
+        order_by = "p.created_at DESC, p.product_id DESC"
+        order_params = []
+        if search_text:
+            condition, condition_params, order_by, order_params = self._search_clause(search_text)
+            query += " AND " + condition
+            params.extend(condition_params)
+
+        return query, params, order_by, order_params
+
+    def _fetch_page(self, query, params, limit):
+        """Выполнить запрос с LIMIT limit + 1; возвращает (строки, есть ли ещё)"""
+        with self.borrow() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query + " LIMIT %s", list(params) + [limit + 1], prepare=True)
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows[:limit], len(rows) > limit
 
-            if category_id:
-                query += " AND p.category_id = %s"
-                params.append(category_id)
+    def get_products(self, category_id=None, search_text=None):
+        try:
+            query, params, order_by, order_params = self._catalog_query(category_id, search_text)
+            query += " ORDER BY " + order_by
+            params.extend(order_params)
+
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, params, prepare=True)
+                products = cursor.fetchall()
+                cursor.close()
+            return products
+        except psycopg2.extensions.QueryCanceledError:
+            # Запрос вытеснен более новым поиском
+            return []
+        except Exception as e:
+            print(f"Error getting products: {e}")
+            return []
+
+    def get_products_page(self, category_id=None, search_text=None, cursor=None, limit=None):
+        """Страница каталога: (товары, курсор следующей страницы или None).
 
+        Без поиска страницы выбираются по ключу (created_at, product_id)
+        с индексами idx_products_keyset / idx_products_category_keyset.
+        Результаты поиска упорядочены по релевантности, которую нельзя взять
+        из индекса, поэтому курсором поиска служит смещение.
+        """
+        limit = limit or self.PAGE_SIZE
+        try:
             if search_text:
-                query += " AND (p.name ILIKE %s OR p.description ILIKE %s)"
-                params.extend([f'%{search_text}%', f'%{search_text}%'])
+                offset = cursor or 0
+                query, params, order_by, order_params = self._catalog_query(category_id, search_text)
+                query += " ORDER BY " + order_by + " OFFSET %s"
+                params.extend(order_params)
+                params.append(offset)
+                products, has_more = self._fetch_page(query, params, limit)
+                return products, (offset + limit if has_more else None)
+
+            query, params, _, _ = self._catalog_query(category_id, None, extra_columns=", p.created_at")
+            if cursor:
+                query += " AND (p.created_at, p.product_id) < (%s, %s)"
+                params.extend(cursor)
+            query += " ORDER BY p.created_at DESC, p.product_id DESC"
+            rows, has_more = self._fetch_page(query, params, limit)
+
+            next_cursor = (rows[-1][-1], rows[-1][0]) if has_more else None
+            return [row[:-1] for row in rows], next_cursor
+        except psycopg2.extensions.QueryCanceledError:
+            return [], None
+        except Exception as e:
+            print(f"Error getting products page: {e}")
+            return [], None
 
-            query += " ORDER BY p.created_at DESC"
+    def get_catalog_products(self, product_ids, category_id=None, search_text=None):
+        """Строки каталога (как в get_products_page) для товаров product_ids.
 
-            cursor.execute(query, params)
-            products = cursor.fetchall()
-            cursor.close()
-            return products
+        Удалённых и неактивных товаров, а также не подходящих под category_id
+        и search_text, в результате нет. При ошибке возвращает None, чтобы её
+        нельзя было принять за удаление товаров.
+        """
+        try:
+            query, params, _, _ = self._catalog_query(category_id, search_text)
+            query += " AND p.product_id = ANY(%s)"
+            params.append(list(product_ids))
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                cursor.close()
+            return rows
         except Exception as e:
             print(f"Error getting products: {e}")
-            return []
+            return None
+
+    def _search_clause(self, search_text):
+        """Условие WHERE и порядок сортировки для поиска в текущем search_mode.
+
+        В режиме fulltext товар находится по search_vector (название и описание
+        с русской морфологией, индекс idx_products_search_vector), а опечатки
+        и части SKU ловит триграммный поиск (idx_products_name_trgm,
+        idx_products_sku_trgm). Результаты упорядочены по ts_rank. Последним
+        в порядке всегда идёт product_id: страницы поиска берутся через OFFSET,
+        и при равных ключах сортировки строки не должны повторяться или
+        пропадать между страницами.
+        """
+        pattern = f'%{escape_like(search_text)}%'
+        if self.search_mode == 'ilike':
+            return ("(p.name ILIKE %s OR p.description ILIKE %s)", [pattern, pattern],
+                    "p.created_at DESC, p.product_id DESC", [])
+
+        condition = "(%s <%% p.name OR p.sku ILIKE %s)"
+        condition_params = [search_text, pattern]
+        order_by = "word_similarity(%s, p.name) DESC, p.created_at DESC, p.product_id DESC"
+        order_params = [search_text]
+
+        ts_query = make_prefix_tsquery(search_text)
+        if ts_query:
+            condition = "(p.search_vector @@ to_tsquery('russian', %s) OR %s <%% p.name OR p.sku ILIKE %s)"
+            condition_params = [ts_query] + condition_params
+            order_by = "ts_rank(p.search_vector, to_tsquery('russian', %s)) DESC, " + order_by
+            order_params = [ts_query] + order_params
+
+        return condition, condition_params, order_by, order_params
+
+    def _root_categories(self):
+        """Корневые категории (id, название); кэш общий для каталога и диалогов админки"""
+        categories = self.entity_cache.get('list', 'root_categories')
+        if categories is None:
+            generation = self.entity_cache.generation('list')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT category_id, name FROM categories WHERE parent_category_id IS NULL",
+                               prepare=True)
+                categories = tuple(cursor.fetchall())
+                cursor.close()
+            self.entity_cache.put('list', 'root_categories', categories, generation)
+        return list(categories)
 
     def get_categories(self):
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT category_id, name FROM categories WHERE parent_category_id IS NULL")
-            categories = cursor.fetchall()
-            cursor.close()
-            return categories
+            return self._root_categories()
         except Exception as e:
             print(f"Error getting categories: {e}")
             return []
 
+    def get_catalog_changes(self, since=None, after_id=0, limit=None):
+        """Изменения каталога после метки since для CatalogSnapshot.
+
+        Возвращает (товары, id удалённых товаров, категории, время сервера)
+        или None при ошибке. Товары, включая неактивные, идут по возрастанию
+        product_id пачками по limit; следующая пачка запрашивается с after_id
+        последнего товара. Без since возвращается весь каталог. Категории
+        (все, с родителем) и удалённые товары заполняются только в первой пачке.
+        """
+        limit = limit or self.CATALOG_SYNC_BATCH
+        try:
+            query = """
+            SELECT p.product_id, p.name, p.description, p.price, p.category_id,
+                   i.quantity - i.reserved_quantity as available_quantity,
+                   pi.image_url, p.created_at, p.is_active
+            FROM products p
+            JOIN inventory i ON p.product_id = i.product_id
+            LEFT JOIN product_images pi ON p.product_id = pi.product_id AND pi.is_primary = TRUE
+            WHERE p.product_id > %s
+            """
+            params = [after_id]
+            if since:
+                # Остаток меняется без изменения товара, его метка - inventory.last_updated
+                query += " AND (p.updated_at > %s OR i.last_updated > %s)"
+                params.extend([since, since])
+            query += " ORDER BY p.product_id LIMIT %s"
+            params.append(limit)
+
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                # Не LOCALTIMESTAMP: транзакция соединения могла начаться давно
+                cursor.execute("SELECT clock_timestamp()::timestamp")
+                server_time = cursor.fetchone()[0]
+                cursor.execute(query, params)
+                products = cursor.fetchall()
+                deleted = []
+                categories = []
+                if not after_id:
+                    cursor.execute("SELECT category_id, name, parent_category_id FROM categories")
+                    categories = cursor.fetchall()
+                    if since:
+                        cursor.execute("SELECT product_id FROM deleted_products WHERE deleted_at > %s",
+                                       (since,))
+                        deleted = [row[0] for row in cursor.fetchall()]
+                cursor.close()
+            return products, deleted, categories, server_time
+        except Exception as e:
+            print(f"Error getting catalog changes: {e}")
+            return None
+
     def get_all_products(self):
         """Получить все товары для админки"""
         try:
-            cursor = self.connection.cursor()
             query = """
             SELECT p.product_id, p.name, p.description, p.price, p.cost_price, 
                    c.name as category_name, p.sku, p.is_active,
@@ -145,18 +1105,84 @@ class DatabaseManager:
             LEFT JOIN product_images pi ON p.product_id = pi.product_id AND pi.is_primary = TRUE
             ORDER BY p.created_at DESC
             """
-            cursor.execute(query)
-            products = cursor.fetchall()
-            cursor.close()
+            generation = self.entity_cache.generation('product')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query)
+                products = cursor.fetchall()
+                cursor.close()
+            self.entity_cache.put_rows('product', products, generation)
             return products
         except Exception as e:
             print(f"Error getting all products: {e}")
             return []
 
+    def _admin_products_query(self):
+        """Запрос товаров админки без WHERE; последний столбец - created_at для курсора"""
+        return """
+            SELECT p.product_id, p.name, p.description, p.price, p.cost_price, 
+                   c.name as category_name, p.sku, p.is_active,
+                   i.quantity - i.reserved_quantity as available_quantity,
+                   pi.image_url as image_url, p.created_at
+            FROM products p
+            JOIN categories c ON p.category_id = c.category_id
+            LEFT JOIN inventory i ON p.product_id = i.product_id
+            LEFT JOIN product_images pi ON p.product_id = pi.product_id AND pi.is_primary = TRUE
+            """
+
+    def get_all_products_page(self, cursor=None, limit=None):
+        """Страница товаров для админки: (товары, курсор следующей страницы или None)"""
+        limit = limit or self.PAGE_SIZE
+        try:
+            query = self._admin_products_query()
+            params = []
+            if cursor:
+                query += " WHERE (p.created_at, p.product_id) < (%s, %s)"
+                params.extend(cursor)
+            query += " ORDER BY p.created_at DESC, p.product_id DESC"
+            generation = self.entity_cache.generation('product')
+            rows, has_more = self._fetch_page(query, params, limit)
+
+            next_cursor = (rows[-1][-1], rows[-1][0]) if has_more else None
+            products = [row[:-1] for row in rows]
+            self.entity_cache.put_rows('product', products, generation)
+            return products, next_cursor
+        except Exception as e:
+            print(f"Error getting products page: {e}")
+            return [], None
+
+    def get_admin_products(self, product_ids):
+        """Строки админки (как в get_all_products_page) для товаров product_ids.
+
+        Удалённых товаров в результате нет. При ошибке возвращает None,
+        чтобы её нельзя было принять за удаление товаров.
+        """
+        try:
+            query = self._admin_products_query() + " WHERE p.product_id = ANY(%s)"
+            generation = self.entity_cache.generation('product')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (list(product_ids),))
+                rows = cursor.fetchall()
+                cursor.close()
+            products = [row[:-1] for row in rows]
+            self.entity_cache.put_rows('product', products, generation)
+            return products
+        except Exception as e:
+            print(f"Error getting products: {e}")
+            return None
+
+    def get_product(self, product_id):
+        """Строка товара для админки (как в get_all_products_page) или None"""
+        product = self.entity_cache.get('product', product_id)
+        if product is not None:
+            return product
+        products = self.get_admin_products([product_id])
+        return products[0] if products else None
+
     def get_all_users(self):
         """Получить всех пользователей для админки"""
         try:
-            cursor = self.connection.cursor()
             query = """
             SELECT u.user_id, u.email, u.role, u.created_at, u.last_login, u.is_active,
                    c.first_name, c.last_name, c.phone
@@ -164,18 +1190,72 @@ class DatabaseManager:
             LEFT JOIN customers c ON u.user_id = c.user_id
             ORDER BY u.created_at DESC
             """
-            cursor.execute(query)
-            users = cursor.fetchall()
-            cursor.close()
+            generation = self.entity_cache.generation('user')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query)
+                users = cursor.fetchall()
+                cursor.close()
+            self.entity_cache.put_rows('user', users, generation)
             return users
         except Exception as e:
             print(f"Error getting users: {e}")
             return []
 
+    def get_all_users_page(self, cursor=None, limit=None):
+        """Страница пользователей для админки: (пользователи, курсор или None)"""
+        limit = limit or self.PAGE_SIZE
+        try:
+            query = """
+            SELECT u.user_id, u.email, u.role, u.created_at, u.last_login, u.is_active,
+                   c.first_name, c.last_name, c.phone
+            FROM users u
+            LEFT JOIN customers c ON u.user_id = c.user_id
+            """
+            params = []
+            if cursor:
+                query += " WHERE (u.created_at, u.user_id) < (%s, %s)"
+                params.extend(cursor)
+            query += " ORDER BY u.created_at DESC, u.user_id DESC"
+            generation = self.entity_cache.generation('user')
+            users, has_more = self._fetch_page(query, params, limit)
+            self.entity_cache.put_rows('user', users, generation)
+
+            next_cursor = (users[-1][3], users[-1][0]) if has_more else None
+            return users, next_cursor
+        except Exception as e:
+            print(f"Error getting users page: {e}")
+            return [], None
+
+    def get_user(self, user_id):
+        """Строка пользователя (как в get_all_users_page) или None"""
+        user = self.entity_cache.get('user', user_id)
+        if user is not None:
+            return user
+        try:
+            query = """
+            SELECT u.user_id, u.email, u.role, u.created_at, u.last_login, u.is_active,
+                   c.first_name, c.last_name, c.phone
+            FROM users u
+            LEFT JOIN customers c ON u.user_id = c.user_id
+            WHERE u.user_id = %s
+            """
+            generation = self.entity_cache.generation('user')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (user_id,), prepare=True)
+                user = cursor.fetchone()
+                cursor.close()
+            if user:
+                self.entity_cache.put('user', user_id, user, generation)
+            return user
+        except Exception as e:
+            print(f"Error getting user: {e}")
+            return None
+
     def get_all_categories_with_parents(self):
         """Получить все категории с информацией о родительских категориях"""
         try:
-            cursor = self.connection.cursor()
             query = """
             SELECT c1.category_id, c1.name, c1.description, 
                    c2.name as parent_category, c1.created_at, c1.parent_category_id
@@ -183,67 +1263,178 @@ class DatabaseManager:
             LEFT JOIN categories c2 ON c1.parent_category_id = c2.category_id
             ORDER BY c1.created_at DESC
             """
-            cursor.execute(query)
-            categories = cursor.fetchall()
-            cursor.close()
+            generation = self.entity_cache.generation('category')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query)
+                categories = cursor.fetchall()
+                cursor.close()
+            self.entity_cache.put_rows('category', categories, generation)
             return categories
         except Exception as e:
             print(f"Error getting categories: {e}")
             return []
 
+    def get_category(self, category_id):
+        """Строка категории (как в get_all_categories_with_parents) или None"""
+        category = self.entity_cache.get('category', category_id)
+        if category is not None:
+            return category
+        try:
+            query = """
+            SELECT c1.category_id, c1.name, c1.description, 
+                   c2.name as parent_category, c1.created_at, c1.parent_category_id
+            FROM categories c1
+            LEFT JOIN categories c2 ON c1.parent_category_id = c2.category_id
+            WHERE c1.category_id = %s
+            """
+            generation = self.entity_cache.generation('category')
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (category_id,), prepare=True)
+                category = cursor.fetchone()
+                cursor.close()
+            if category:
+                self.entity_cache.put('category', category_id, category, generation)
+            return category
+        except Exception as e:
+            print(f"Error getting category: {e}")
+            return None
+
     def get_all_parent_categories(self):
         """Получить все родительские категории"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT category_id, name FROM categories WHERE parent_category_id IS NULL")
-            categories = cursor.fetchall()
-            cursor.close()
-            return categories
+            return self._root_categories()
         except Exception as e:
             print(f"Error getting parent categories: {e}")
             return []
 
-    def create_order(self, customer_id, items, shipping_address_id, payment_method='card'):
+    def get_cart(self, customer_id):
+        """Сохранённая корзина: [(product_id, название, количество, цена)] или None при ошибке"""
         try:
-            cursor = self.connection.cursor()
+            query = """
+            SELECT c.product_id, p.name, c.quantity, c.price
+            FROM carts c
+            JOIN products p ON p.product_id = c.product_id
+            WHERE c.customer_id = %s
+            ORDER BY c.added_at, c.product_id
+            """
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (customer_id,), prepare=True)
+                lines = cursor.fetchall()
+                cursor.close()
+            return lines
+        except Exception as e:
+            print(f"Error getting cart: {e}")
+            return None
 
-            # Calculate total amount
-            total_amount = sum(item['price'] * item['quantity'] for item in items)
+    def save_cart(self, customer_id, lines, clear=False):
+        """Записать изменения корзины одной транзакцией.
 
-            # Create order
-            order_query = """
-            INSERT INTO orders (customer_id, total_amount, shipping_address_id, payment_method)
-            VALUES (%s, %s, %s, %s) RETURNING order_id
+        lines - {product_id: (количество, цена)}, количество 0 удаляет позицию.
+        С clear=True сначала удаляется вся сохранённая корзина. Позиции
+        с уже удалёнными товарами пропускаются.
+        """
+        try:
+            removed = [product_id for product_id, (quantity, _) in lines.items() if quantity <= 0]
+            kept = [(product_id, quantity, price) for product_id, (quantity, price) in lines.items()
+                    if quantity > 0]
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                if clear:
+                    cursor.execute("DELETE FROM carts WHERE customer_id = %s", (customer_id,))
+                if removed:
+                    cursor.execute("DELETE FROM carts WHERE customer_id = %s AND product_id = ANY(%s)",
+                                   (customer_id, removed))
+                if kept:
+                    product_ids, quantities, prices = zip(*kept)
+                    cursor.execute("""
+                        INSERT INTO carts (customer_id, product_id, quantity, price)
+                        SELECT %s, l.product_id, l.quantity, l.price
+                        FROM unnest(%s::int[], %s::int[], %s::numeric[]) AS l(product_id, quantity, price)
+                        JOIN products p ON p.product_id = l.product_id
+                        ON CONFLICT (customer_id, product_id)
+                        DO UPDATE SET quantity = EXCLUDED.quantity, price = EXCLUDED.price
+                    """, (customer_id, list(product_ids), list(quantities), list(prices)))
+                connection.commit()
+                cursor.close()
+            return True
+        except Exception as e:
+            print(f"Error saving cart: {e}")
+            return False
+
+    def validate_cart(self, product_ids):
+        """Текущие цены и остатки товаров корзины одним запросом.
+
+        Возвращает {product_id: (название, цена, активен, доступно)} или None
+        при ошибке; удалённых товаров в словаре нет.
+        """
+        try:
+            query = """
+            SELECT p.product_id, p.name, p.price, p.is_active,
+                   COALESCE(i.quantity - i.reserved_quantity, 0)
+            FROM products p
+            LEFT JOIN inventory i ON i.product_id = p.product_id
+            WHERE p.product_id = ANY(%s)
             """
-            cursor.execute(order_query, (customer_id, total_amount, shipping_address_id, payment_method))
-            order_id = cursor.fetchone()[0]
-
-            # Add order items
-            for item in items:
-                item_query = """
-                INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-                VALUES (%s, %s, %s, %s)
-                """
-                cursor.execute(item_query, (order_id, item['product_id'], item['quantity'], item['price']))
-
-                # Update inventory
-                update_inventory = """
-                UPDATE inventory SET reserved_quantity = reserved_quantity + %s
-                WHERE product_id = %s
-                """
-                cursor.execute(update_inventory, (item['quantity'], item['product_id']))
-
-            self.connection.commit()
-            cursor.close()
-            return order_id
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (list(product_ids),))
+                rows = cursor.fetchall()
+                cursor.close()
+            return {row[0]: row[1:] for row in rows}
         except Exception as e:
-            self.connection.rollback()
-            print(f"Error creating order: {e}")
+            print(f"Error validating cart: {e}")
             return None
 
+    def create_order(self, customer_id, items, shipping_address_id=None, payment_method='card'):
+        """Оформить заказ одним вызовом place_order.
+
+        Позиции, резерв на складе и сумма заказа (по subtotal позиций)
+        записываются на сервере в одной транзакции. Без shipping_address_id
+        используется адрес клиента по умолчанию. Ошибки сериализации и
+        взаимоблокировки повторяются с нарастающей задержкой. Если товара
+        не хватает, выбрасывается InsufficientStockError.
+        """
+        # psycopg2.extras нужен только при оформлении заказа
+        from psycopg2.extras import Json
+
+        # Цена строкой, чтобы Decimal дошёл до сервера без потери точности
+        order_items = [{'product_id': item['product_id'],
+                        'quantity': item['quantity'],
+                        'price': str(item['price'])} for item in items]
+
+        for attempt in range(1, self.ORDER_ATTEMPTS + 1):
+            try:
+                with self.borrow() as connection:
+                    cursor = connection.cursor()
+                    cursor.execute(
+                        "SELECT place_order(%s, %s, %s, %s)",
+                        (customer_id, shipping_address_id, payment_method, Json(order_items))
+                    )
+                    order_id = cursor.fetchone()[0]
+                    connection.commit()
+                    cursor.close()
+                # Остатки заказанных товаров изменились
+                self.invalidate_products({item['product_id'] for item in items})
+                return order_id
+            except psycopg2.Error as e:
+                if e.pgcode == INSUFFICIENT_STOCK_PGCODE:
+                    raise InsufficientStockError(json.loads(e.diag.message_detail)) from e
+                if e.pgcode in RETRYABLE_PGCODES and attempt < self.ORDER_ATTEMPTS:
+                    # Экспоненциальная задержка со случайным разбросом
+                    import random
+                    time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+                    continue
+                print(f"Error creating order: {e}")
+                return None
+            except Exception as e:
+                print(f"Error creating order: {e}")
+                return None
+
     def get_user_orders(self, customer_id):
         try:
-            cursor = self.connection.cursor()
             query = """
             SELECT o.order_id, o.order_date, o.status, o.total_amount, 
                    COUNT(oi.order_item_id) as items_count
@@ -253,9 +1444,11 @@ class DatabaseManager:
             GROUP BY o.order_id
             ORDER BY o.order_date DESC
             """
-            cursor.execute(query, (customer_id,))
-            orders = cursor.fetchall()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (customer_id,), prepare=True)
+                orders = cursor.fetchall()
+                cursor.close()
             return orders
         except Exception as e:
             print(f"Error getting user orders: {e}")
@@ -264,7 +1457,6 @@ class DatabaseManager:
     def get_all_orders(self):
         """Получить все заказы для администратора/менеджера"""
         try:
-            cursor = self.connection.cursor()
             query = """
             SELECT o.order_id, o.order_date, o.status, o.total_amount, 
                    COUNT(oi.order_item_id) as items_count,
@@ -275,413 +1467,2044 @@ class DatabaseManager:
             GROUP BY o.order_id, c.customer_id
             ORDER BY o.order_date DESC
             """
-            cursor.execute(query)
-            orders = cursor.fetchall()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query)
+                orders = cursor.fetchall()
+                cursor.close()
             return orders
         except Exception as e:
             print(f"Error getting all orders: {e}")
             return []
 
-    def get_sales_report(self):
+    def get_all_orders_page(self, cursor=None, limit=None):
+        """Страница заказов для администратора: (заказы, курсор или None).
+
+        Сначала по индексу idx_orders_keyset выбирается страница заказов,
+        и только для неё считается число позиций.
+        """
+        limit = limit or self.PAGE_SIZE
         try:
-            cursor = self.connection.cursor()
             query = """
-            SELECT 
-                DATE(o.order_date) as order_day,
-                COUNT(o.order_id) as order_count,
-                SUM(o.total_amount) as total_sales,
-                AVG(o.total_amount) as avg_order_value
+            SELECT o.order_id, o.order_date, o.status, o.total_amount, 
+                   (SELECT COUNT(*) FROM order_items oi WHERE oi.order_id = o.order_id) as items_count,
+                   c.first_name || ' ' || c.last_name as customer_name
             FROM orders o
-            WHERE o.order_date >= CURRENT_DATE - INTERVAL '30 days'
-            GROUP BY DATE(o.order_date)
+            JOIN customers c ON o.customer_id = c.customer_id
+            """
+            params = []
+            if cursor:
+                query += " WHERE (o.order_date, o.order_id) < (%s, %s)"
+                params.extend(cursor)
+            query += " ORDER BY o.order_date DESC, o.order_id DESC"
+            orders, has_more = self._fetch_page(query, params, limit)
+
+            next_cursor = (orders[-1][1], orders[-1][0]) if has_more else None
+            return orders, next_cursor
+        except Exception as e:
+            print(f"Error getting orders page: {e}")
+            return [], None
+
+    def get_sales_report(self):
+        """Продажи по дням за 30 дней из mv_daily_sales"""
+        try:
+            query = """
+            SELECT order_day, order_count, total_sales, avg_order_value
+            FROM mv_daily_sales
+            WHERE order_day >= CURRENT_DATE - INTERVAL '30 days'
             ORDER BY order_day
             """
-            cursor.execute(query)
-            report = cursor.fetchall()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query)
+                report = cursor.fetchall()
+                cursor.close()
             return report
         except Exception as e:
             print(f"Error getting sales report: {e}")
             return []
 
     def get_category_sales(self):
-        """Получить продажи по категориям"""
+        """Получить продажи по категориям из mv_category_sales_daily"""
         try:
-            cursor = self.connection.cursor()
             query = """
-            SELECT 
-                c.name as category,
-                SUM(oi.quantity) as total_sold,
-                SUM(oi.quantity * oi.unit_price) as revenue
-            FROM categories c
-            JOIN products p ON c.category_id = p.category_id
-            JOIN order_items oi ON p.product_id = oi.product_id
-            JOIN orders o ON oi.order_id = o.order_id
-            WHERE o.status != 'cancelled'
-            GROUP BY c.category_id, c.name
+            SELECT category, SUM(total_sold) as total_sold, SUM(revenue) as revenue
+            FROM mv_category_sales_daily
+            GROUP BY category_id, category
             ORDER BY revenue DESC
             """
-            cursor.execute(query)
-            report = cursor.fetchall()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query)
+                report = cursor.fetchall()
+                cursor.close()
             return report
         except Exception as e:
             print(f"Error getting category sales: {e}")
             return []
 
+    def get_reports_refreshed_at(self):
+        """Время последнего обновления материализованных отчётов или None"""
+        try:
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT MIN(refreshed_at) FROM report_refreshes")
+                refreshed_at = cursor.fetchone()[0]
+                cursor.close()
+            return refreshed_at
+        except Exception as e:
+            print(f"Error getting reports refresh time: {e}")
+            return None
+
+    def refresh_sales_reports(self, max_age=0):
+        """Обновить отчёты, если они старше max_age секунд; вернуть время обновления"""
+        try:
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT refresh_sales_reports(%s)", (timedelta(seconds=max_age),))
+                refreshed_at = cursor.fetchone()[0]
+                connection.commit()
+                cursor.close()
+            return refreshed_at
+        except Exception as e:
+            print(f"Error refreshing sales reports: {e}")
+            return None
+
     def update_product(self, product_id, name, description, price, cost_price, category_id, sku, is_active):
         """Обновить товар"""
         try:
-            cursor = self.connection.cursor()
             query = """
             UPDATE products 
             SET name = %s, description = %s, price = %s, cost_price = %s, 
                 category_id = %s, sku = %s, is_active = %s, updated_at = CURRENT_TIMESTAMP
             WHERE product_id = %s
             """
-            cursor.execute(query, (name, description, price, cost_price, category_id, sku, is_active, product_id))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (name, description, price, cost_price, category_id, sku, is_active, product_id))
+                connection.commit()
+                cursor.close()
+            self.invalidate_products({product_id})
             return True
         except Exception as e:
-            self.connection.rollback()
             print(f"Error updating product: {e}")
             return False
 
     def add_product(self, name, description, price, cost_price, category_id, sku, image_url=None):
         """Добавить новый товар"""
         try:
-            cursor = self.connection.cursor()
             query = """
             INSERT INTO products (name, description, price, cost_price, category_id, sku)
             VALUES (%s, %s, %s, %s, %s, %s) RETURNING product_id
             """
-            cursor.execute(query, (name, description, price, cost_price, category_id, sku))
-            product_id = cursor.fetchone()[0]
-
-            # Добавляем изображение если указано
-            if image_url:
-                image_query = """
-                INSERT INTO product_images (product_id, image_url, is_primary)
-                VALUES (%s, %s, TRUE)
-                """
-                cursor.execute(image_query, (product_id, image_url))
-
-            self.connection.commit()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (name, description, price, cost_price, category_id, sku))
+                product_id = cursor.fetchone()[0]
+
+                # Добавляем изображение если указано
+                if image_url:
+                    image_query = """
+                    INSERT INTO product_images (product_id, image_url, is_primary)
+                    VALUES (%s, %s, TRUE)
+                    """
+                    cursor.execute(image_query, (product_id, image_url))
+
+                connection.commit()
+                cursor.close()
             return product_id
         except Exception as e:
-            self.connection.rollback()
             print(f"Error adding product: {e}")
             return None
 
     def update_product_images(self, product_id, image_url):
         """Обновить изображение товара"""
         try:
-            cursor = self.connection.cursor()
-
-            # Проверяем есть ли уже основное изображение
-            cursor.execute("""
-                SELECT image_id FROM product_images 
-                WHERE product_id = %s AND is_primary = TRUE
-            """, (product_id,))
-            existing_image = cursor.fetchone()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
 
-            if existing_image:
-                # Обновляем существующее изображение
-                cursor.execute("""
-                    UPDATE product_images 
-                    SET image_url = %s 
-                    WHERE image_id = %s
-                """, (image_url, existing_image[0]))
-            else:
-                # Добавляем новое изображение
+                # Проверяем есть ли уже основное изображение
                 cursor.execute("""
-                    INSERT INTO product_images (product_id, image_url, is_primary)
-                    VALUES (%s, %s, TRUE)
-                """, (product_id, image_url))
-
-            self.connection.commit()
-            cursor.close()
+                    SELECT image_id FROM product_images 
+                    WHERE product_id = %s AND is_primary = TRUE
+                """, (product_id,))
+                existing_image = cursor.fetchone()
+
+                if existing_image:
+                    # Обновляем существующее изображение
+                    cursor.execute("""
+                        UPDATE product_images 
+                        SET image_url = %s 
+                        WHERE image_id = %s
+                    """, (image_url, existing_image[0]))
+                else:
+                    # Добавляем новое изображение
+                    cursor.execute("""
+                        INSERT INTO product_images (product_id, image_url, is_primary)
+                        VALUES (%s, %s, TRUE)
+                    """, (product_id, image_url))
+
+                connection.commit()
+                cursor.close()
+            self.invalidate_products({product_id})
             return True
         except Exception as e:
-            self.connection.rollback()
             print(f"Error updating product images: {e}")
             return False
 
     def delete_product(self, product_id):
         """Удалить товар"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM products WHERE product_id = %s", (product_id,))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM products WHERE product_id = %s", (product_id,))
+                connection.commit()
+                cursor.close()
+            self.invalidate_products({product_id})
             return True
         except Exception as e:
-            self.connection.rollback()
             print(f"Error deleting product: {e}")
             return False
 
     def add_category(self, name, description, parent_category_id=None, image_url=None):
         """Добавить новую категорию"""
         try:
-            cursor = self.connection.cursor()
             query = """
             INSERT INTO categories (name, description, parent_category_id, image_url)
             VALUES (%s, %s, %s, %s) RETURNING category_id
             """
-            cursor.execute(query, (name, description, parent_category_id, image_url))
-            category_id = cursor.fetchone()[0]
-            self.connection.commit()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute(query, (name, description, parent_category_id, image_url))
+                category_id = cursor.fetchone()[0]
+                connection.commit()
+                cursor.close()
+            if parent_category_id is None:
+                self.entity_cache.invalidate('list', {'root_categories'})
             return category_id
         except Exception as e:
-            self.connection.rollback()
             print(f"Error adding category: {e}")
             return None
 
+    def _invalidate_category(self, category_id):
+        """Сбросить категорию, её подкатегории (в них название родителя) и список корневых"""
+        self.entity_cache.invalidate('category', {category_id})
+        self.entity_cache.invalidate('category', where=lambda row: row[5] == category_id)
+        self.entity_cache.invalidate('list', {'root_categories'})
+
     def update_category(self, category_id, name, description, parent_category_id=None, image_url=None):
         """Обновить категорию"""
         try:
-            cursor = self.connection.cursor()
             query = """
             UPDATE categories 
             SET name = %s, description = %s, parent_category_id = %s, image_url = %s
             WHERE category_id = %s
             """
-            cursor.execute(query, (name, description, parent_category_id, image_url, category_id))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                old_category = self.entity_cache.peek('category', category_id)
+                cursor.execute(query, (name, description, parent_category_id, image_url, category_id))
+                connection.commit()
+                cursor.close()
+            self._invalidate_category(category_id)
+            # В строках товаров - название категории
+            if old_category is None:
+                self.invalidate_products()
+            elif old_category[1] != name:
+                self.entity_cache.invalidate('product', where=lambda row: row[5] == old_category[1])
             return True
         except Exception as e:
-            self.connection.rollback()
             print(f"Error updating category: {e}")
             return False
 
     def delete_category(self, category_id):
         """Удалить категорию"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("DELETE FROM categories WHERE category_id = %s", (category_id,))
-            self.connection.commit()
-            cursor.close()
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM categories WHERE category_id = %s", (category_id,))
+                connection.commit()
+                cursor.close()
+            # Товары ссылаются только на существующие категории, их строки не меняются
+            self._invalidate_category(category_id)
             return True
         except Exception as e:
-            self.connection.rollback()
             print(f"Error deleting category: {e}")
             return False
 
     def get_dashboard_stats(self):
-        """Получить статистику для дашборда"""
+        """Получить статистику для дашборда.
+
+        Счётчики и выручка по дням ведутся триггерами (stats_counters,
+        daily_revenue), поэтому запрос один и не зависит от объёма истории.
+        Ещё не перенесённые изменения (*_deltas) прибавляются при чтении;
+        если их набралось STATS_FOLD_THRESHOLD, они сначала переносятся,
+        так что чтение не растёт вместе с числом заказов.
+        """
+        try:
+            query = """
+            SELECT
+                COALESCE(SUM(value) FILTER (WHERE name = 'total_users'), 0),
+                COALESCE(SUM(value) FILTER (WHERE name = 'active_products'), 0),
+                COALESCE(SUM(value) FILTER (WHERE name = 'total_orders'), 0),
+                COALESCE(SUM(value) FILTER (WHERE name = 'total_revenue'), 0),
+                (SELECT COALESCE(SUM(revenue), 0)
+                 FROM (SELECT day, revenue FROM daily_revenue
+                       UNION ALL
+                       SELECT day, revenue FROM daily_revenue_deltas) AS revenue_by_day
+                 WHERE day >= CURRENT_DATE - INTERVAL '30 days')
+            FROM (SELECT name, value FROM stats_counters
+                  UNION ALL
+                  SELECT name, value FROM stats_counter_deltas) AS counters
+            """
+            with self.borrow() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT fold_stats_deltas_if_needed(%s)", (self.STATS_FOLD_THRESHOLD,),
+                               prepare=True)
+                if cursor.fetchone()[0]:
+                    connection.commit()
+                cursor.execute(query, prepare=True)
+                total_users, total_products, total_orders, total_revenue, monthly_revenue = cursor.fetchone()
+                cursor.close()
+
+            return {
+                'total_users': int(total_users),
+                'total_products': int(total_products),
+                'total_orders': int(total_orders),
+                'total_revenue': float(total_revenue),
+                'monthly_revenue': float(monthly_revenue)
+            }
+        except Exception as e:
+            print(f"Error getting dashboard stats: {e}")
+            return None
+
+
+class _QuerySignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+
+class _QueryTask(QRunnable):
+    """Обращение к базе, выполняемое в пуле потоков"""
+
+    def __init__(self, request_id, fn, args, kwargs, db_manager=None, cancel_token=None):
+        super().__init__()
+        self.request_id = request_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.db_manager = db_manager
+        self.cancel_token = cancel_token
+        self.signals = _QuerySignals()
+
+    def run(self):
+        try:
+            if self.cancel_token is not None:
+                with self.db_manager.cancel_scope(self.cancel_token):
+                    result = self.fn(*self.args, **self.kwargs)
+            else:
+                result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, e)
+        else:
+            self.signals.finished.emit(self.request_id, result)
+
+
+class QueryExecutor(QObject):
+    """Выполняет запросы DatabaseManager вне GUI-потока.
+
+    Каждый запрос отправляется под ключом (например, "products"). Результат
+    возвращается в GUI-поток через сигнал и передаётся в on_result, только
+    если за это время под тем же ключом не был отправлен более новый запрос.
+    Запрос, отправленный с cancellable=True, вытесняется новым запросом
+    с тем же ключом и отменяется прямо на сервере. Исключение запроса
+    передаётся в on_error(исключение).
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self._next_request_id = 0
+        self._latest = {}
+        self._pending = {}
+        self._cancel_tokens = {}
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, cancellable=False, **kwargs):
+        """Отправить запрос; возвращает его идентификатор"""
+        self._next_request_id += 1
+        request_id = self._next_request_id
+
+        was_busy = self.is_busy()
+        previous_token = self._cancel_tokens.pop(self._latest.get(key), None)
+        if previous_token:
+            previous_token.cancel()
+        self._latest[key] = request_id
+        self._pending[request_id] = (key, on_result, on_error)
+
+        cancel_token = None
+        if cancellable:
+            cancel_token = QueryCancelToken()
+            self._cancel_tokens[request_id] = cancel_token
+
+        task = _QueryTask(request_id, fn, args, kwargs, self.db_manager, cancel_token)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        QThreadPool.globalInstance().start(task)
+
+        if not was_busy:
+            self.busy_changed.emit(True)
+        return request_id
+
+    def cancel(self, key):
+        """Отбросить результат запроса с этим ключом и прервать его на сервере"""
+        request_id = self._latest.pop(key, None)
+        if request_id is None:
+            return
+
+        token = self._cancel_tokens.pop(request_id, None)
+        if token:
+            token.cancel()
+        if not self._latest:
+            self.busy_changed.emit(False)
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._latest)
+        return key in self._latest
+
+    def _take(self, request_id):
+        """Забрать обработчики запроса; None, если результат устарел"""
+        self._cancel_tokens.pop(request_id, None)
+        key, on_result, on_error = self._pending.pop(request_id, (None, None, None))
+        if key is None or self._latest.get(key) != request_id:
+            return None
+
+        del self._latest[key]
+        if not self._latest:
+            self.busy_changed.emit(False)
+        return on_result, on_error
+
+    def _on_finished(self, request_id, result):
+        handlers = self._take(request_id)
+        if handlers and handlers[0]:
+            handlers[0](result)
+
+    def _on_failed(self, request_id, error):
+        handlers = self._take(request_id)
+        if handlers is None:
+            return
+        if handlers[1]:
+            handlers[1](error)
+        else:
+            print(f"Background query error: {error}")
+
+
+class ChangeListener(QObject):
+    """Уведомления об изменённых товарах через LISTEN/NOTIFY.
+
+    Слушает канал DatabaseManager.PRODUCT_CHANGES_CHANNEL на отдельном
+    соединении; его сокет отслеживает QSocketNotifier, так что уведомления
+    читаются в GUI-потоке без опроса и без отдельного потока. Полезная
+    нагрузка - id товаров через запятую или «*», если изменилось слишком
+    много товаров. Уведомления за COALESCE_MS собираются в один сигнал
+    products_changed: frozenset id или None, если обновить нужно всё
+    (в том числе после переподключения, когда уведомления могли потеряться).
+    """
+
+    products_changed = pyqtSignal(object)
+
+    COALESCE_MS = 200
+    RECONNECT_MS = 5000
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.connection = None
+        self.notifier = None
+        self._changed_ids = set()
+        self._changed_all = False
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.COALESCE_MS)
+        self._flush_timer.timeout.connect(self._flush)
+
+        self._reconnect_timer = QTimer(self)
+        self._reconnect_timer.setSingleShot(True)
+        self._reconnect_timer.setInterval(self.RECONNECT_MS)
+        self._reconnect_timer.timeout.connect(self._reconnect)
+
+    def start(self):
+        """Подписаться на уведомления; при неудаче повторяет попытку позже"""
         try:
-            cursor = self.connection.cursor()
+            self.connection = self.db_manager.open_listen_connection(
+                self.db_manager.PRODUCT_CHANGES_CHANNEL)
+        except Exception as e:
+            print(f"Error listening for product changes: {e}")
+            self._reconnect_timer.start()
+            return False
+        self.notifier = QSocketNotifier(self.connection.fileno(), QSocketNotifier.Read, self)
+        self.notifier.activated.connect(self._on_readable)
+        return True
+
+    def stop(self):
+        self._reconnect_timer.stop()
+        if self.notifier is not None:
+            self.notifier.setEnabled(False)
+            self.notifier.deleteLater()
+            self.notifier = None
+        if self.connection is not None and not self.connection.closed:
+            self.connection.close()
+        self.connection = None
+
+    def _reconnect(self):
+        if self.start():
+            # Пока соединения не было, изменения могли пройти мимо
+            self._changed_all = True
+            self._flush_timer.start()
+
+    def _on_readable(self, *args):
+        try:
+            self.connection.poll()
+        except Exception as e:
+            print(f"Product changes connection lost: {e}")
+            self.stop()
+            self._reconnect_timer.start()
+            return
+
+        while self.connection.notifies:
+            payload = self.connection.notifies.pop(0).payload
+            if payload == '*':
+                self._changed_all = True
+            else:
+                self._changed_ids.update(int(value) for value in payload.split(',') if value)
+        if (self._changed_ids or self._changed_all) and not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def _flush(self):
+        changed = None if self._changed_all else frozenset(self._changed_ids)
+        self._changed_ids = set()
+        self._changed_all = False
+        self.products_changed.emit(changed)
+
+
+class InfiniteScroll(QObject):
+    """Вызывает fetch_more, когда до конца списка остаётся меньше экрана.
 
-            # Общее количество пользователей
-            cursor.execute("SELECT COUNT(*) FROM users")
-            total_users = cursor.fetchone()[0]
+    Срабатывает и при изменении диапазона прокрутки, поэтому страницы
+    догружаются, пока список не заполнит видимую область.
+    """
 
-            # Общее количество товаров
-            cursor.execute("SELECT COUNT(*) FROM products WHERE is_active = TRUE")
-            total_products = cursor.fetchone()[0]
+    def __init__(self, view, fetch_more):
+        super().__init__(view)
+        self.fetch_more = fetch_more
+        self.scroll_bar = view.verticalScrollBar()
+        self.scroll_bar.valueChanged.connect(self.check)
+        self.scroll_bar.rangeChanged.connect(self.check)
 
-            # Общее количество заказов
-            cursor.execute("SELECT COUNT(*) FROM orders")
-            total_orders = cursor.fetchone()[0]
+    def check(self, *args):
+        # pageStep - высота видимой области в единицах полосы прокрутки
+        if self.scroll_bar.maximum() - self.scroll_bar.value() <= self.scroll_bar.pageStep():
+            self.fetch_more()
 
-            # Общая выручка
-            cursor.execute("SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE status != 'cancelled'")
-            total_revenue = cursor.fetchone()[0]
 
-            # Продажи за последние 30 дней
-            cursor.execute("""
-            SELECT COALESCE(SUM(total_amount), 0) 
-            FROM orders 
-            WHERE order_date >= CURRENT_DATE - INTERVAL '30 days' AND status != 'cancelled'
+class LoadingIndicator(QLabel):
+    """Надпись «Загрузка...», видимая пока выполняются запросы виджета"""
+
+    def __init__(self, executor, text="⏳ Загрузка...", parent=None):
+        super().__init__(text, parent)
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet("color: #666; font-size: 12px; padding: 4px;")
+        self.setVisible(executor.is_busy())
+        executor.busy_changed.connect(self.setVisible)
+
+
+def format_value(value):
+    return "" if value is None else str(value)
+
+
+def format_money(value):
+    return "" if value is None else f"{value:.2f} руб."
+
+
+def format_datetime(value):
+    return value.strftime('%Y-%m-%d %H:%M') if value else ""
+
+
+def format_active(value):
+    return "Активен" if value else "Неактивен"
+
+
+class LazyTableModel(QAbstractTableModel):
+    """Общая модель таблиц админки.
+
+    Строки хранятся по столбцам (список значений на каждый столбец запроса),
+    текст ячейки форматируется только в data(), когда ячейку рисуют.
+    Страницы запрашиваются через executor функцией fetch_page(cursor),
+    которая возвращает (строки, курсор следующей страницы или None);
+    view догружает их сам через canFetchMore/fetchMore.
+
+    reload запрашивает столько строк, сколько уже загружено, и сверяет их
+    с показанными по id (первому столбцу), поэтому обновление не сбрасывает
+    прокрутку, выделение и догруженные страницы. Id в модели не повторяются:
+    повтор строки (например, при двух основных изображениях товара)
+    отбрасывается.
+
+    columns - список (заголовок, индекс столбца запроса, форматтер).
+    """
+
+    first_page_loaded = pyqtSignal()
+
+    def __init__(self, columns, executor, fetch_page, key, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.executor = executor
+        self.fetch_page = fetch_page
+        self.key = key
+        self.more_key = key + "_more"
+        self.arrays = []
+        self.row_count = 0
+        self.cursor = None
+        # Id загруженных строк, чтобы догрузка не проверяла весь список
+        self._keys = set()
+
+    @staticmethod
+    def _unique(rows, known=frozenset()):
+        """Строки rows без повторов id и без id из known; остаётся первая"""
+        seen = set(known)
+        unique = []
+        for row in rows:
+            if row[0] not in seen:
+                seen.add(row[0])
+                unique.append(row)
+        return unique
+
+    def reload(self):
+        self.executor.cancel(self.more_key)
+        self.executor.submit(self.key, self.fetch_page, None, limit=self.row_count or None,
+                             on_result=self.set_page)
+
+    def set_page(self, page):
+        rows, cursor = page
+        self.cursor = cursor
+        rows = self._unique(rows)
+        if self.row_count:
+            self._reconcile(rows)
+            return
+
+        self.beginResetModel()
+        self.arrays = [list(values) for values in zip(*rows)]
+        self.row_count = len(rows)
+        self._keys = {row[0] for row in rows}
+        self.endResetModel()
+        self.first_page_loaded.emit()
+
+    def _reconcile(self, rows):
+        """Заменить строки на rows, сохранив строки с теми же id (как ProductListModel.set_products)"""
+        if not rows:
+            self.beginResetModel()
+            self.arrays = []
+            self.row_count = 0
+            self._keys = set()
+            self.endResetModel()
+            return
+
+        # Удаляем пропавшие строки диапазонами с конца
+        new_keys = {row[0] for row in rows}
+        keys = self.arrays[0]
+        row = self.row_count - 1
+        while row >= 0:
+            if keys[row] in new_keys:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and keys[row] not in new_keys:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            for array in self.arrays:
+                del array[row + 1:last + 1]
+            self.row_count -= last - row
+            self.endRemoveRows()
+
+        # Оставшиеся ставим на новые места, новые вставляем подряд идущими группами
+        kept = set(keys)
+        last_column = len(self.columns) - 1
+        row = 0
+        while row < len(rows):
+            values = rows[row]
+            if values[0] not in kept:
+                end = row
+                while end < len(rows) and rows[end][0] not in kept:
+                    end += 1
+                self.beginInsertRows(QModelIndex(), row, end - 1)
+                for array, inserted in zip(self.arrays, zip(*rows[row:end])):
+                    array[row:row] = inserted
+                self.row_count += end - row
+                self.endInsertRows()
+                row = end
+                continue
+
+            if keys[row] != values[0]:
+                source = keys.index(values[0], row)
+                self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), row)
+                for array in self.arrays:
+                    array.insert(row, array.pop(source))
+                self.endMoveRows()
+            if self.row_values(row) != tuple(values):
+                for array, value in zip(self.arrays, values):
+                    array[row] = value
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+            row += 1
+        self._keys = new_keys
+
+    def append_page(self, page):
+        rows, cursor = page
+        self.cursor = cursor
+        rows = self._unique(rows, self._keys)
+        if not rows:
+            return
+
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + len(rows) - 1)
+        if not self.arrays:
+            self.arrays = [[] for _ in rows[0]]
+        for array, values in zip(self.arrays, zip(*rows)):
+            array.extend(values)
+        self.row_count += len(rows)
+        self._keys.update(row[0] for row in rows)
+        self.endInsertRows()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.cursor is None:
+            return False
+        return not (self.executor.is_busy(self.key) or self.executor.is_busy(self.more_key))
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.executor.submit(self.more_key, self.fetch_page, self.cursor, on_result=self.append_page)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        _, source, formatter = self.columns[index.column()]
+        return formatter(self.arrays[source][index.row()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return str(section + 1)
+
+    def row_values(self, row):
+        """Исходная строка запроса"""
+        return tuple(array[row] for array in self.arrays)
+
+    def keys(self):
+        """Значения первого столбца запроса (id) загруженных строк"""
+        return self._keys
+
+    def update_rows(self, keys, rows):
+        """Заменить строки с id из keys строками rows; строки, которых нет в rows, убрать"""
+        if not self.arrays:
+            return
+        fresh = {row[0]: row for row in rows}
+        removed = []
+        for row, key in enumerate(self.arrays[0]):
+            if key not in keys:
+                continue
+            values = fresh.get(key)
+            if values is None:
+                removed.append(row)
+                continue
+            for array, value in zip(self.arrays, values):
+                array[row] = value
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+
+        for row in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self._keys.discard(self.arrays[0][row])
+            for array in self.arrays:
+                del array[row]
+            self.row_count -= 1
+            self.endRemoveRows()
+
+
+def create_admin_table(model):
+    """QTableView для LazyTableModel с выбором одной строки"""
+    table = QTableView()
+    table.setModel(model)
+    table.setSelectionBehavior(QTableView.SelectRows)
+    table.setSelectionMode(QTableView.SingleSelection)
+    model.first_page_loaded.connect(table.resizeColumnsToContents)
+    return table
+
+
+def decode_image(data, size):
+    """Декодировать изображение сразу в размер, вписанный в size.
+
+    QImageReader.setScaledSize масштабирует при декодировании (для JPEG -
+    средствами libjpeg), поэтому полноразмерный кадр в памяти не создаётся.
+    Возвращает QImage или None, если данные не являются изображением.
+    Работает в любом потоке.
+    """
+    buffer = QBuffer()
+    buffer.setData(QByteArray(data))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    reader.setAutoTransform(True)
+
+    source_size = reader.size()
+    if source_size.isValid():
+        reader.setScaledSize(source_size.scaled(size, Qt.KeepAspectRatio))
+
+    image = reader.read()
+    if image.isNull():
+        return None
+    if image.width() > size.width() or image.height() > size.height():
+        # Формат не сообщил размер заранее или поворот по EXIF поменял стороны
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image
+
+
+class HttpClient:
+    """HTTP GET с keep-alive: одно соединение на хост, повторно используется.
+
+    Не потокобезопасен - у каждого потока загрузки свой клиент. Хост,
+    к которому не удалось подключиться или который не ответил за timeout,
+    помечается в dead_hosts
+    (общем для всех клиентов) и dead_host_ttl секунд не опрашивается,
+    чтобы мёртвый адрес не занимал потоки на всё время таймаута.
+    """
+
+    MAX_REDIRECTS = 3
+    REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+    def __init__(self, timeout=10, dead_hosts=None, dead_host_ttl=30):
+        self.timeout = timeout
+        self.dead_hosts = dead_hosts if dead_hosts is not None else {}
+        self.dead_host_ttl = dead_host_ttl
+        self.connections = {}
+
+    def get(self, url, headers=None):
+        """(статус, заголовки, тело) ответа; переходит по редиректам"""
+        from urllib.parse import urljoin, urlparse
+
+        with PerformanceMetrics.shared().track(f"HTTP {urlparse(url).netloc}") as frame:
+            for _ in range(self.MAX_REDIRECTS + 1):
+                status, response_headers, body = self._request(url, headers or {})
+                frame['bytes'] += len(body)
+                location = response_headers.get('Location')
+                if status not in self.REDIRECT_CODES or not location:
+                    frame['error'] = status >= 400
+                    return status, response_headers, body
+                url = urljoin(url, location)
+            raise OSError(f"Too many redirects: {url}")
+
+    def _request(self, url, headers):
+        # http.client (с ssl и email) загружается при первой загрузке изображения
+        import http.client
+        import socket
+        from urllib.parse import urlparse
+
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL: {url}")
+
+        host = (parsed.scheme, parsed.netloc)
+        if self.dead_hosts.get(host, 0) > time.time():
+            raise OSError(f"Host {parsed.netloc} is unavailable")
+
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+
+        for attempt in range(2):
+            connection = self.connections.get(host)
+            reused = connection is not None
+            if connection is None:
+                connection_class = (http.client.HTTPSConnection if parsed.scheme == 'https'
+                                    else http.client.HTTPConnection)
+                connection = connection_class(parsed.netloc, timeout=self.timeout)
+                try:
+                    connection.connect()
+                except OSError:
+                    connection.close()
+                    self.dead_hosts[host] = time.time() + self.dead_host_ttl
+                    raise
+                self.connections[host] = connection
+
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                self.connections.pop(host, None)
+                if reused and attempt == 0 and not isinstance(e, socket.timeout):
+                    # Сервер закрыл простаивавшее соединение - пробуем новое
+                    continue
+                if isinstance(e, socket.timeout):
+                    self.dead_hosts[host] = time.time() + self.dead_host_ttl
+                if isinstance(e, http.client.HTTPException):
+                    raise OSError(f"HTTP error from {parsed.netloc}: {e}") from e
+                raise
+
+            if response.will_close:
+                connection.close()
+                self.connections.pop(host, None)
+            return response.status, response.headers, body
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+
+class _DownloadJob:
+    __slots__ = ('fn', 'callbacks', 'priority', 'started')
+
+    def __init__(self, fn, priority):
+        self.fn = fn
+        self.callbacks = []
+        self.priority = priority
+        self.started = False
+
+
+class ImageDownloader:
+    """Планировщик загрузки изображений.
+
+    Фиксированное число потоков, у каждого свой HttpClient с keep-alive
+    соединениями. Задачи с одинаковым key объединяются: fn выполняется
+    один раз, результат получают все подписчики. Очередь приоритетная -
+    меньшее значение priority выполняется раньше. Подписчик может
+    отказаться от результата через cancel(); задача без подписчиков,
+    которая ещё не началась, снимается с очереди.
+
+    fn(client) выполняется в потоке загрузки, callback(key, result, error)
+    вызывается там же.
+    """
+
+    HIGHEST_PRIORITY = float('-inf')
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers=4, timeout=5):
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._heap = []
+        self._jobs = {}
+        self._sequence = itertools.count()
+        self._dead_hosts = {}
+        self._closed = False
+        self._threads = []
+        for number in range(workers):
+            thread = threading.Thread(target=self._work, name=f"image-downloader-{number}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    @classmethod
+    def shared(cls):
+        """Общий планировщик приложения; первые вызовы из нескольких потоков получат один объект"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def submit(self, key, fn, callback, priority=0):
+        with self._condition:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _DownloadJob(fn, priority)
+                self._push(key, job)
+            elif priority < job.priority and not job.started:
+                job.priority = priority
+                self._push(key, job)
+            job.callbacks.append(callback)
+            self._condition.notify()
+
+    def set_priority(self, key, priority):
+        with self._condition:
+            job = self._jobs.get(key)
+            if job is not None and not job.started and job.priority != priority:
+                job.priority = priority
+                self._push(key, job)
+
+    def cancel(self, key, callback):
+        """Отказаться от результата задачи key для callback"""
+        with self._condition:
+            job = self._jobs.get(key)
+            if job is None:
+                return
+            try:
+                job.callbacks.remove(callback)
+            except ValueError:
+                return
+            if not job.callbacks and not job.started:
+                # Запись в куче станет устаревшей и будет пропущена
+                del self._jobs[key]
+
+    def pending_count(self):
+        with self._condition:
+            return sum(1 for job in self._jobs.values() if not job.started)
+
+    def shutdown(self):
+        with self._condition:
+            self._closed = True
+            self._jobs.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+
+    def _push(self, key, job):
+        # Прежние записи этой задачи в куче пропускаются по несовпадению priority
+        heapq.heappush(self._heap, (job.priority, next(self._sequence), key, job))
+
+    def _next_job(self):
+        while self._heap:
+            priority, _, key, job = heapq.heappop(self._heap)
+            if self._jobs.get(key) is job and not job.started and job.priority == priority:
+                job.started = True
+                return key, job
+        return None
+
+    def _work(self):
+        client = HttpClient(self.timeout, self._dead_hosts)
+        try:
+            while True:
+                with self._condition:
+                    entry = self._next_job()
+                    while entry is None:
+                        if self._closed:
+                            return
+                        self._condition.wait()
+                        entry = self._next_job()
+                key, job = entry
+
+                try:
+                    result, error = job.fn(client), None
+                except Exception as e:
+                    result, error = None, e
+
+                with self._condition:
+                    if self._jobs.get(key) is job:
+                        del self._jobs[key]
+                    callbacks = list(job.callbacks)
+
+                for callback in callbacks:
+                    try:
+                        callback(key, result, error)
+                    except Exception as e:
+                        print(f"Error in image download callback: {e}")
+        finally:
+            client.close()
+
+
+class ImageCache:
+    """Двухуровневый кэш изображений товаров.
+
+    Память: LRU уже масштабированных QImage с ограничением по байтам,
+    ключ - (URL, ширина, высота). Диск: исходные байты изображения и
+    метаданные (ETag, Last-Modified) в cache_dir, файл называется по
+    sha1 от URL; при превышении disk_budget удаляются давно не читанные
+    файлы. Запись на диске старше revalidate_after секунд перепроверяется
+    условным HTTP-запросом; если сервер недоступен, используется она же.
+
+    QImage, в отличие от QPixmap, можно создавать вне главного потока,
+    поэтому get() вызывается из потоков загрузки; счётчики stats
+    меняются под блокировкой, снимок даёт get_stats().
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir=None, memory_budget=32 * 1024 * 1024,
+                 disk_budget=200 * 1024 * 1024, revalidate_after=3600, timeout=10):
+        self.cache_dir = cache_dir or os.path.join(
+            os.path.expanduser("~"), ".cache", "electronics_store", "images")
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.revalidate_after = revalidate_after
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk_size = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'revalidated': 0, 'downloads': 0}
+
+    @classmethod
+    def shared(cls):
+        """Общий кэш приложения; первые вызовы из нескольких потоков получат один объект"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def get_stats(self):
+        """Снимок счётчиков попаданий и загрузок"""
+        with self._lock:
+            return dict(self.stats)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def cached(self, url, size):
+        """QImage из памяти или None; сеть и диск не трогает"""
+        key = (url, size.width(), size.height())
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+            return image
+
+    def get(self, url, size, client=None):
+        """QImage, вписанный в size; None, если данные не являются изображением.
+
+        client - HttpClient потока загрузки; без него создаётся временный.
+        Сетевые ошибки пробрасываются, если на диске нет копии.
+        """
+        image = self.cached(url, size)
+        if image is not None:
+            return image
+
+        image = decode_image(self._load(url, client), size)
+        if image is None:
+            return None
+        self._remember((url, size.width(), size.height()), image)
+        return image
+
+    def _remember(self, key, image):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= old.byteCount()
+            self._memory[key] = image
+            self._memory_size += image.byteCount()
+            while self._memory_size > self.memory_budget and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= evicted.byteCount()
+
+    def _paths(self, url):
+        import hashlib
+
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, name)
+        return base + ".img", base + ".json"
+
+    def _load(self, url, client=None):
+        """Байты изображения: с диска, после перепроверки или из сети"""
+        data_path, meta_path = self._paths(url)
+        data = meta = None
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(data_path, 'rb') as f:
+                data = f.read()
+        except (OSError, ValueError):
+            data = meta = None
+
+        if data is not None and time.time() - meta.get('checked_at', 0) < self.revalidate_after:
+            self._touch(data_path)
+            self._count('disk_hits')
+            return data
+
+        request_headers = {}
+        if data is not None:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        own_client = client is None
+        if own_client:
+            client = HttpClient(self.timeout)
+        try:
+            status, headers, new_data = client.get(url, request_headers)
+        except OSError as e:
+            if data is None:
+                raise
+            # Сервер недоступен - показываем сохранённую копию
+            print(f"Error revalidating image {url}: {e}")
+            return data
+        finally:
+            if own_client:
+                client.close()
+
+        if status == 304 and data is not None:
+            meta['checked_at'] = time.time()
+            self._write_meta(meta_path, meta)
+            self._touch(data_path)
+            self._count('revalidated')
+            return data
+        if status != 200:
+            raise OSError(f"HTTP {status} for {url}")
+
+        self._count('downloads')
+        self._store(url, new_data, {
+            'url': url,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'checked_at': time.time(),
+        })
+        return new_data
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write_meta(self, meta_path, meta):
+        try:
+            tmp_path = meta_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except OSError as e:
+            print(f"Error writing image cache: {e}")
+
+    def _store(self, url, data, meta):
+        """Сохранить изображение на диск и освободить место сверх disk_budget"""
+        data_path, meta_path = self._paths(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            try:
+                old_size = os.path.getsize(data_path)
+            except OSError:
+                old_size = 0
+            tmp_path = data_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, data_path)
+        except OSError as e:
+            print(f"Error writing image cache: {e}")
+            return
+        self._write_meta(meta_path, meta)
+
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_size += len(data) - old_size
+            if self._disk_size > self.disk_budget:
+                self._evict_disk(keep=data_path)
+
+    def _disk_entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".img"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict_disk(self, keep):
+        # mtime обновляется при каждом чтении, так что это порядок LRU
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        self._disk_size = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self._disk_size <= self.disk_budget:
+                break
+            if path == keep:
+                continue
+            for stale_path in (path, path[:-len(".img")] + ".json"):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+            self._disk_size -= size
+
+
+class CatalogSnapshot:
+    """Локальный снимок каталога в SQLite для мгновенного запуска.
+
+    Хранит категории и активные товары с доступным количеством и URL
+    изображения; get_products_page отдаёт страницы в том же виде и порядке,
+    что и DatabaseManager, поэтому каталог показывается из файла ещё до
+    ответа сервера. sync() загружает с сервера только товары, изменившиеся
+    после сохранённой метки времени сервера (products.updated_at,
+    inventory.last_updated), и убирает удалённые и снятые с продажи.
+
+    У каждого потока своё соединение SQLite; журнал WAL позволяет читать
+    снимок в GUI-потоке, пока фоновый поток его обновляет.
+    """
+
+    SCHEMA_VERSION = 1
+    # Транзакция, начатая до синхронизации, может зафиксироваться после неё
+    # с более ранним updated_at, поэтому изменения берутся с запасом
+    WATERMARK_OVERLAP = timedelta(minutes=5)
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @classmethod
+    def for_server(cls, server_name, cache_dir=None):
+        """Снимок в кэше пользователя, свой для каждого сервера"""
+        import hashlib
+
+        cache_dir = cache_dir or os.path.join(os.path.expanduser("~"), ".cache", "electronics_store")
+        name = hashlib.sha1(server_name.encode('utf-8')).hexdigest()[:16]
+        return cls(os.path.join(cache_dir, f"catalog-{name}.sqlite"))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # sqlite3 загружается при первом обращении к снимку, после окна входа
+            import sqlite3
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema(connection)
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self, connection):
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == self.SCHEMA_VERSION:
+            return
+        with connection:
+            connection.executescript("""
+            DROP TABLE IF EXISTS meta;
+            DROP TABLE IF EXISTS categories;
+            DROP TABLE IF EXISTS products;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE categories (
+                category_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                parent_category_id INTEGER
+            );
+            CREATE TABLE products (
+                product_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                description TEXT,
+                price TEXT NOT NULL,
+                category_id INTEGER NOT NULL,
+                available INTEGER,
+                image_url TEXT,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX idx_products_keyset ON products(created_at DESC, product_id DESC);
+            CREATE INDEX idx_products_category_keyset
+                ON products(category_id, created_at DESC, product_id DESC);
             """)
-            monthly_revenue = cursor.fetchone()[0]
+            connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
 
-            cursor.close()
+    def watermark(self):
+        """Время сервера, на которое снимок актуален; None, если снимка нет"""
+        try:
+            row = self._connection().execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+            return datetime.fromisoformat(row[0]) if row else None
+        except Exception as e:
+            print(f"Error reading catalog snapshot: {e}")
+            return None
 
-            return {
-                'total_users': total_users,
-                'total_products': total_products,
-                'total_orders': total_orders,
-                'total_revenue': float(total_revenue),
-                'monthly_revenue': float(monthly_revenue)
-            }
+    def is_ready(self):
+        return self.watermark() is not None
+
+    def get_categories(self):
+        """Корневые категории, как DatabaseManager.get_categories"""
+        try:
+            return self._connection().execute(
+                "SELECT category_id, name FROM categories WHERE parent_category_id IS NULL "
+                "ORDER BY category_id").fetchall()
         except Exception as e:
-            print(f"Error getting dashboard stats: {e}")
+            print(f"Error reading catalog snapshot: {e}")
+            return []
+
+    def get_products_page(self, category_id=None, cursor=None, limit=None):
+        """Страница каталога из снимка: (товары, курсор следующей страницы или None)"""
+        limit = limit or DatabaseManager.PAGE_SIZE
+        query = """
+        SELECT p.product_id, p.name, p.description, p.price, c.name, p.available,
+               p.image_url, p.created_at
+        FROM products p
+        JOIN categories c ON p.category_id = c.category_id
+        WHERE 1 = 1
+        """
+        params = []
+        if category_id:
+            query += " AND p.category_id = ?"
+            params.append(category_id)
+        if cursor:
+            query += " AND (p.created_at, p.product_id) < (?, ?)"
+            params.extend(cursor)
+        query += " ORDER BY p.created_at DESC, p.product_id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        try:
+            rows = self._connection().execute(query, params).fetchall()
+        except Exception as e:
+            print(f"Error reading catalog snapshot: {e}")
+            return [], None
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = (rows[-1][-1], rows[-1][0]) if has_more else None
+        products = [(product_id, name, description, Decimal(price), category_name, available, image_url)
+                    for product_id, name, description, price, category_name, available, image_url, _ in rows]
+        return products, next_cursor
+
+    def sync(self, db_manager):
+        """Догрузить изменения с сервера из фонового потока.
+
+        Возвращает число действительно изменившихся в снимке строк
+        (0, если снимок уже был актуален) или None при ошибке.
+        """
+        watermark = self.watermark()
+        since = watermark - self.WATERMARK_OVERLAP if watermark else None
+
+        changes = db_manager.get_catalog_changes(since)
+        if changes is None:
             return None
+        products, deleted, categories, server_time = changes
+
+        connection = self._connection()
+        changes_before = connection.total_changes
+        with connection:
+            old_categories = connection.execute(
+                "SELECT category_id, name, parent_category_id FROM categories").fetchall()
+            if sorted(old_categories) != sorted(categories):
+                connection.execute("DELETE FROM categories")
+                connection.executemany(
+                    "INSERT INTO categories (category_id, name, parent_category_id) VALUES (?, ?, ?)",
+                    categories)
+            connection.executemany("DELETE FROM products WHERE product_id = ?",
+                                   [(product_id,) for product_id in deleted])
+
+        while products:
+            self._apply(connection, products)
+            if len(products) < db_manager.CATALOG_SYNC_BATCH:
+                break
+            changes = db_manager.get_catalog_changes(since, after_id=products[-1][0])
+            if changes is None:
+                return None
+            products = changes[0]
+
+        changed = connection.total_changes - changes_before
+        # Метка сохраняется последней: прерванная синхронизация повторится целиком
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)",
+                               (server_time.isoformat(),))
+        return changed
+
+    def _apply(self, connection, products):
+        active = []
+        inactive = []
+        for product_id, name, description, price, category_id, available, image_url, created_at, is_active \
+                in products:
+            if is_active:
+                active.append((product_id, name, description, str(price), category_id, available,
+                               image_url, created_at.isoformat(timespec='microseconds')))
+            else:
+                inactive.append((product_id,))
+        with connection:
+            # Строки, пришедшие повторно из-за запаса по метке, не перезаписываются
+            connection.executemany("""
+            INSERT INTO products
+                (product_id, name, description, price, category_id, available, image_url, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (product_id) DO UPDATE SET
+                name = excluded.name, description = excluded.description, price = excluded.price,
+                category_id = excluded.category_id, available = excluded.available,
+                image_url = excluded.image_url, created_at = excluded.created_at
+            WHERE (name, description, price, category_id, available, image_url, created_at)
+                IS NOT (excluded.name, excluded.description, excluded.price, excluded.category_id,
+                        excluded.available, excluded.image_url, excluded.created_at)
+            """, active)
+            connection.executemany("DELETE FROM products WHERE product_id = ?", inactive)
+
+
+class ProductListModel(QAbstractListModel):
+    """Товары каталога для виртуализированной сетки.
+
+    Хранит строки get_products и загруженные миниатюры. Изображение
+    запрашивается у ImageDownloader, когда карточку рисуют, то есть только
+    для видимых товаров; недавно нарисованные карточки загружаются первыми,
+    а загрузки товаров, пропавших из модели, отменяются.
+    """
+
+    ProductRole = Qt.UserRole
+    LOADING_TEXT = "⏳ Загрузка..."
+
+    def __init__(self, parent=None, image_cache=None, downloader=None):
+        super().__init__(parent)
+        self.image_cache = image_cache or ImageCache.shared()
+        self.downloader = downloader or ImageDownloader.shared()
+        self.products = []
+        self.images = {}
+        self._rows_by_url = {}
+        self._pending_urls = set()
+        self._paint_order = itertools.count()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.products)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        product = self.products[index.row()]
+        if role == Qt.DisplayRole:
+            return product[1]
+        if role == self.ProductRole:
+            return product
+        if role == Qt.DecorationRole:
+            # QPixmap, если изображение загружено, иначе текст заглушки
+            if not product[6]:
+                return "🖼️ Нет изображения"
+            return self.images.get(product[6], "")
+        return None
+
+    def set_products(self, products):
+        """Показать новый список товаров, сверив его со старым по product_id.
+
+        Вместо сброса модели оставшиеся товары сохраняют строки (и с ними
+        прокрутку, наведение и загруженные изображения) и переставляются
+        через beginMoveRows, изменившиеся обновляются через dataChanged,
+        пропавшие удаляются, новые вставляются. Загрузки изображений,
+        которые больше не нужны ни одной строке, отменяются.
+        """
+        # Повторы одного товара (например, при двух основных изображениях) не показываем
+        unique = {}
+        for product in products:
+            unique.setdefault(product[0], product)
+        products = list(unique.values())
+        new_ids = unique.keys()
+
+        # Удаляем пропавшие товары диапазонами с конца
+        row = len(self.products) - 1
+        while row >= 0:
+            if self.products[row][0] in new_ids:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and self.products[row][0] not in new_ids:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del self.products[row + 1:last + 1]
+            self.endRemoveRows()
+
+        # Оставшиеся ставим на новые места, новые вставляем подряд идущими группами
+        ids = [product[0] for product in self.products]
+        kept = set(ids)
+        row = 0
+        while row < len(products):
+            product = products[row]
+            if product[0] not in kept:
+                end = row
+                while end < len(products) and products[end][0] not in kept:
+                    end += 1
+                self.beginInsertRows(QModelIndex(), row, end - 1)
+                self.products[row:row] = products[row:end]
+                ids[row:row] = [item[0] for item in products[row:end]]
+                self.endInsertRows()
+                row = end
+                continue
+
+            if ids[row] != product[0]:
+                source = ids.index(product[0], row)
+                self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), row)
+                self.products.insert(row, self.products.pop(source))
+                ids.insert(row, ids.pop(source))
+                self.endMoveRows()
+            if self.products[row] != product:
+                self.products[row] = product
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+            row += 1
+
+        # Остались только повторы уже показанных товаров
+        if len(self.products) > len(products):
+            self.beginRemoveRows(QModelIndex(), len(products), len(self.products) - 1)
+            del self.products[len(products):]
+            self.endRemoveRows()
+
+        self._index_urls()
+        # Уже загруженные изображения оставшихся товаров не скачиваем заново
+        self.images = {url: image for url, image in self.images.items()
+                       if url in self._rows_by_url}
+        for image_url in self._pending_urls - self._rows_by_url.keys():
+            self.downloader.cancel(self._download_key(image_url), self.on_image_downloaded)
+        self._pending_urls &= self._rows_by_url.keys()
+
+    def append_products(self, products):
+        if not products:
+            return
+        first = len(self.products)
+        self.beginInsertRows(QModelIndex(), first, first + len(products) - 1)
+        self.products.extend(products)
+        for row, product in enumerate(products, first):
+            if product[6]:
+                self._rows_by_url.setdefault(product[6], []).append(row)
+        self.endInsertRows()
+
+    def _index_urls(self):
+        self._rows_by_url = {}
+        for row, product in enumerate(self.products):
+            if product[6]:
+                self._rows_by_url.setdefault(product[6], []).append(row)
+
+    def product_ids(self):
+        return {product[0] for product in self.products}
+
+    def update_products(self, product_ids, rows):
+        """Заменить товары product_ids строками rows; товары, которых нет в rows, убрать"""
+        fresh = {row[0]: row for row in rows}
+        removed = []
+        urls_changed = False
+        for row, product in enumerate(self.products):
+            if product[0] not in product_ids:
+                continue
+            new_product = fresh.get(product[0])
+            if new_product is None:
+                removed.append(row)
+            elif new_product != product:
+                urls_changed |= new_product[6] != product[6]
+                self.products[row] = new_product
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+
+        for row in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.products[row]
+            self.endRemoveRows()
+        if removed or urls_changed:
+            self._index_urls()
+
+    def _download_key(self, image_url):
+        size = ProductCardDelegate.IMAGE_SIZE
+        return image_url, size.width(), size.height()
+
+    def request_image(self, row):
+        """Запросить изображение товара; повторный запрос поднимает его в очереди"""
+        image_url = self.products[row][6]
+        if not image_url:
+            return
+        # Карточка, нарисованная последней, загружается первой
+        priority = -next(self._paint_order)
+        if image_url in self._pending_urls:
+            self.downloader.set_priority(self._download_key(image_url), priority)
+            return
+        if image_url in self.images:
+            return
+
+        # Повторная отрисовка каталога обслуживается из памяти без потока
+        image = self.image_cache.cached(image_url, ProductCardDelegate.IMAGE_SIZE)
+        if image is not None:
+            self.images[image_url] = QPixmap.fromImage(image)
+            return
+
+        self.images[image_url] = self.LOADING_TEXT
+        self._pending_urls.add(image_url)
+        self.downloader.submit(self._download_key(image_url),
+                               functools.partial(self.download_image, image_url),
+                               self.on_image_downloaded, priority)
+
+    def download_image(self, image_url, client):
+        """Загружает изображение через кэш в потоке ImageDownloader"""
+        return self.image_cache.get(image_url, ProductCardDelegate.IMAGE_SIZE, client)
+
+    def on_image_downloaded(self, key, image, error):
+        image_url = key[0]
+        if error is not None:
+            print(f"Error loading image from {image_url}: {error}")
+            if isinstance(error, ValueError):
+                image = "❌ Неверный URL"
+            else:
+                image = "❌ Ошибка загрузки"
+        elif image is None:
+            image = "❌ Ошибка загрузки"
+        self.post_image(image_url, image)
+
+    def post_image(self, image_url, image):
+        """Передать результат загрузки в главный поток"""
+        try:
+            QApplication.instance().postEvent(self, ImageLoadedEvent(image_url, image))
+        except RuntimeError:
+            # Модель уже удалена
+            pass
+
+    def customEvent(self, event):
+        """Обрабатывает пользовательские события"""
+        if isinstance(event, ImageLoadedEvent):
+            self._pending_urls.discard(event.image_url)
+            rows = self._rows_by_url.get(event.image_url)
+            if not rows:
+                return
+            image = event.image
+            if isinstance(image, QImage):
+                image = QPixmap.fromImage(image)
+            self.images[event.image_url] = image
+            for row in rows:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
 
 
-class ProductCard(QFrame):
-    def __init__(self, product, add_to_cart_callback):
-        super().__init__()
-        self.product = product
-        self.add_to_cart_callback = add_to_cart_callback
-        self.image_loaded = False
-        self.init_ui()
+class ProductCardDelegate(QStyledItemDelegate):
+    """Рисует карточку товара для ProductListModel.
 
-    def init_ui(self):
-        self.setFrameStyle(QFrame.Box)
-        self.setLineWidth(1)
-        self.setFixedSize(250, 400)
-        self.setStyleSheet("""
-            ProductCard {
-                border: 1px solid #ddd;
-                border-radius: 8px;
-                padding: 10px;
-                background-color: white;
-            }
-            ProductCard:hover {
-                border-color: #007bff;
-                box-shadow: 0 4px 8px rgba(0,0,0,0.1);
-            }
-        """)
+    Вместо QFrame с дочерними виджетами на каждый товар карточка целиком
+    рисуется в paint(), поэтому отрисовываются только видимые карточки.
+    Нажатие на кнопку «В корзину» испускает add_to_cart_requested.
+    """
 
-        layout = QVBoxLayout()
+    CARD_SIZE = QSize(250, 400)
+    IMAGE_SIZE = QSize(200, 150)
+    SPACING = 10
 
-        # Product image
-        self.image_label = QLabel()
-        self.image_label.setFixedSize(200, 150)
-        self.image_label.setAlignment(Qt.AlignCenter)
-        self.image_label.setStyleSheet("""
-            border: 1px solid #eee;
-            background-color: #f8f9fa;
-        """)
+    add_to_cart_requested = pyqtSignal(object)
 
-        # Загружаем изображение асинхронно
-        self.load_product_image()
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hovered_button_row = None
+
+        self.name_font = QFont()
+        self.name_font.setPixelSize(14)
+        self.name_font.setBold(True)
+        self.text_font = QFont()
+        self.text_font.setPixelSize(12)
+        self.price_font = QFont()
+        self.price_font.setPixelSize(16)
+        self.price_font.setBold(True)
+        self.button_font = QFont()
+        self.button_font.setPixelSize(13)
+        self.button_font.setBold(True)
+
+    def sizeHint(self, option, index):
+        return self.CARD_SIZE
+
+    def card_rect(self, rect):
+        return QRect(rect.topLeft(), self.CARD_SIZE).adjusted(0, 0, -1, -1)
+
+    def image_rect(self, card):
+        return QRect(card.left() + (card.width() - self.IMAGE_SIZE.width()) // 2,
+                     card.top() + 10, self.IMAGE_SIZE.width(), self.IMAGE_SIZE.height())
+
+    def button_rect(self, card):
+        return QRect(card.left() + 10, card.bottom() - 44, card.width() - 20, 34)
+
+    def paint(self, painter, option, index):
+        product = index.data(ProductListModel.ProductRole)
+        if product is None:
+            return
+        index.model().request_image(index.row())
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        card = self.card_rect(option.rect)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        painter.setPen(QColor("#007bff" if hovered else "#ddd"))
+        painter.setBrush(QColor("white"))
+        painter.drawRoundedRect(card, 8, 8)
 
-        layout.addWidget(self.image_label)
+        # Product image
+        image_rect = self.image_rect(card)
+        painter.setPen(QColor("#eee"))
+        painter.setBrush(QColor("#f8f9fa"))
+        painter.drawRect(image_rect)
+        image = index.data(Qt.DecorationRole)
+        if isinstance(image, QPixmap) and not image.isNull():
+            painter.drawPixmap(image_rect.left() + (image_rect.width() - image.width()) // 2,
+                               image_rect.top() + (image_rect.height() - image.height()) // 2,
+                               image)
+        else:
+            painter.setPen(QColor("#666"))
+            painter.setFont(self.text_font)
+            painter.drawText(image_rect, Qt.AlignCenter, image or "")
+
+        text_left = card.left() + 10
+        text_width = card.width() - 20
 
         # Product name
-        name_label = QLabel(self.product[1])
-        name_label.setWordWrap(True)
-        name_label.setStyleSheet("font-weight: bold; font-size: 14px; margin-top: 5px;")
-        layout.addWidget(name_label)
+        name_rect = QRect(text_left, image_rect.bottom() + 10, text_width, 40)
+        painter.setPen(QColor("#333"))
+        painter.setFont(self.name_font)
+        painter.drawText(name_rect, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, product[1])
 
         # Product description (shortened)
-        description = self.product[2] or "Описание отсутствует"
+        description = product[2] or "Описание отсутствует"
         if len(description) > 100:
             description = description[:100] + "..."
-        desc_label = QLabel(description)
-        desc_label.setWordWrap(True)
-        desc_label.setStyleSheet("color: #666; font-size: 12px;")
-        layout.addWidget(desc_label)
+        button = self.button_rect(card)
+        desc_rect = QRect(text_left, name_rect.bottom() + 5, text_width,
+                          button.top() - 34 - name_rect.bottom())
+        painter.setPen(QColor("#666"))
+        painter.setFont(self.text_font)
+        painter.drawText(desc_rect, Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap, description)
 
         # Price and availability
-        price_layout = QHBoxLayout()
-        price_label = QLabel(f"{self.product[3]:.2f} руб.")
-        price_label.setStyleSheet("font-weight: bold; color: #e74c3c; font-size: 16px;")
-        price_layout.addWidget(price_label)
-
-        available = self.product[5]
-        available_label = QLabel(f"В наличии: {available}")
-        available_color = "#27ae60" if available > 0 else "#e74c3c"
-        available_label.setStyleSheet(f"color: {available_color}; font-size: 12px;")
-        price_layout.addWidget(available_label)
-        layout.addLayout(price_layout)
+        price_rect = QRect(text_left, button.top() - 30, text_width, 24)
+        painter.setPen(QColor("#e74c3c"))
+        painter.setFont(self.price_font)
+        painter.drawText(price_rect, Qt.AlignLeft | Qt.AlignVCenter, f"{product[3]:.2f} руб.")
+
+        available = product[5]
+        painter.setPen(QColor("#27ae60" if available > 0 else "#e74c3c"))
+        painter.setFont(self.text_font)
+        painter.drawText(price_rect, Qt.AlignRight | Qt.AlignVCenter, f"В наличии: {available}")
 
         # Add to cart button
-        add_button = QPushButton("В корзину")
-        add_button.setStyleSheet("""
-            QPushButton {
-                background-color: #007bff;
-                color: white;
-                border: none;
-                padding: 8px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-            QPushButton:disabled {
-                background-color: #6c757d;
-            }
-        """)
-        add_button.clicked.connect(self.add_to_cart)
         if available <= 0:
-            add_button.setEnabled(False)
-            add_button.setText("Нет в наличии")
-
-        layout.addWidget(add_button)
-        self.setLayout(layout)
-
-    def load_product_image(self):
-        """Загружает изображение товара из URL"""
-        image_url = self.product[6]  # image_url из результата запроса
-
-        if not image_url:
-            self.set_placeholder_image("🖼️ Нет изображения")
-            return
-
-        # Загружаем изображение в отдельном потоке чтобы не блокировать UI
-        import threading
-        thread = threading.Thread(target=self.download_image, args=(image_url,))
-        thread.daemon = True
-        thread.start()
+            button_color, button_text = "#6c757d", "Нет в наличии"
+        elif self.hovered_button_row == index.row():
+            button_color, button_text = "#0056b3", "В корзину"
+        else:
+            button_color, button_text = "#007bff", "В корзину"
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor(button_color))
+        painter.drawRoundedRect(button, 4, 4)
+        painter.setPen(QColor("white"))
+        painter.setFont(self.button_font)
+        painter.drawText(button, Qt.AlignCenter, button_text)
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() not in (QEvent.MouseMove, QEvent.MouseButtonRelease):
+            return super().editorEvent(event, model, option, index)
+
+        product = index.data(ProductListModel.ProductRole)
+        on_button = (product is not None and product[5] > 0
+                     and self.button_rect(self.card_rect(option.rect)).contains(event.pos()))
+
+        if event.type() == QEvent.MouseMove:
+            hovered_row = index.row() if on_button else None
+            if hovered_row != self.hovered_button_row:
+                self.hovered_button_row = hovered_row
+                self.parent().viewport().update()
+            return False
 
-    def download_image(self, image_url):
-        """Загружает изображение по URL"""
-        try:
-            # Проверяем валидность URL
-            parsed_url = urlparse(image_url)
-            if not parsed_url.scheme in ('http', 'https'):
-                self.set_placeholder_image("❌ Неверный URL")
-                return
+        if on_button and event.button() == Qt.LeftButton:
+            self.add_to_cart_requested.emit(product)
+            return True
+        return False
 
-            with urllib.request.urlopen(image_url, timeout=10) as response:
-                image_data = response.read()
 
-            # Создаем QPixmap из загруженных данных
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data)
+class ProductGridView(QAbstractItemView):
+    """Сетка карточек одинакового размера item_size.
 
-            if not pixmap.isNull():
-                # Масштабируем изображение
-                pixmap = pixmap.scaled(200, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                # Обновляем UI в главном потоке
-                QApplication.instance().postEvent(self, ImageLoadedEvent(pixmap))
-            else:
-                self.set_placeholder_image("❌ Ошибка загрузки")
+    QListView при каждой вставке строк заново раскладывает все элементы,
+    и догрузка страницы стоила O(n) от длины списка. Здесь положение
+    карточки вычисляется по номеру строки и ширине области, поэтому вставка
+    только меняет диапазон прокрутки, а рисуются лишь видимые карточки.
+    """
 
-        except Exception as e:
-            print(f"Error loading image from {image_url}: {e}")
-            self.set_placeholder_image("❌ Ошибка загрузки")
-
-    def set_placeholder_image(self, text):
-        """Устанавливает placeholder вместо изображения"""
-        self.image_label.setText(text)
-        self.image_label.setStyleSheet("""
-            border: 1px solid #eee;
-            background-color: #f8f9fa;
-            color: #666;
-            font-size: 12px;
-        """)
+    def __init__(self, item_size, spacing=0, parent=None):
+        super().__init__(parent)
+        self.item_size = item_size
+        self.spacing = spacing
+        self.hover_index = QPersistentModelIndex()
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setMouseTracking(True)
+
+    def setModel(self, model):
+        super().setModel(model)
+        for signal in (model.rowsRemoved, model.rowsMoved, model.modelReset, model.layoutChanged):
+            signal.connect(self.update_layout)
+        self.update_layout()
+
+    def rowsInserted(self, parent, start, end):
+        super().rowsInserted(parent, start, end)
+        self.update_layout()
+
+    def update_layout(self, *args):
+        self.updateGeometries()
+        self.viewport().update()
+
+    def row_count(self):
+        return self.model().rowCount(self.rootIndex()) if self.model() is not None else 0
+
+    def columns(self):
+        step = self.item_size.width() + self.spacing
+        return max(1, (self.viewport().width() - self.spacing) // step)
+
+    def cell_rect(self, row):
+        """Прямоугольник строки row в координатах всей сетки"""
+        columns = self.columns()
+        return QRect(self.spacing + row % columns * (self.item_size.width() + self.spacing),
+                     self.spacing + row // columns * (self.item_size.height() + self.spacing),
+                     self.item_size.width(), self.item_size.height())
+
+    def rows_in(self, rect):
+        """Номера строк, чьи ячейки могут пересекать rect (координаты viewport)"""
+        step = self.item_size.height() + self.spacing
+        top = rect.top() + self.verticalOffset()
+        first = max(0, (top - self.spacing) // step)
+        last = max(0, (rect.bottom() + self.verticalOffset()) // step)
+        columns = self.columns()
+        return range(first * columns, min(self.row_count(), (last + 1) * columns))
+
+    def updateGeometries(self):
+        rows = -(-self.row_count() // self.columns())
+        content_height = self.spacing + rows * (self.item_size.height() + self.spacing)
+        height = self.viewport().height()
+        bar = self.verticalScrollBar()
+        bar.setRange(0, max(0, content_height - height))
+        bar.setPageStep(height)
+        bar.setSingleStep(max(1, self.item_size.height() // 8))
+        super().updateGeometries()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Число столбцов зависит от ширины
+        self.update_layout()
+
+    def visualRect(self, index):
+        if not index.isValid():
+            return QRect()
+        return self.cell_rect(index.row()).translated(0, -self.verticalOffset())
+
+    def indexAt(self, point):
+        x = point.x() - self.spacing
+        y = point.y() + self.verticalOffset() - self.spacing
+        width = self.item_size.width() + self.spacing
+        height = self.item_size.height() + self.spacing
+        if x < 0 or y < 0 or x % width >= self.item_size.width() or y % height >= self.item_size.height():
+            return QModelIndex()
+        column = x // width
+        if column >= self.columns():
+            return QModelIndex()
+        row = y // height * self.columns() + column
+        if row >= self.row_count():
+            return QModelIndex()
+        return self.model().index(row, 0, self.rootIndex())
+
+    def scrollTo(self, index, hint=QAbstractItemView.EnsureVisible):
+        if not index.isValid():
+            return
+        rect = self.cell_rect(index.row())
+        bar = self.verticalScrollBar()
+        height = self.viewport().height()
+        if hint == QAbstractItemView.PositionAtTop or (
+                hint == QAbstractItemView.EnsureVisible and rect.top() < bar.value()):
+            bar.setValue(rect.top() - self.spacing)
+        elif hint == QAbstractItemView.PositionAtBottom or (
+                hint == QAbstractItemView.EnsureVisible and rect.bottom() >= bar.value() + height):
+            bar.setValue(rect.bottom() + self.spacing - height + 1)
+        elif hint == QAbstractItemView.PositionAtCenter:
+            bar.setValue(rect.center().y() - height // 2)
+
+    def horizontalOffset(self):
+        return 0
 
-    def set_product_image(self, pixmap):
-        """Устанавливает загруженное изображение"""
-        self.image_label.setPixmap(pixmap)
-        self.image_loaded = True
+    def verticalOffset(self):
+        return self.verticalScrollBar().value()
+
+    def isIndexHidden(self, index):
+        return False
+
+    def moveCursor(self, action, modifiers):
+        count = self.row_count()
+        if count == 0:
+            return QModelIndex()
+        current = self.currentIndex()
+        row = current.row() if current.isValid() else 0
+        columns = self.columns()
+        page = max(1, self.viewport().height() // (self.item_size.height() + self.spacing)) * columns
+        if action == QAbstractItemView.MoveHome:
+            row = 0
+        elif action == QAbstractItemView.MoveEnd:
+            row = count - 1
+        else:
+            row += {
+                QAbstractItemView.MoveLeft: -1, QAbstractItemView.MovePrevious: -1,
+                QAbstractItemView.MoveRight: 1, QAbstractItemView.MoveNext: 1,
+                QAbstractItemView.MoveUp: -columns, QAbstractItemView.MoveDown: columns,
+                QAbstractItemView.MovePageUp: -page, QAbstractItemView.MovePageDown: page,
+            }.get(action, 0)
+        return self.model().index(min(max(row, 0), count - 1), 0, self.rootIndex())
+
+    def setSelection(self, rect, command):
+        rect = rect.normalized()
+        selection = QItemSelection()
+        for row in self.rows_in(rect):
+            index = self.model().index(row, 0, self.rootIndex())
+            if self.visualRect(index).intersects(rect):
+                selection.select(index, index)
+        self.selectionModel().select(selection, command)
+
+    def visualRegionForSelection(self, selection):
+        region = QRegion()
+        for index in selection.indexes():
+            region += self.visualRect(index)
+        return region
+
+    def paintEvent(self, event):
+        if self.model() is None:
+            return
+        painter = QPainter(self.viewport())
+        base_option = self.viewOptions()
+        selection_model = self.selectionModel()
+        for row in self.rows_in(event.rect()):
+            index = self.model().index(row, 0, self.rootIndex())
+            option = QStyleOptionViewItem(base_option)
+            option.rect = self.visualRect(index)
+            if index == self.hover_index:
+                option.state |= QStyle.State_MouseOver
+            if selection_model is not None and selection_model.isSelected(index):
+                option.state |= QStyle.State_Selected
+            self.itemDelegate(index).paint(painter, option, index)
+
+    def set_hover_index(self, index):
+        if index == self.hover_index:
+            return
+        previous = QModelIndex(self.hover_index)
+        self.hover_index = QPersistentModelIndex(index)
+        for changed in (previous, index):
+            if changed.isValid():
+                self.viewport().update(self.visualRect(changed))
 
-    def add_to_cart(self):
-        self.add_to_cart_callback(self.product)
+    def mouseMoveEvent(self, event):
+        self.set_hover_index(self.indexAt(event.pos()))
+        super().mouseMoveEvent(event)
 
-    def customEvent(self, event):
-        """Обрабатывает пользовательские события"""
-        if isinstance(event, ImageLoadedEvent):
-            self.set_product_image(event.pixmap)
+    def leaveEvent(self, event):
+        self.set_hover_index(QModelIndex())
+        super().leaveEvent(event)
 
 
 class CategoryChartWidget(QWidget):
-    def __init__(self, db_manager):
+    # Как часто обновлять материализованные отчёты
+    REFRESH_INTERVAL_MS = 5 * 60 * 1000
+
+    def __init__(self, db_manager, refresh_interval_ms=None):
         super().__init__()
         self.db_manager = db_manager
+        self.executor = QueryExecutor(db_manager, self)
+        self.refresh_interval_ms = refresh_interval_ms or self.REFRESH_INTERVAL_MS
         self.init_ui()
-        self.load_chart()
+
+        # По таймеру и при создании отчёт обновляется, только если он старше
+        # интервала: другие окна и клиенты могли уже обновить его
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_stale_report)
+        self.refresh_timer.start(self.refresh_interval_ms)
+        self.refresh_stale_report()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -692,15 +3515,59 @@ class CategoryChartWidget(QWidget):
         title.setAlignment(Qt.AlignCenter)
         layout.addWidget(title)
 
+        status_layout = QHBoxLayout()
+        self.freshness_label = QLabel()
+        self.freshness_label.setStyleSheet("font-size: 12px; color: #999;")
+        status_layout.addWidget(self.freshness_label)
+        status_layout.addStretch()
+        status_layout.addWidget(LoadingIndicator(self.executor))
+        refresh_btn = QPushButton("Обновить данные")
+        refresh_btn.clicked.connect(lambda: self.refresh_report())
+        status_layout.addWidget(refresh_btn)
+        layout.addLayout(status_layout)
+
+        # QtChart загружается при первом показе графика
+        from PyQt5.QtChart import QChartView
+
         # Create chart view
         self.chart_view = QChartView()
         self.chart_view.setRenderHint(QPainter.Antialiasing)
         layout.addWidget(self.chart_view)
 
+        self.no_data_label = QLabel("Нет данных о продажах по категориям")
+        self.no_data_label.setAlignment(Qt.AlignCenter)
+        self.no_data_label.hide()
+        layout.addWidget(self.no_data_label)
+
         self.setLayout(layout)
 
+    def refresh_report(self, max_age=0):
+        """Обновить отчёты на сервере и перерисовать график"""
+        self.executor.submit("refresh", self.db_manager.refresh_sales_reports, max_age,
+                             on_result=self.on_report_refreshed)
+
+    def refresh_stale_report(self):
+        self.refresh_report(max_age=self.refresh_interval_ms / 1000)
+
+    def on_report_refreshed(self, refreshed_at):
+        self.load_chart()
+
     def load_chart(self):
-        category_data = self.db_manager.get_category_sales()
+        self.executor.submit("chart", self.fetch_chart_data, on_result=self.show_chart_data)
+
+    def fetch_chart_data(self):
+        return self.db_manager.get_category_sales(), self.db_manager.get_reports_refreshed_at()
+
+    def show_chart_data(self, data):
+        category_data, refreshed_at = data
+        if refreshed_at:
+            self.freshness_label.setText(f"Данные на {refreshed_at.strftime('%Y-%m-%d %H:%M')}")
+        else:
+            self.freshness_label.setText("Данные ещё не обновлялись")
+        self.show_chart(category_data)
+
+    def show_chart(self, category_data):
+        from PyQt5.QtChart import QChart, QBarSeries, QBarSet, QValueAxis, QBarCategoryAxis
 
         # Create chart
         chart = QChart()
@@ -736,25 +3603,247 @@ class CategoryChartWidget(QWidget):
             series.attachAxis(axis_y)
         else:
             # Если нет данных, показываем сообщение
-            no_data_label = QLabel("Нет данных о продажах по категориям")
-            no_data_label.setAlignment(Qt.AlignCenter)
-            layout = QVBoxLayout()
-            layout.addWidget(no_data_label)
-            self.setLayout(layout)
+            self.chart_view.hide()
+            self.no_data_label.show()
             return
 
+        self.no_data_label.hide()
+        self.chart_view.show()
         self.chart_view.setChart(chart)
 
 
+class CartService(QObject):
+    """Корзина клиента: словарь позиций в памяти и таблица carts в базе.
+
+    Изменения сразу применяются к словарю product_id -> позиция, итог
+    пересчитывается по одной позиции. В базу они уходят в фоне: пока
+    сохраняется одна пачка, следующие изменения копятся и уходят одной
+    записью после неё, поэтому записи не обгоняют друг друга. Неудачная
+    запись повторяется по таймеру с удваивающейся паузой, при закрытии окна
+    flush() записывает оставшееся сразу. Сохранённая корзина загружается
+    при создании; позиции, добавленные до окончания загрузки, к ней
+    прибавляются.
+    """
+
+    # product_id изменившейся позиции или None, если изменилась вся корзина
+    changed = pyqtSignal(object)
+
+    # Пауза перед повтором неудачной записи, мс: удваивается до RETRY_MAX_MS
+    RETRY_MIN_MS = 1000
+    RETRY_MAX_MS = 60000
+    # Сколько flush ждёт фоновых загрузки и записи корзины
+    FLUSH_TIMEOUT_MS = 5000
+
+    def __init__(self, db_manager, customer_id, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.customer_id = customer_id
+        self.lines = OrderedDict()
+        self.total = Decimal(0)
+        self.loaded = False
+        # Ещё не записанные изменения: product_id -> (количество, цена)
+        self.pending = {}
+        self.pending_clear = False
+        self.saving = False
+        self.retry_delay_ms = self.RETRY_MIN_MS
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self._save)
+        self.executor = QueryExecutor(db_manager, self)
+        self.executor.submit("cart_load", db_manager.get_cart, customer_id, on_result=self.on_loaded)
+
+    def on_loaded(self, rows):
+        self.loaded = True
+        # Корзину очистили до окончания загрузки - сохранённая больше не нужна
+        if rows and not self.pending_clear:
+            local = self.lines
+            self.lines = OrderedDict(
+                (product_id, {'product_id': product_id, 'name': name, 'quantity': quantity, 'price': price})
+                for product_id, name, quantity, price in rows)
+            for product_id, line in local.items():
+                if product_id in self.lines:
+                    self.lines[product_id]['quantity'] += line['quantity']
+                else:
+                    self.lines[product_id] = line
+            self.pending = {product_id: (self.lines[product_id]['quantity'], self.lines[product_id]['price'])
+                            for product_id in local}
+            self._recalculate_total()
+            self.changed.emit(None)
+        self._save()
+
+    def _recalculate_total(self):
+        self.total = sum((line['quantity'] * line['price'] for line in self.lines.values()), Decimal(0))
+
+    def _set_quantity(self, product_id, quantity):
+        line = self.lines[product_id]
+        self.total += (quantity - line['quantity']) * line['price']
+        if quantity > 0:
+            line['quantity'] = quantity
+        else:
+            del self.lines[product_id]
+        self.pending[product_id] = (quantity, line['price'])
+
+    def add(self, product_id, name, price, quantity=1):
+        line = self.lines.get(product_id)
+        if line is None:
+            line = self.lines[product_id] = {'product_id': product_id, 'name': name, 'quantity': 0,
+                                             'price': price}
+        self._set_quantity(product_id, line['quantity'] + quantity)
+        self.changed.emit(product_id)
+        self._save()
+
+    def set_quantity(self, product_id, quantity):
+        if product_id not in self.lines:
+            return
+        self._set_quantity(product_id, max(quantity, 0))
+        self.changed.emit(product_id)
+        self._save()
+
+    def remove(self, product_id):
+        self.set_quantity(product_id, 0)
+
+    def clear(self):
+        self.lines.clear()
+        self.total = Decimal(0)
+        self.pending.clear()
+        self.pending_clear = True
+        self.changed.emit(None)
+        self._save()
+
+    def is_empty(self):
+        return not self.lines
+
+    def items(self):
+        """Позиции для DatabaseManager.create_order"""
+        return [{'product_id': line['product_id'], 'quantity': line['quantity'], 'price': line['price']}
+                for line in self.lines.values()]
+
+    def revalidate(self, current):
+        """Сверить позиции с текущими ценами и остатками.
+
+        current - результат DatabaseManager.validate_cart(список product_id),
+        полученный одним запросом вне GUI-потока. Цены обновляются до текущих,
+        недоступные товары убираются, количество уменьшается до остатка.
+        Возвращает список описаний изменений (пустой, если корзина актуальна)
+        или None, если проверить не удалось (current равен None).
+        """
+        if current is None:
+            return None
+
+        problems = []
+        for product_id, line in list(self.lines.items()):
+            name, price, is_active, available = current.get(product_id, (line['name'], None, False, 0))
+            if not is_active or available <= 0:
+                problems.append(f"{name}: нет в продаже")
+                self._set_quantity(product_id, 0)
+                continue
+            if price != line['price']:
+                problems.append(f"{name}: цена изменилась с {line['price']:.2f} на {price:.2f} руб.")
+                line['price'] = price
+                self.pending[product_id] = (line['quantity'], price)
+            if line['quantity'] > available:
+                problems.append(f"{name}: в корзине {line['quantity']}, доступно {available}")
+                self._set_quantity(product_id, available)
+
+        if problems:
+            self._recalculate_total()
+            self.changed.emit(None)
+            self._save()
+        return problems
+
+    def _save(self):
+        # После ошибки изменения копятся до срабатывания retry_timer
+        if self.saving or self.retry_timer.isActive() or not self.loaded \
+                or not (self.pending or self.pending_clear):
+            return
+        lines, clear = self.pending, self.pending_clear
+        self.pending, self.pending_clear = {}, False
+        self.saving = True
+        self.executor.submit("cart_save", self.db_manager.save_cart, self.customer_id, lines, clear,
+                             on_result=functools.partial(self.on_saved, lines, clear),
+                             on_error=lambda error: self.on_saved(lines, clear, False))
+
+    def on_saved(self, lines, clear, saved):
+        self.saving = False
+        if saved:
+            self.retry_delay_ms = self.RETRY_MIN_MS
+            self._save()
+            return
+
+        # Вернуть несохранённое в очередь; более новые изменения важнее
+        self._requeue(lines, clear)
+        self.retry_timer.start(self.retry_delay_ms)
+        self.retry_delay_ms = min(self.retry_delay_ms * 2, self.RETRY_MAX_MS)
+
+    def _requeue(self, lines, clear):
+        for product_id, value in lines.items():
+            self.pending.setdefault(product_id, value)
+        self.pending_clear = self.pending_clear or clear
+
+    def flush(self):
+        """Записать несохранённые изменения сразу, в GUI-потоке (при закрытии окна).
+
+        Сначала ждёт не дольше FLUSH_TIMEOUT_MS фоновые загрузку и запись,
+        чтобы более старая фоновая запись не легла поверх этой. Возвращает
+        True, если в базе не осталось несохранённых изменений.
+        """
+        loop = QEventLoop()
+        deadline = QTimer()
+        deadline.setSingleShot(True)
+        deadline.timeout.connect(loop.quit)
+        deadline.start(self.FLUSH_TIMEOUT_MS)
+        self.executor.busy_changed.connect(loop.quit)
+        while self.executor.is_busy() and deadline.isActive():
+            loop.exec_()
+        self.executor.busy_changed.disconnect(loop.quit)
+        self.retry_timer.stop()
+
+        if not (self.pending or self.pending_clear):
+            return True
+        if self.saving or not self.loaded:
+            return False
+        lines, clear = self.pending, self.pending_clear
+        self.pending, self.pending_clear = {}, False
+        if self.db_manager.save_cart(self.customer_id, lines, clear):
+            return True
+        self._requeue(lines, clear)
+        return False
+
+
 class ProductCatalogWidget(QWidget):
-    def __init__(self, db_manager, user_role):
+    SEARCH_DEBOUNCE_MS = 300
+    # Снимок догружает изменения не чаще, чем раз в этот интервал
+    SNAPSHOT_SYNC_INTERVAL_MS = 30000
+
+    def __init__(self, db_manager, user_role, snapshot=None, change_listener=None):
         super().__init__()
         self.db_manager = db_manager
         self.user_role = user_role
-        self.cart = []
+        self.snapshot = snapshot
+        # Корзина есть только у клиента; позиции списка по product_id
+        self.cart = None
+        self.cart_items = {}
+        self.executor = QueryExecutor(db_manager, self)
+        # Точечные обновления идут мимо индикатора загрузки
+        self.changes_executor = QueryExecutor(db_manager, self)
+        self.changed_product_ids = set()
+        self.last_products_query = None
+        self.shown_products_query = None
+        self.products_cursor = None
+        # Откуда показан текущий список: снимок или сервер (у них разные курсоры)
+        self.products_from_snapshot = False
         self.init_ui()
         self.load_categories()
         self.load_products()
+        if self.snapshot is not None:
+            self.executor.submit("snapshot_sync", self.snapshot.sync, self.db_manager,
+                                 on_result=self.on_snapshot_synced)
+            self.snapshot_sync_timer = QTimer(self)
+            self.snapshot_sync_timer.setSingleShot(True)
+            self.snapshot_sync_timer.setInterval(self.SNAPSHOT_SYNC_INTERVAL_MS)
+            self.snapshot_sync_timer.timeout.connect(self.sync_snapshot)
+        if change_listener is not None:
+            change_listener.products_changed.connect(self.on_products_changed)
 
     def init_ui(self):
         main_layout = QHBoxLayout()
@@ -783,19 +3872,30 @@ class ProductCatalogWidget(QWidget):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск товаров...")
-        self.search_input.textChanged.connect(self.load_products)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        self.search_input.returnPressed.connect(self.reload_products)
         search_layout.addWidget(self.search_input)
 
-        content_layout.addLayout(search_layout)
+        # Поиск запускается после паузы в наборе, а не на каждое нажатие
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.load_products)
 
-        # Products grid
-        self.products_scroll = QScrollArea()
-        self.products_widget = QWidget()
-        self.products_layout = QGridLayout()
-        self.products_widget.setLayout(self.products_layout)
-        self.products_scroll.setWidget(self.products_widget)
-        self.products_scroll.setWidgetResizable(True)
-        content_layout.addWidget(self.products_scroll)
+        content_layout.addLayout(search_layout)
+        content_layout.addWidget(LoadingIndicator(self.executor))
+
+        # Products grid: рисуются только видимые карточки
+        self.products_model = ProductListModel(self)
+        self.products_view = ProductGridView(ProductCardDelegate.CARD_SIZE, ProductCardDelegate.SPACING)
+        self.products_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.products_view.setStyleSheet("QAbstractItemView { border: none; background-color: transparent; }")
+        self.products_delegate = ProductCardDelegate(self.products_view)
+        self.products_delegate.add_to_cart_requested.connect(self.add_to_cart)
+        self.products_view.setItemDelegate(self.products_delegate)
+        self.products_view.setModel(self.products_model)
+        InfiniteScroll(self.products_view, self.load_more_products)
+        content_layout.addWidget(self.products_view)
 
         content_widget.setLayout(content_layout)
         main_layout.addWidget(content_widget)
@@ -813,6 +3913,9 @@ class ProductCatalogWidget(QWidget):
             self.cart_list = QListWidget()
             cart_layout.addWidget(self.cart_list)
 
+            self.cart = CartService(self.db_manager, self.db_manager.current_user['customer_id'], self)
+            self.cart.changed.connect(self.on_cart_changed)
+
             self.total_label = QLabel("Итого: 0.00 руб.")
             self.total_label.setStyleSheet("font-weight: bold; font-size: 14px; padding: 10px;")
             cart_layout.addWidget(self.total_label)
@@ -848,7 +3951,16 @@ class ProductCatalogWidget(QWidget):
         self.setLayout(main_layout)
 
     def load_categories(self):
-        categories = self.db_manager.get_categories()
+        if self.snapshot is not None and self.snapshot.is_ready():
+            self.show_categories(self.snapshot.get_categories())
+            return
+        self.executor.submit("categories", self.db_manager.get_categories,
+                             on_result=self.show_categories)
+
+    def show_categories(self, categories):
+        current_item = self.categories_list.currentItem()
+        current_id = current_item.data(Qt.UserRole) if current_item else None
+        self.categories_list.blockSignals(True)
         self.categories_list.clear()
 
         # Add "All categories" item
@@ -860,137 +3972,208 @@ class ProductCatalogWidget(QWidget):
             item = QListWidgetItem(name)
             item.setData(Qt.UserRole, category_id)
             self.categories_list.addItem(item)
+            if current_id is not None and category_id == current_id:
+                self.categories_list.setCurrentItem(item)
+        self.categories_list.blockSignals(False)
 
     def on_category_changed(self, current, previous):
         self.load_products()
 
+    def on_search_text_changed(self, text):
+        self.search_timer.start()
+
     def load_products(self):
-        # Clear existing products
-        for i in reversed(range(self.products_layout.count())):
-            widget = self.products_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
+        self.search_timer.stop()
 
         # Get selected category and search text
         current_item = self.categories_list.currentItem()
         category_id = current_item.data(Qt.UserRole) if current_item else None
-        search_text = self.search_input.text() or None
+        search_text = self.search_input.text().strip() or None
 
-        products = self.db_manager.get_products(category_id, search_text)
+        # Тот же запрос уже выполняется или показан
+        query = (category_id, search_text)
+        if query == self.last_products_query:
+            return
+        self.last_products_query = query
+
+        self.executor.cancel("more_products")
+        # При обновлении того же списка загружаем столько же строк, сколько уже показано,
+        # чтобы сверка не обрезала список и прокрутка осталась на месте
+        limit = None
+        if query == self.shown_products_query:
+            limit = max(self.products_model.rowCount(), self.db_manager.PAGE_SIZE)
+
+        # Без поиска каталог листается по снимку; поиск выполняет сервер
+        self.products_from_snapshot = (not search_text and self.snapshot is not None
+                                       and self.snapshot.is_ready())
+        if self.products_from_snapshot:
+            self.executor.cancel("products")
+            self.show_products(self.snapshot.get_products_page(category_id, limit=limit))
+            return
+        self.executor.submit("products", self.db_manager.get_products_page, category_id, search_text,
+                             limit=limit, on_result=self.show_products, cancellable=True)
 
-        # Add products to grid
-        row, col = 0, 0
-        max_cols = 3
+    def load_more_products(self):
+        if self.products_cursor is None or self.executor.is_busy("products") \
+                or self.executor.is_busy("more_products"):
+            return
 
-        for product in products:
-            product_card = ProductCard(product, self.add_to_cart)
-            self.products_layout.addWidget(product_card, row, col)
+        category_id, search_text = self.last_products_query
+        if self.products_from_snapshot:
+            self.append_products(self.snapshot.get_products_page(category_id, self.products_cursor))
+            return
+        self.executor.submit("more_products", self.db_manager.get_products_page, category_id, search_text,
+                             self.products_cursor, on_result=self.append_products, cancellable=True)
+
+    def sync_snapshot(self):
+        # Показанные товары уже исправлены on_products_changed, список не перезагружается
+        self.changes_executor.submit("snapshot_sync", self.snapshot.sync, self.db_manager)
+
+    def on_products_changed(self, product_ids):
+        if product_ids is None:
+            if self.snapshot is not None and self.snapshot.is_ready():
+                self.executor.submit("snapshot_sync", self.snapshot.sync, self.db_manager,
+                                     on_result=self.on_snapshot_synced)
+            else:
+                self.reload_products()
+            return
 
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
+        if self.snapshot is not None and not self.snapshot_sync_timer.isActive():
+            self.snapshot_sync_timer.start()
+        self.changed_product_ids |= product_ids & self.products_model.product_ids()
+        if not self.changed_product_ids:
+            return
+        # Новый запрос вытесняет незавершённый, поэтому берёт все ещё не применённые id.
+        # Строки запрашиваются с фильтром показанного списка: товар, который больше
+        # не подходит под категорию или поиск, не вернётся и будет убран
+        requested = frozenset(self.changed_product_ids)
+        query = self.shown_products_query
+        category_id, search_text = query if query else (None, None)
+        self.changes_executor.submit("product_changes", self.db_manager.get_catalog_products, requested,
+                                     category_id, search_text,
+                                     on_result=functools.partial(self.patch_products, requested, query))
+
+    def patch_products(self, product_ids, query, rows):
+        if rows is None:
+            return
+        self.changed_product_ids -= product_ids
+        # Пока строки загружались, открыт другой список: он загружен заново
+        # и отфильтрован иначе
+        if query != self.shown_products_query:
+            return
+        self.products_model.update_products(product_ids, rows)
 
-        # Add stretch to push products to top
-        self.products_layout.setRowStretch(row + 1, 1)
+    def on_snapshot_synced(self, changed):
+        if not changed:
+            return
+        self.show_categories(self.snapshot.get_categories())
+        # Список без поиска переключается на обновлённый снимок
+        if self.last_products_query and not self.last_products_query[1]:
+            self.reload_products()
 
-    def add_to_cart(self, product):
-        product_id, name, description, price, category_name, available, image_url = product
+    def reload_products(self):
+        self.last_products_query = None
+        self.load_products()
 
-        # Check if product already in cart
-        for i in range(self.cart_list.count()):
-            item = self.cart_list.item(i)
-            if item.data(Qt.UserRole) == product_id:
-                # Update quantity
-                quantity = item.data(Qt.UserRole + 1) + 1
-                item.setText(f"{name} - {quantity} шт. × {price:.2f} руб.")
-                item.setData(Qt.UserRole + 1, quantity)
-                self.update_total()
-                return
+    def show_products(self, page):
+        products, self.products_cursor = page
+        self.products_model.set_products(products)
+        # Другая категория или поиск открываются с начала; обновление того же списка
+        # сохраняет прокрутку
+        if self.last_products_query != self.shown_products_query:
+            self.shown_products_query = self.last_products_query
+            self.products_view.scrollToTop()
 
-        # Add new item to cart
-        quantity = 1
-        item = QListWidgetItem(f"{name} - {quantity} шт. × {price:.2f} руб.")
-        item.setData(Qt.UserRole, product_id)
-        item.setData(Qt.UserRole + 1, quantity)
-        item.setData(Qt.UserRole + 2, float(price))
-        self.cart_list.addItem(item)
+    def append_products(self, page):
+        products, self.products_cursor = page
+        self.products_model.append_products(products)
+
+    def add_to_cart(self, product):
+        product_id, name, description, price, category_name, available, image_url = product
+        self.cart.add(product_id, name, price)
+
+    def on_cart_changed(self, product_id):
+        if product_id is None:
+            self.cart_list.clear()
+            self.cart_items = {}
+            for line in self.cart.lines.values():
+                self.cart_items[line['product_id']] = QListWidgetItem(self.cart_list)
+                self.show_cart_line(line)
+        else:
+            line = self.cart.lines.get(product_id)
+            item = self.cart_items.get(product_id)
+            if line is None:
+                if item is not None:
+                    self.cart_list.takeItem(self.cart_list.row(self.cart_items.pop(product_id)))
+            else:
+                if item is None:
+                    self.cart_items[product_id] = QListWidgetItem(self.cart_list)
+                self.show_cart_line(line)
         self.update_total()
 
-    def update_total(self):
-        total = 0.0
-        for i in range(self.cart_list.count()):
-            item = self.cart_list.item(i)
-            quantity = item.data(Qt.UserRole + 1)
-            price = item.data(Qt.UserRole + 2)
-            total += quantity * price
+    def show_cart_line(self, line):
+        self.cart_items[line['product_id']].setText(
+            f"{line['name']} - {line['quantity']} шт. × {line['price']:.2f} руб.")
 
-        self.total_label.setText(f"Итого: {total:.2f} руб.")
+    def update_total(self):
+        self.total_label.setText(f"Итого: {self.cart.total:.2f} руб.")
 
     def clear_cart(self):
-        self.cart_list.clear()
-        self.update_total()
+        self.cart.clear()
 
     def checkout(self):
-        if self.cart_list.count() == 0:
+        if self.cart.is_empty():
             QMessageBox.warning(self, "Ошибка", "Корзина пуста")
             return
+        if self.executor.is_busy("checkout"):
+            return
 
-        # Prepare items for order
-        items = []
-        for i in range(self.cart_list.count()):
-            item = self.cart_list.item(i)
-            product_id = item.data(Qt.UserRole)
-            quantity = item.data(Qt.UserRole + 1)
-            price = item.data(Qt.UserRole + 2)
+        # Цены и остатки сверяются до заказа, а не по ошибке place_order.
+        # Оба запроса идут в фоне: create_order при конфликтах ждёт между попытками
+        self.executor.submit("checkout", self.db_manager.validate_cart, list(self.cart.lines),
+                             on_result=self.on_cart_validated, on_error=self.on_checkout_failed)
 
-            items.append({
-                'product_id': product_id,
-                'quantity': quantity,
-                'price': price
-            })
+    def on_cart_validated(self, current):
+        problems = self.cart.revalidate(current)
+        if problems is None:
+            QMessageBox.critical(self, "Ошибка", "Не удалось проверить корзину")
+            return
+        if problems:
+            QMessageBox.warning(self, "Корзина изменилась",
+                                "Корзина обновлена, проверьте её и оформите заказ ещё раз:\n"
+                                + "\n".join(problems))
+            return
 
         customer_id = self.db_manager.current_user['customer_id']
-
-        # Get or create default address
-        try:
-            cursor = self.db_manager.connection.cursor()
-            cursor.execute(
-                "SELECT address_id FROM addresses WHERE customer_id = %s LIMIT 1",
-                (customer_id,)
-            )
-            result = cursor.fetchone()
-
-            if not result:
-                # Create default address
-                cursor.execute("""
-                INSERT INTO addresses (customer_id, address_type, street, city, postal_code, country)
-                VALUES (%s, 'home', 'ул. Примерная, д. 1', 'Москва', '101000', 'Russia')
-                RETURNING address_id
-                """, (customer_id,))
-                result = cursor.fetchone()
-
-            address_id = result[0]
-            cursor.close()
-
-            # Create order
-            order_id = self.db_manager.create_order(customer_id, items, address_id)
-
-            if order_id:
-                QMessageBox.information(self, "Успех", f"Заказ #{order_id} успешно создан!")
-                self.clear_cart()
-            else:
-                QMessageBox.critical(self, "Ошибка", "Не удалось создать заказ")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при создании заказа: {str(e)}")
+        # Адрес по умолчанию подставляется на сервере
+        self.executor.submit("checkout", self.db_manager.create_order, customer_id, self.cart.items(),
+                             on_result=self.on_order_created, on_error=self.on_checkout_failed)
+
+    def on_order_created(self, order_id):
+        if order_id:
+            QMessageBox.information(self, "Успех", f"Заказ #{order_id} успешно создан!")
+            self.clear_cart()
+        else:
+            QMessageBox.critical(self, "Ошибка", "Не удалось создать заказ")
+
+    def on_checkout_failed(self, error):
+        if isinstance(error, InsufficientStockError):
+            lines = "\n".join(f"{item['name']}: в корзине {item['requested']}, "
+                              f"доступно {item['available']}" for item in error.shortages)
+            QMessageBox.warning(self, "Недостаточно товара",
+                                f"Не хватает товара на складе:\n{lines}")
+            return
+        QMessageBox.critical(self, "Ошибка", f"Ошибка при создании заказа: {str(error)}")
 
 
 class AddEditProductDialog(QDialog):
+    PREVIEW_SIZE = QSize(150, 100)
+
     def __init__(self, db_manager, product=None, parent=None):
         super().__init__(parent)
         self.db_manager = db_manager
         self.product = product
+        self.preview_key = None
         self.init_ui()
 
     def init_ui(self):
@@ -1102,22 +4285,47 @@ class AddEditProductDialog(QDialog):
         if not image_url:
             return
 
-        try:
-            with urllib.request.urlopen(image_url, timeout=10) as response:
-                image_data = response.read()
+        image_cache = ImageCache.shared()
+        image = image_cache.cached(image_url, self.PREVIEW_SIZE)
+        if image is not None:
+            self.image_preview_label.setPixmap(QPixmap.fromImage(image))
+            return
 
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data)
+        # Загрузка и декодирование идут в потоке ImageDownloader
+        self.cancel_preview()
+        self.preview_key = (image_url, self.PREVIEW_SIZE.width(), self.PREVIEW_SIZE.height())
+        self.image_preview_label.setText("⏳ Загрузка...")
+        ImageDownloader.shared().submit(
+            self.preview_key, functools.partial(image_cache.get, image_url, self.PREVIEW_SIZE),
+            self.on_preview_downloaded, ImageDownloader.HIGHEST_PRIORITY)
+
+    def cancel_preview(self):
+        if self.preview_key is not None:
+            ImageDownloader.shared().cancel(self.preview_key, self.on_preview_downloaded)
+            self.preview_key = None
+
+    def on_preview_downloaded(self, key, image, error):
+        if error is not None:
+            print(f"Error previewing image: {error}")
+        try:
+            QApplication.instance().postEvent(self, ImageLoadedEvent(key[0], image or "❌ Ошибка"))
+        except RuntimeError:
+            # Диалог уже закрыт
+            pass
 
-            if not pixmap.isNull():
-                pixmap = pixmap.scaled(150, 100, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.image_preview_label.setPixmap(pixmap)
+    def customEvent(self, event):
+        if isinstance(event, ImageLoadedEvent):
+            if self.preview_key is None or self.preview_key[0] != event.image_url:
+                return
+            self.preview_key = None
+            if isinstance(event.image, QImage):
+                self.image_preview_label.setPixmap(QPixmap.fromImage(event.image))
             else:
-                self.image_preview_label.setText("❌ Ошибка")
+                self.image_preview_label.setText(event.image)
 
-        except Exception as e:
-            self.image_preview_label.setText("❌ Ошибка")
-            print(f"Error previewing image: {e}")
+    def done(self, result):
+        self.cancel_preview()
+        super().done(result)
 
     def save_product(self):
         name = self.name_input.text()
@@ -1262,11 +4470,16 @@ class AddEditCategoryDialog(QDialog):
 
 
 class AdminProductsWidget(QWidget):
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, change_listener=None):
         super().__init__()
         self.db_manager = db_manager
+        self.executor = QueryExecutor(db_manager, self)
+        self.changes_executor = QueryExecutor(db_manager, self)
+        self.changed_product_ids = set()
         self.init_ui()
         self.load_products()
+        if change_listener is not None:
+            change_listener.products_changed.connect(self.on_products_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -1290,42 +4503,53 @@ class AdminProductsWidget(QWidget):
         toolbar.addWidget(refresh_btn)
 
         toolbar.addStretch()
+        toolbar.addWidget(LoadingIndicator(self.executor))
         layout.addLayout(toolbar)
 
         # Products table
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(10)
-        self.products_table.setHorizontalHeaderLabels([
-            'ID', 'Название', 'Описание', 'Цена', 'Себестоимость', 'Категория', 'SKU', 'В наличии', 'Статус',
-            'Изображение'
-        ])
-        self.products_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.products_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.products_model = LazyTableModel([
+            ('ID', 0, format_value),
+            ('Название', 1, format_value),
+            ('Описание', 2, format_value),
+            ('Цена', 3, format_money),
+            ('Себестоимость', 4, format_money),
+            ('Категория', 5, format_value),
+            ('SKU', 6, format_value),
+            ('В наличии', 8, format_value),
+            ('Статус', 7, format_active),
+            ('Изображение', 9, lambda value: "Есть" if value else "Нет"),
+        ], self.executor, self.db_manager.get_all_products_page, "products", self)
+        self.products_table = create_admin_table(self.products_model)
         layout.addWidget(self.products_table)
 
         self.setLayout(layout)
 
     def load_products(self):
-        products = self.db_manager.get_all_products()
-        self.products_table.setRowCount(len(products))
-
-        for row, product in enumerate(products):
-            for col, value in enumerate(product):
-                if isinstance(value, float):
-                    value = f"{value:.2f} руб." if col in [3, 4] else str(value)
-                elif value is None:
-                    value = ""
-                elif col == 7:  # Status column
-                    value = "Активен" if value else "Неактивен"
-                elif col == 8:  # Available quantity
-                    value = str(value)
-                elif col == 9:  # Image URL
-                    value = "Есть" if value else "Нет"
-
-                item = QTableWidgetItem(str(value))
-                self.products_table.setItem(row, col, item)
-
-        self.products_table.resizeColumnsToContents()
+        self.products_model.reload()
+
+    def on_products_changed(self, product_ids):
+        if product_ids is None:
+            self.load_products()
+            return
+
+        self.changed_product_ids |= product_ids & self.products_model.keys()
+        if not self.changed_product_ids:
+            return
+        requested = frozenset(self.changed_product_ids)
+        self.changes_executor.submit("product_changes", self.db_manager.get_admin_products, requested,
+                                     on_result=functools.partial(self.patch_products, requested))
+
+    def patch_products(self, product_ids, rows):
+        if rows is None:
+            return
+        self.changed_product_ids -= product_ids
+        self.products_model.update_rows(product_ids, rows)
+
+    def selected_product(self):
+        index = self.products_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.products_model.row_values(index.row())
 
     def add_product(self):
         dialog = AddEditProductDialog(self.db_manager)
@@ -1333,32 +4557,24 @@ class AdminProductsWidget(QWidget):
             self.load_products()
 
     def edit_product(self):
-        selected = self.products_table.currentRow()
-        if selected == -1:
+        selected = self.selected_product()
+        if selected is None:
             QMessageBox.warning(self, "Ошибка", "Выберите товар для редактирования")
             return
 
-        product_id = int(self.products_table.item(selected, 0).text())
-        products = self.db_manager.get_all_products()
-        product = None
-        for p in products:
-            if p[0] == product_id:
-                product = p
-                break
-
+        product = self.db_manager.get_product(selected[0])
         if product:
             dialog = AddEditProductDialog(self.db_manager, product)
             if dialog.exec_() == QDialog.Accepted:
                 self.load_products()
 
     def delete_product(self):
-        selected = self.products_table.currentRow()
-        if selected == -1:
+        selected = self.selected_product()
+        if selected is None:
             QMessageBox.warning(self, "Ошибка", "Выберите товар для удаления")
             return
 
-        product_id = int(self.products_table.item(selected, 0).text())
-        product_name = self.products_table.item(selected, 1).text()
+        product_id, product_name = selected[0], selected[1]
 
         reply = QMessageBox.question(
             self, 'Подтверждение удаления',
@@ -1378,6 +4594,7 @@ class AdminCategoriesWidget(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db_manager = db_manager
+        self.executor = QueryExecutor(db_manager, self)
         self.init_ui()
         self.load_categories()
 
@@ -1403,35 +4620,35 @@ class AdminCategoriesWidget(QWidget):
         toolbar.addWidget(refresh_btn)
 
         toolbar.addStretch()
+        toolbar.addWidget(LoadingIndicator(self.executor))
         layout.addLayout(toolbar)
 
         # Categories table
-        self.categories_table = QTableWidget()
-        self.categories_table.setColumnCount(6)
-        self.categories_table.setHorizontalHeaderLabels([
-            'ID', 'Название', 'Описание', 'Родительская категория', 'Дата создания', 'ID родителя'
-        ])
-        self.categories_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.categories_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.categories_model = LazyTableModel([
+            ('ID', 0, format_value),
+            ('Название', 1, format_value),
+            ('Описание', 2, format_value),
+            ('Родительская категория', 3, format_value),
+            ('Дата создания', 4, format_datetime),
+            ('ID родителя', 5, format_value),
+        ], self.executor, self.fetch_categories, "categories", self)
+        self.categories_table = create_admin_table(self.categories_model)
         layout.addWidget(self.categories_table)
 
         self.setLayout(layout)
 
-    def load_categories(self):
-        categories = self.db_manager.get_all_categories_with_parents()
-        self.categories_table.setRowCount(len(categories))
-
-        for row, category in enumerate(categories):
-            for col, value in enumerate(category):
-                if isinstance(value, datetime):
-                    value = value.strftime('%Y-%m-%d %H:%M')
-                elif value is None:
-                    value = ""
+    def fetch_categories(self, cursor=None, limit=None):
+        # Категорий немного, они приходят одной страницей
+        return self.db_manager.get_all_categories_with_parents(), None
 
-                item = QTableWidgetItem(str(value))
-                self.categories_table.setItem(row, col, item)
+    def load_categories(self):
+        self.categories_model.reload()
 
-        self.categories_table.resizeColumnsToContents()
+    def selected_category(self):
+        index = self.categories_table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.categories_model.row_values(index.row())
 
     def add_category(self):
         dialog = AddEditCategoryDialog(self.db_manager)
@@ -1439,32 +4656,24 @@ class AdminCategoriesWidget(QWidget):
             self.load_categories()
 
     def edit_category(self):
-        selected = self.categories_table.currentRow()
-        if selected == -1:
+        selected = self.selected_category()
+        if selected is None:
             QMessageBox.warning(self, "Ошибка", "Выберите категорию для редактирования")
             return
 
-        category_id = int(self.categories_table.item(selected, 0).text())
-        categories = self.db_manager.get_all_categories_with_parents()
-        category = None
-        for cat in categories:
-            if cat[0] == category_id:
-                category = cat
-                break
-
+        category = self.db_manager.get_category(selected[0])
         if category:
             dialog = AddEditCategoryDialog(self.db_manager, category)
             if dialog.exec_() == QDialog.Accepted:
                 self.load_categories()
 
     def delete_category(self):
-        selected = self.categories_table.currentRow()
-        if selected == -1:
+        selected = self.selected_category()
+        if selected is None:
             QMessageBox.warning(self, "Ошибка", "Выберите категорию для удаления")
             return
 
-        category_id = int(self.categories_table.item(selected, 0).text())
-        category_name = self.categories_table.item(selected, 1).text()
+        category_id, category_name = selected[0], selected[1]
 
         reply = QMessageBox.question(
             self, 'Подтверждение удаления',
@@ -1484,6 +4693,7 @@ class AdminUsersWidget(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db_manager = db_manager
+        self.executor = QueryExecutor(db_manager, self)
         self.init_ui()
         self.load_users()
 
@@ -1496,39 +4706,34 @@ class AdminUsersWidget(QWidget):
         refresh_btn.clicked.connect(self.load_users)
         toolbar.addWidget(refresh_btn)
         toolbar.addStretch()
+        toolbar.addWidget(LoadingIndicator(self.executor))
         layout.addLayout(toolbar)
 
         # Users table
-        self.users_table = QTableWidget()
-        self.users_table.setColumnCount(8)
-        self.users_table.setHorizontalHeaderLabels([
-            'ID', 'Email', 'Роль', 'Имя', 'Фамилия', 'Телефон', 'Дата регистрации', 'Статус'
-        ])
+        self.users_model = LazyTableModel([
+            ('ID', 0, format_value),
+            ('Email', 1, format_value),
+            ('Роль', 2, format_value),
+            ('Имя', 6, format_value),
+            ('Фамилия', 7, format_value),
+            ('Телефон', 8, format_value),
+            ('Дата регистрации', 3, format_datetime),
+            ('Статус', 5, format_active),
+        ], self.executor, self.db_manager.get_all_users_page, "users", self)
+        self.users_table = create_admin_table(self.users_model)
         layout.addWidget(self.users_table)
 
         self.setLayout(layout)
 
     def load_users(self):
-        users = self.db_manager.get_all_users()
-        self.users_table.setRowCount(len(users))
-
-        for row, user in enumerate(users):
-            for col, value in enumerate(user):
-                if isinstance(value, datetime):
-                    value = value.strftime('%Y-%m-%d %H:%M')
-                elif value is None:
-                    value = ""
-                elif col == 5:  # Status column
-                    value = "Активен" if value else "Неактивен"
-
-                item = QTableWidgetItem(str(value))
-                self.users_table.setItem(row, col, item)
+        self.users_model.reload()
 
 
 class AdminOrdersWidget(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db_manager = db_manager
+        self.executor = QueryExecutor(db_manager, self)
         self.init_ui()
         self.load_orders()
 
@@ -1541,36 +4746,32 @@ class AdminOrdersWidget(QWidget):
         refresh_btn.clicked.connect(self.load_orders)
         toolbar.addWidget(refresh_btn)
         toolbar.addStretch()
+        toolbar.addWidget(LoadingIndicator(self.executor))
         layout.addLayout(toolbar)
 
         # Orders table
-        self.orders_table = QTableWidget()
-        self.orders_table.setColumnCount(6)
-        self.orders_table.setHorizontalHeaderLabels([
-            'ID заказа', 'Дата', 'Статус', 'Сумма', 'Товаров', 'Клиент'
-        ])
+        self.orders_model = LazyTableModel([
+            ('ID заказа', 0, format_value),
+            ('Дата', 1, format_datetime),
+            ('Статус', 2, format_value),
+            ('Сумма', 3, format_money),
+            ('Товаров', 4, format_value),
+            ('Клиент', 5, format_value),
+        ], self.executor, self.db_manager.get_all_orders_page, "orders", self)
+        self.orders_table = create_admin_table(self.orders_model)
         layout.addWidget(self.orders_table)
 
         self.setLayout(layout)
 
     def load_orders(self):
-        orders = self.db_manager.get_all_orders()
-        self.orders_table.setRowCount(len(orders))
-
-        for row, order in enumerate(orders):
-            for col, value in enumerate(order):
-                if isinstance(value, datetime):
-                    value = value.strftime('%Y-%m-%d %H:%M')
-                elif isinstance(value, float):
-                    value = f"{value:.2f} руб."
-
-                self.orders_table.setItem(row, col, QTableWidgetItem(str(value)))
+        self.orders_model.reload()
 
 
 class AdminDashboardWidget(QWidget):
     def __init__(self, db_manager):
         super().__init__()
         self.db_manager = db_manager
+        self.executor = QueryExecutor(db_manager, self)
         self.init_ui()
         self.load_stats()
 
@@ -1582,6 +4783,7 @@ class AdminDashboardWidget(QWidget):
         title.setStyleSheet("font-weight: bold; font-size: 18px; padding: 10px;")
         title.setAlignment(Qt.AlignCenter)
         layout.addWidget(title)
+        layout.addWidget(LoadingIndicator(self.executor))
 
         # Stats grid
         stats_grid = QGridLayout()
@@ -1653,7 +4855,9 @@ class AdminDashboardWidget(QWidget):
         return card
 
     def load_stats(self):
-        stats = self.db_manager.get_dashboard_stats()
+        self.executor.submit("stats", self.db_manager.get_dashboard_stats, on_result=self.show_stats)
+
+    def show_stats(self, stats):
         if stats:
             self.users_value.setText(str(stats['total_users']))
             self.products_value.setText(str(stats['total_products']))
@@ -1661,10 +4865,134 @@ class AdminDashboardWidget(QWidget):
             self.revenue_value.setText(f"{stats['total_revenue']:.2f} руб.")
 
 
+class PerformanceWidget(QWidget):
+    """Вкладка «Производительность»: метрики методов и журнал медленных запросов"""
+
+    REFRESH_INTERVAL_MS = 1000
+    COLUMNS = ['Метод', 'Вызовов', 'Ошибок', 'Строк', 'Байт', 'p50, мс', 'p95, мс', 'p99, мс']
+
+    def __init__(self, metrics=None):
+        super().__init__()
+        self.metrics = metrics or PerformanceMetrics.shared()
+        self.shown_slow_entries = []
+        self.init_ui()
+
+        # Метрики в памяти, так что обновление дешёвое; пока вкладка скрыта - не обновляем
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(self.REFRESH_INTERVAL_MS)
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        # Toolbar
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(QLabel("Медленнее, мс:"))
+        self.threshold_spin = QSpinBox()
+        self.threshold_spin.setRange(1, 60000)
+        self.threshold_spin.setValue(int(self.metrics.slow_threshold_ms))
+        self.threshold_spin.valueChanged.connect(self.set_threshold)
+        toolbar.addWidget(self.threshold_spin)
+
+        self.explain_check = QCheckBox("EXPLAIN (ANALYZE, BUFFERS) для медленных запросов")
+        self.explain_check.setChecked(self.metrics.explain_slow)
+        self.explain_check.toggled.connect(self.set_explain)
+        toolbar.addWidget(self.explain_check)
+
+        toolbar.addStretch()
+        reset_btn = QPushButton("Сбросить")
+        reset_btn.clicked.connect(self.reset)
+        toolbar.addWidget(reset_btn)
+        layout.addLayout(toolbar)
+
+        splitter = QSplitter(Qt.Vertical)
+
+        self.metrics_table = QTableWidget()
+        self.metrics_table.setColumnCount(len(self.COLUMNS))
+        self.metrics_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.metrics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        splitter.addWidget(self.metrics_table)
+
+        self.slow_table = QTableWidget()
+        self.slow_table.setColumnCount(4)
+        self.slow_table.setHorizontalHeaderLabels(['Время', 'Метод', 'мс', 'SQL'])
+        self.slow_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.slow_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.slow_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.slow_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.slow_table.itemSelectionChanged.connect(self.show_slow_entry)
+        splitter.addWidget(self.slow_table)
+
+        self.details_text = QTextEdit()
+        self.details_text.setReadOnly(True)
+        self.details_text.setFont(QFont("Monospace"))
+        splitter.addWidget(self.details_text)
+
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def set_threshold(self, value):
+        self.metrics.slow_threshold_ms = value
+
+    def set_explain(self, checked):
+        self.metrics.explain_slow = checked
+
+    def reset(self):
+        self.metrics.reset()
+        self.details_text.clear()
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+
+        rows = self.metrics.snapshot()
+        self.metrics_table.setRowCount(len(rows))
+        for row, entry in enumerate(rows):
+            values = [entry['name'], entry['calls'], entry['errors'], entry['rows'], entry['bytes'],
+                      f"{entry['p50']:.1f}", f"{entry['p95']:.1f}", f"{entry['p99']:.1f}"]
+            for col, value in enumerate(values):
+                self.metrics_table.setItem(row, col, QTableWidgetItem(str(value)))
+
+        slow_entries = list(self.metrics.slow_log)
+        if slow_entries == self.shown_slow_entries:
+            return
+        self.shown_slow_entries = slow_entries
+        self.slow_table.setRowCount(len(slow_entries))
+        for row, entry in enumerate(slow_entries):
+            values = [entry['time'].strftime('%H:%M:%S'), entry['method'],
+                      f"{entry['elapsed_ms']:.1f}", entry['sql']]
+            for col, value in enumerate(values):
+                self.slow_table.setItem(row, col, QTableWidgetItem(value))
+
+    def show_slow_entry(self):
+        row = self.slow_table.currentRow()
+        if row < 0 or row >= len(self.shown_slow_entries):
+            return
+        entry = self.shown_slow_entries[row]
+        text = f"{entry['sql']}\n\nПараметры: {entry['params']}"
+        if entry['plan']:
+            text += f"\n\n{entry['plan']}"
+        self.details_text.setPlainText(text)
+
+
 class AdminPanelWidget(QWidget):
-    def __init__(self, db_manager):
+    """Панель управления; вкладки создаются и загружают данные при первом показе.
+
+    Данные вкладки считаются свежими data_ttl секунд с момента, когда
+    выполнились её запросы. При возврате на вкладку с устаревшими данными
+    они показываются сразу, а обновляются в фоне.
+    """
+
+    DATA_TTL = 60
+
+    def __init__(self, db_manager, change_listener=None, data_ttl=None):
         super().__init__()
         self.db_manager = db_manager
+        self.change_listener = change_listener
+        self.data_ttl = self.DATA_TTL if data_ttl is None else data_ttl
+        self.loaded_at = {}
         self.init_ui()
 
     def init_ui(self):
@@ -1672,34 +5000,126 @@ class AdminPanelWidget(QWidget):
 
         self.tabs = QTabWidget()
 
-        # Dashboard tab
-        self.dashboard_tab = AdminDashboardWidget(self.db_manager)
-        self.tabs.addTab(self.dashboard_tab, "📊 Дашборд")
+        # (атрибут, заголовок, создание виджета, метод обновления данных)
+        self.tab_specs = [
+            ('dashboard_tab', "📊 Дашборд",
+             lambda: AdminDashboardWidget(self.db_manager), 'load_stats'),
+            ('users_tab', "👥 Пользователи",
+             lambda: AdminUsersWidget(self.db_manager), 'load_users'),
+            ('products_tab', "📦 Товары",
+             lambda: AdminProductsWidget(self.db_manager, self.change_listener), 'load_products'),
+            ('categories_tab', "📁 Категории",
+             lambda: AdminCategoriesWidget(self.db_manager), 'load_categories'),
+            ('orders_tab', "📋 Заказы",
+             lambda: AdminOrdersWidget(self.db_manager), 'load_orders'),
+            # Метрики в памяти и обновляются таймером вкладки
+            ('performance_tab', "⏱️ Производительность", PerformanceWidget, None),
+        ]
+        for name, title, _, _ in self.tab_specs:
+            setattr(self, name, None)
+            page = QWidget()
+            page_layout = QVBoxLayout()
+            page_layout.setContentsMargins(0, 0, 0, 0)
+            page.setLayout(page_layout)
+            self.tabs.addTab(page, title)
+        self.tabs.currentChanged.connect(self.on_tab_shown)
+
+        layout.addWidget(self.tabs)
+        self.setLayout(layout)
+        self.on_tab_shown(self.tabs.currentIndex())
+
+    def on_tab_shown(self, index):
+        if index < 0:
+            return
+        name, _, create, refresh = self.tab_specs[index]
+        widget = getattr(self, name)
+        if widget is None:
+            # Виджет вкладки сам запускает загрузку данных при создании
+            widget = create()
+            setattr(self, name, widget)
+            self.tabs.widget(index).layout().addWidget(widget)
+            executor = getattr(widget, 'executor', None)
+            if executor is not None:
+                executor.busy_changed.connect(functools.partial(self.on_tab_busy_changed, index))
+            self.mark_loading(index, widget)
+            return
 
-        # Users tab
-        self.users_tab = AdminUsersWidget(self.db_manager)
-        self.tabs.addTab(self.users_tab, "👥 Пользователи")
+        loaded_at = self.loaded_at[index]
+        if refresh and loaded_at is not None and time.monotonic() - loaded_at >= self.data_ttl:
+            getattr(widget, refresh)()
+            self.mark_loading(index, widget)
 
-        # Products tab
-        self.products_tab = AdminProductsWidget(self.db_manager)
-        self.tabs.addTab(self.products_tab, "📦 Товары")
+    def mark_loading(self, index, widget):
+        """Отметить, что данные вкладки загружаются; время загрузки запишет on_tab_busy_changed"""
+        executor = getattr(widget, 'executor', None)
+        if executor is not None and executor.is_busy():
+            self.loaded_at[index] = None
+        else:
+            self.loaded_at[index] = time.monotonic()
 
-        # Categories tab
-        self.categories_tab = AdminCategoriesWidget(self.db_manager)
-        self.tabs.addTab(self.categories_tab, "📁 Категории")
+    def on_tab_busy_changed(self, index, busy):
+        if not busy and self.loaded_at.get(index, 0) is None:
+            self.loaded_at[index] = time.monotonic()
 
-        # Orders tab
-        self.orders_tab = AdminOrdersWidget(self.db_manager)
-        self.tabs.addTab(self.orders_tab, "📋 Заказы")
 
-        layout.addWidget(self.tabs)
-        self.setLayout(layout)
+class StartupReport:
+    """Длительность этапов запуска приложения, мс.
+
+    Этапы: import (загрузка модуля), connect (подключение к базе, идёт
+    параллельно с окном входа), login_window (до первой отрисовки окна
+    входа), authenticate, main_window (от входа до первой отрисовки
+    главного окна). Отчёт печатается и дописывается строкой JSON в log_path,
+    чтобы следить за холодным стартом между версиями.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path or os.path.join(
+            os.path.expanduser("~"), ".cache", "electronics_store", "startup.jsonl")
+        self.stages = {}
+
+    def record(self, stage, started):
+        """Этап stage длился с момента started (time.perf_counter) до сих пор"""
+        self.stages[stage] = round((time.perf_counter() - started) * 1000, 1)
+
+    def report(self):
+        print("Запуск: " + ", ".join(f"{stage} {ms:.0f} мс" for stage, ms in self.stages.items()))
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'time': datetime.now().isoformat(timespec='seconds'),
+                                    'stages': self.stages}) + "\n")
+        except OSError as e:
+            print(f"Error writing startup report: {e}")
+
+
+class _FirstPaintFilter(QObject):
+    """Вызывает callback после первой отрисовки виджета"""
+
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            # Отрисовка ещё идёт; отчитываемся, когда она закончится
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
+def on_first_paint(widget, callback):
+    _FirstPaintFilter(widget, callback)
 
 
 class LoginWindow(QDialog):
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, connecting=False, startup=None):
         super().__init__()
         self.db_manager = db_manager
+        # Подключение к базе может ещё идти в фоне (см. main)
+        self.connected = not connecting
+        self.login_pending = False
+        self.startup = startup
         self.init_ui()
 
     def init_ui(self):
@@ -1769,6 +5189,19 @@ class LoginWindow(QDialog):
 
         self.setLayout(layout)
 
+    def on_connected(self, connected):
+        if not connected:
+            QMessageBox.critical(self, 'Ошибка', 'Не удалось подключиться к базе данных')
+            self.reject()
+            return
+
+        self.connected = True
+        if self.login_pending:
+            self.login_pending = False
+            self.login_button.setEnabled(True)
+            self.login_button.setText('Войти в систему')
+            self.authenticate()
+
     def authenticate(self):
         email = self.email_input.text()
         password = self.password_input.text()
@@ -1777,7 +5210,19 @@ class LoginWindow(QDialog):
             QMessageBox.warning(self, 'Ошибка', 'Заполните все поля')
             return
 
-        if self.db_manager.authenticate(email, password):
+        # Вход выполнится, как только подключение будет готово
+        if not self.connected:
+            self.login_pending = True
+            self.login_button.setEnabled(False)
+            self.login_button.setText('Подключение к базе данных...')
+            return
+
+        started = time.perf_counter()
+        authenticated = self.db_manager.authenticate(email, password)
+        if self.startup is not None:
+            self.startup.record('authenticate', started)
+
+        if authenticated:
             self.accept()
         else:
             QMessageBox.warning(self, 'Ошибка', 'Неверные учетные данные')
@@ -1788,6 +5233,7 @@ class OrdersWidget(QWidget):
         super().__init__()
         self.db_manager = db_manager
         self.user_role = user_role
+        self.executor = QueryExecutor(db_manager, self)
         self.init_ui()
         self.load_orders()
 
@@ -1798,6 +5244,7 @@ class OrdersWidget(QWidget):
         title = QLabel("История заказов")
         title.setStyleSheet("font-weight: bold; font-size: 18px; padding: 10px;")
         layout.addWidget(title)
+        layout.addWidget(LoadingIndicator(self.executor))
 
         # Orders table
         self.orders_table = QTableWidget()
@@ -1818,10 +5265,12 @@ class OrdersWidget(QWidget):
     def load_orders(self):
         if self.user_role == 'customer':
             customer_id = self.db_manager.current_user['customer_id']
-            orders = self.db_manager.get_user_orders(customer_id)
+            self.executor.submit("orders", self.db_manager.get_user_orders, customer_id,
+                                 on_result=self.show_orders)
         else:
-            orders = self.db_manager.get_all_orders()
+            self.executor.submit("orders", self.db_manager.get_all_orders, on_result=self.show_orders)
 
+    def show_orders(self, orders):
         self.orders_table.setRowCount(len(orders))
         for row, order in enumerate(orders):
             for col, value in enumerate(order):
@@ -1837,6 +5286,10 @@ class MainWindow(QMainWindow):
     def __init__(self, db_manager):
         super().__init__()
         self.db_manager = db_manager
+        # Остатки и цены в каталоге и таблицах обновляются по уведомлениям сервера
+        self.change_listener = ChangeListener(db_manager, self)
+        self.change_listener.products_changed.connect(db_manager.invalidate_products)
+        self.change_listener.start()
         self.init_ui()
 
     def init_ui(self):
@@ -1900,7 +5353,9 @@ class MainWindow(QMainWindow):
         user_role = user['role']
         if user_role == 'customer':
             # Product catalog for customers only
-            self.catalog_tab = ProductCatalogWidget(self.db_manager, user_role)
+            snapshot = CatalogSnapshot.for_server(self.db_manager.server_name)
+            self.catalog_tab = ProductCatalogWidget(self.db_manager, user_role, snapshot,
+                                                    self.change_listener)
             self.tabs.addTab(self.catalog_tab, "🛍️ Каталог товаров")
 
             # Orders tab for customers only
@@ -1908,7 +5363,7 @@ class MainWindow(QMainWindow):
             self.tabs.addTab(self.orders_tab, "📋 Мои заказы")
         else:
             # Admin panel for admin/manager - ТОЛЬКО ЭТА ВКЛАДКА
-            self.admin_tab = AdminPanelWidget(self.db_manager)
+            self.admin_tab = AdminPanelWidget(self.db_manager, self.change_listener)
             self.tabs.addTab(self.admin_tab, "⚙️ Панель управления")
 
         layout.addWidget(self.tabs)
@@ -1916,27 +5371,57 @@ class MainWindow(QMainWindow):
     def logout(self):
         self.close()
 
+    def closeEvent(self, event):
+        self.change_listener.stop()
+        catalog_tab = getattr(self, 'catalog_tab', None)
+        if catalog_tab is not None and catalog_tab.cart is not None:
+            catalog_tab.cart.flush()
+        super().closeEvent(event)
+
 
 def main():
+    startup = StartupReport()
+    startup.record('import', _IMPORT_STARTED)
+    started = time.perf_counter()
     app = QApplication(sys.argv)
 
     # Initialize database connection
     db_manager = DatabaseManager()
+    connected = []
+
+    def on_connected(result):
+        startup.record('connect', connect_started)
+        connected.append(result)
+        if result:
+            # Фоновых запросов одновременно не больше, чем соединений в пуле
+            QThreadPool.globalInstance().setMaxThreadCount(db_manager.pool.max_size)
+        login_dialog.on_connected(result)
+
+    # Окно входа показывается сразу, подключение идёт в фоне, пока вводят пароль
+    login_dialog = LoginWindow(db_manager, connecting=True, startup=startup)
+    on_first_paint(login_dialog, lambda: startup.record('login_window', started))
 
     # For demonstration, using default connection parameters
-    if not db_manager.connect(host="localhost", user="postgres",
-                              password="password", database="electronics_store"):
-        QMessageBox.critical(None, 'Ошибка', 'Не удалось подключиться к базе данных')
-        return 1
+    connect_started = time.perf_counter()
+    connector = QueryExecutor(db_manager)
+    connector.submit("connect", db_manager.connect, host="localhost", user="postgres",
+                     password="password", database="electronics_store",
+                     pool_min=2, pool_max=10, on_result=on_connected)
 
     # Show login dialog
-    login_dialog = LoginWindow(db_manager)
     if login_dialog.exec_() == QDialog.Accepted:
+        logged_in = time.perf_counter()
         main_window = MainWindow(db_manager)
+
+        def on_main_window_painted():
+            startup.record('main_window', logged_in)
+            startup.report()
+
+        on_first_paint(main_window, on_main_window_painted)
         main_window.show()
         return app.exec_()
     else:
-        return 0
+        return 1 if connected and not connected[0] else 0
 
 
 if __name__ == '__main__':
@@ -0,0 +1,231 @@
+"""CartService: слияние с сохранённой корзиной, пачки записей, повтор и flush.
+
+База заменена заглушкой с get_cart и save_cart, запросы идут через
+настоящий QueryExecutor в пуле потоков. Ответы заглушки можно задержать
+событием, чтобы изменения пришли, пока загрузка или запись ещё идут.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import threading
+import time
+import unittest
+from decimal import Decimal
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QEventLoop, QTimer  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from clientapp import CartService  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+CUSTOMER_ID = 42
+PHONE = (1, "Телефон", Decimal("100.00"))
+LAPTOP = (2, "Ноутбук", Decimal("500.00"))
+MOUSE = (3, "Мышь", Decimal("20.00"))
+
+
+def wait_until(condition, timeout=5):
+    """Обрабатывать события, пока condition() не станет истинным"""
+    deadline = time.monotonic() + timeout
+    timer = QTimer()
+    timer.start(20)
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("условие не выполнилось вовремя")
+        app.processEvents(QEventLoop.WaitForMoreEvents)
+    timer.stop()
+
+
+class _DatabaseManager:
+    def __init__(self, cart=()):
+        self.cart = list(cart)
+        self.saves = []
+        # Ответы save_cart по порядку; когда кончатся - True
+        self.save_results = []
+        self.load_gate = threading.Event()
+        self.load_gate.set()
+        self.save_gate = threading.Event()
+        self.save_gate.set()
+        self.lock = threading.Lock()
+
+    def get_cart(self, customer_id):
+        self.load_gate.wait(5)
+        return list(self.cart)
+
+    def save_cart(self, customer_id, lines, clear):
+        self.save_gate.wait(5)
+        with self.lock:
+            self.saves.append((dict(lines), clear))
+            return self.save_results.pop(0) if self.save_results else True
+
+    def save_count(self):
+        with self.lock:
+            return len(self.saves)
+
+
+class CartServiceTest(unittest.TestCase):
+    def make_service(self, db_manager):
+        service = CartService(db_manager, CUSTOMER_ID)
+        self.addCleanup(self.settle, service, db_manager)
+        return service
+
+    def settle(self, service, db_manager):
+        db_manager.load_gate.set()
+        db_manager.save_gate.set()
+        wait_until(lambda: not service.executor.is_busy())
+        service.retry_timer.stop()
+
+    def quantities(self, service):
+        return {product_id: line['quantity'] for product_id, line in service.lines.items()}
+
+    def test_local_changes_are_merged_into_loaded_cart(self):
+        db_manager = _DatabaseManager(cart=[(PHONE[0], PHONE[1], 2, PHONE[2]),
+                                            (LAPTOP[0], LAPTOP[1], 1, LAPTOP[2])])
+        db_manager.load_gate.clear()
+        service = self.make_service(db_manager)
+        service.add(*PHONE)
+        service.add(*MOUSE, quantity=3)
+        self.assertEqual(db_manager.saves, [])
+
+        db_manager.load_gate.set()
+        wait_until(lambda: service.loaded and db_manager.save_count() == 1)
+        self.assertEqual(self.quantities(service), {1: 3, 2: 1, 3: 3})
+        self.assertEqual(service.total, Decimal("860.00"))
+        # Записываются только позиции, изменённые до загрузки
+        self.assertEqual(db_manager.saves, [({1: (3, PHONE[2]), 3: (3, MOUSE[2])}, False)])
+
+    def test_clear_before_load_drops_saved_cart(self):
+        db_manager = _DatabaseManager(cart=[(PHONE[0], PHONE[1], 2, PHONE[2])])
+        db_manager.load_gate.clear()
+        service = self.make_service(db_manager)
+        service.clear()
+        service.add(*MOUSE)
+
+        db_manager.load_gate.set()
+        wait_until(lambda: db_manager.save_count() == 1)
+        self.assertEqual(self.quantities(service), {3: 1})
+        self.assertEqual(db_manager.saves, [({3: (1, MOUSE[2])}, True)])
+
+    def test_changes_during_save_go_out_as_one_batch(self):
+        db_manager = _DatabaseManager()
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+
+        db_manager.save_gate.clear()
+        service.add(*PHONE)
+        service.add(*PHONE)
+        service.add(*LAPTOP)
+        service.remove(LAPTOP[0])
+        db_manager.save_gate.set()
+
+        wait_until(lambda: db_manager.save_count() == 2 and not service.saving)
+        self.assertEqual(db_manager.saves, [({1: (1, PHONE[2])}, False),
+                                            ({1: (2, PHONE[2]), 2: (0, LAPTOP[2])}, False)])
+
+    def test_failed_save_is_retried_with_backoff(self):
+        db_manager = _DatabaseManager()
+        db_manager.save_results = [False, False]
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+
+        service.add(*PHONE)
+        wait_until(lambda: service.retry_timer.isActive())
+        self.assertEqual(service.retry_timer.interval(), CartService.RETRY_MIN_MS)
+        self.assertEqual(service.retry_delay_ms, CartService.RETRY_MIN_MS * 2)
+
+        # До повтора новые изменения не пишутся, а копятся вместе с несохранённым
+        service.add(*LAPTOP)
+        app.processEvents()
+        self.assertEqual(db_manager.save_count(), 1)
+        self.assertEqual(set(service.pending), {1, 2})
+
+        service.retry_timer.start(0)
+        wait_until(lambda: db_manager.save_count() == 2 and service.retry_timer.isActive())
+        self.assertEqual(service.retry_timer.interval(), CartService.RETRY_MIN_MS * 2)
+
+        service.retry_timer.start(0)
+        wait_until(lambda: db_manager.save_count() == 3 and not service.saving)
+        self.assertEqual(db_manager.saves[-1], ({1: (1, PHONE[2]), 2: (1, LAPTOP[2])}, False))
+        self.assertEqual(service.pending, {})
+        self.assertEqual(service.retry_delay_ms, CartService.RETRY_MIN_MS)
+
+    def test_delay_is_capped(self):
+        db_manager = _DatabaseManager()
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+        for _ in range(10):
+            service.on_saved({}, False, False)
+        self.assertEqual(service.retry_delay_ms, CartService.RETRY_MAX_MS)
+
+    def test_flush_waits_for_background_save_then_writes_rest(self):
+        db_manager = _DatabaseManager()
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+
+        db_manager.save_gate.clear()
+        service.add(*PHONE)
+        service.add(*MOUSE)
+        threading.Timer(0.2, db_manager.save_gate.set).start()
+
+        self.assertTrue(service.flush())
+        self.assertEqual(db_manager.saves, [({1: (1, PHONE[2])}, False),
+                                            ({3: (1, MOUSE[2])}, False)])
+        self.assertEqual(service.pending, {})
+
+    def test_flush_after_failed_save_writes_pending_and_stops_retry(self):
+        db_manager = _DatabaseManager()
+        db_manager.save_results = [False]
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+        service.add(*PHONE)
+        wait_until(lambda: service.retry_timer.isActive())
+
+        self.assertTrue(service.flush())
+        self.assertFalse(service.retry_timer.isActive())
+        self.assertEqual(db_manager.saves[-1], ({1: (1, PHONE[2])}, False))
+
+    def test_failed_flush_keeps_changes(self):
+        db_manager = _DatabaseManager()
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+        db_manager.save_results = [False, False]
+        service.add(*PHONE)
+        wait_until(lambda: service.retry_timer.isActive())
+
+        self.assertFalse(service.flush())
+        self.assertEqual(service.pending, {1: (1, PHONE[2])})
+
+    def test_revalidate_applies_current_prices_and_stock(self):
+        db_manager = _DatabaseManager()
+        service = self.make_service(db_manager)
+        wait_until(lambda: service.loaded)
+        service.add(*PHONE, quantity=3)
+        service.add(*LAPTOP)
+        service.add(*MOUSE)
+        wait_until(lambda: not service.executor.is_busy())
+
+        self.assertIsNone(service.revalidate(None))
+        problems = service.revalidate({
+            PHONE[0]: (PHONE[1], PHONE[2], True, 2),
+            LAPTOP[0]: (LAPTOP[1], Decimal("450.00"), True, 5),
+        })
+        self.assertEqual(len(problems), 3)
+        self.assertEqual(self.quantities(service), {1: 2, 2: 1})
+        self.assertEqual(service.total, Decimal("650.00"))
+
+        wait_until(lambda: not service.executor.is_busy())
+        self.assertEqual(db_manager.saves[-1][0], {1: (2, PHONE[2]), 2: (1, Decimal("450.00")),
+                                                   3: (0, MOUSE[2])})
+        self.assertEqual(service.revalidate({
+            PHONE[0]: (PHONE[1], PHONE[2], True, 2),
+            LAPTOP[0]: (LAPTOP[1], Decimal("450.00"), True, 5),
+        }), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""CatalogSnapshot: первая загрузка, догрузка изменений и чтение страниц.
+
+Сервер заменён заглушкой с get_catalog_changes, которая хранит каталог
+в памяти и отдаёт изменения по тем же правилам, что DatabaseManager.
+Снимок пишется во временный каталог.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientapp import CatalogSnapshot  # noqa: E402
+
+START = datetime(2026, 1, 1, 12, 0)
+CATEGORIES = [(1, 'Телефоны', None), (2, 'Ноутбуки', None), (3, 'Смартфоны', 1)]
+
+
+class _DatabaseManager:
+    """Каталог в памяти с get_catalog_changes как у DatabaseManager"""
+
+    CATALOG_SYNC_BATCH = 3
+
+    def __init__(self, count):
+        self.now = START
+        self.categories = list(CATEGORIES)
+        self.products = {}
+        self.deleted = {}
+        self.calls = []
+        self.fail_after_id = None
+        for product_id in range(1, count + 1):
+            self.products[product_id] = {
+                'row': [product_id, f"Товар {product_id}", "", Decimal("100.00") + product_id,
+                        1 if product_id % 2 else 2, 10, f"http://img/{product_id}.png",
+                        START - timedelta(hours=product_id), True],
+                'updated_at': START - timedelta(hours=product_id),
+            }
+
+    def tick(self):
+        self.now += timedelta(minutes=10)
+
+    def update(self, product_id, **values):
+        self.tick()
+        columns = ['product_id', 'name', 'description', 'price', 'category_id', 'available',
+                   'image_url', 'created_at', 'is_active']
+        for column, value in values.items():
+            self.products[product_id]['row'][columns.index(column)] = value
+        self.products[product_id]['updated_at'] = self.now
+
+    def delete(self, product_id):
+        self.tick()
+        del self.products[product_id]
+        self.deleted[product_id] = self.now
+
+    def get_catalog_changes(self, since=None, after_id=0, limit=None):
+        self.calls.append((since, after_id))
+        if self.fail_after_id is not None and after_id >= self.fail_after_id:
+            return None
+        limit = limit or self.CATALOG_SYNC_BATCH
+        products = [tuple(product['row']) for product_id, product in sorted(self.products.items())
+                    if product_id > after_id and (since is None or product['updated_at'] > since)]
+        deleted = []
+        categories = []
+        if not after_id:
+            categories = list(self.categories)
+            if since:
+                deleted = [product_id for product_id, deleted_at in self.deleted.items()
+                           if deleted_at > since]
+        return products[:limit], deleted, categories, self.now
+
+
+class CatalogSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "snapshot", "catalog.sqlite")
+        self.snapshot = CatalogSnapshot(self.path)
+        self.server = _DatabaseManager(count=7)
+
+    def ids(self, category_id=None):
+        products, _ = self.snapshot.get_products_page(category_id, limit=100)
+        return [product[0] for product in products]
+
+    def test_first_sync_loads_catalog_in_batches(self):
+        self.assertFalse(self.snapshot.is_ready())
+        self.assertEqual(self.snapshot.sync(self.server), 7 + len(CATEGORIES))
+        self.assertEqual(self.server.calls, [(None, 0), (None, 3), (None, 6)])
+        self.assertEqual(self.snapshot.watermark(), START)
+
+        # Порядок как у DatabaseManager: новые первыми
+        self.assertEqual(self.ids(), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(self.ids(category_id=2), [2, 4, 6])
+        self.assertEqual(self.snapshot.get_categories(), [(1, 'Телефоны'), (2, 'Ноутбуки')])
+        product = self.snapshot.get_products_page(limit=1)[0][0]
+        self.assertEqual(product, (1, "Товар 1", "", Decimal("101.00"), 'Телефоны', 10,
+                                   "http://img/1.png"))
+
+    def test_pages_follow_keyset_cursor(self):
+        self.snapshot.sync(self.server)
+        seen = []
+        cursor = None
+        while True:
+            products, cursor = self.snapshot.get_products_page(cursor=cursor, limit=3)
+            seen.extend(product[0] for product in products)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [1, 2, 3, 4, 5, 6, 7])
+
+    def test_resync_without_changes_reports_nothing(self):
+        self.snapshot.sync(self.server)
+        self.server.tick()
+        # Запас по метке присылает недавние строки повторно, они не перезаписываются
+        self.server.products[1]['updated_at'] = START - timedelta(minutes=1)
+        self.assertEqual(self.snapshot.sync(self.server), 0)
+        self.assertEqual(self.server.calls[-1], (START - CatalogSnapshot.WATERMARK_OVERLAP, 0))
+        self.assertEqual(self.snapshot.watermark(), self.server.now)
+
+    def test_resync_applies_updates_deletions_and_deactivation(self):
+        self.snapshot.sync(self.server)
+        self.server.update(2, price=Decimal("5.00"), available=0)
+        self.server.update(3, is_active=False)
+        self.server.delete(4)
+        self.server.categories[1] = (2, 'Ноутбуки и планшеты', None)
+
+        self.snapshot.sync(self.server)
+        self.assertEqual(self.ids(), [1, 2, 5, 6, 7])
+        product = dict((row[0], row) for row in self.snapshot.get_products_page(limit=100)[0])[2]
+        self.assertEqual((product[3], product[4], product[5]), (Decimal("5.00"), 'Ноутбуки и планшеты', 0))
+
+        # Снятый с продажи товар снова в продаже
+        self.server.update(3, is_active=True)
+        self.snapshot.sync(self.server)
+        self.assertEqual(self.ids(), [1, 2, 3, 5, 6, 7])
+
+    def test_failed_sync_keeps_watermark_and_is_repeated(self):
+        self.snapshot.sync(self.server)
+        watermark = self.snapshot.watermark()
+        for product_id in (1, 2, 3, 4):
+            self.server.update(product_id, name=f"Новый {product_id}")
+
+        self.server.fail_after_id = 3
+        self.assertIsNone(self.snapshot.sync(self.server))
+        self.assertEqual(self.snapshot.watermark(), watermark)
+
+        self.server.fail_after_id = None
+        self.server.calls.clear()
+        self.snapshot.sync(self.server)
+        self.assertEqual(self.server.calls[0][0], watermark - CatalogSnapshot.WATERMARK_OVERLAP)
+        names = {row[0]: row[1] for row in self.snapshot.get_products_page(limit=100)[0]}
+        self.assertEqual([names[product_id] for product_id in (1, 2, 3, 4)],
+                         ["Новый 1", "Новый 2", "Новый 3", "Новый 4"])
+
+    def test_snapshot_is_read_from_file_without_server(self):
+        self.snapshot.sync(self.server)
+        reopened = CatalogSnapshot(self.path)
+        self.assertTrue(reopened.is_ready())
+        self.assertEqual([row[0] for row in reopened.get_products_page(limit=100)[0]],
+                         [1, 2, 3, 4, 5, 6, 7])
+
+    def test_schema_version_change_forces_full_sync(self):
+        self.snapshot.sync(self.server)
+        self.snapshot._connection().execute("PRAGMA user_version = 0")
+
+        reopened = CatalogSnapshot(self.path)
+        self.assertFalse(reopened.is_ready())
+        self.assertEqual(reopened.get_products_page(), ([], None))
+        self.server.calls.clear()
+        reopened.sync(self.server)
+        self.assertEqual(self.server.calls[0], (None, 0))
+        self.assertEqual(len(reopened.get_products_page(limit=100)[0]), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
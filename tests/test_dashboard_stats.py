@@ -0,0 +1,86 @@
+"""DatabaseManager.get_dashboard_stats: перенос изменений счётчиков по порогу.
+
+Соединение подменено записывающей заглушкой, PostgreSQL не нужен.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from contextlib import contextmanager
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientapp import DatabaseManager  # noqa: E402
+
+STATS_ROW = (Decimal(10), Decimal(5), Decimal(3), Decimal("1500.00"), Decimal("700.00"))
+
+
+class _Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = None
+
+    def execute(self, query, params=None, prepare=False):
+        self.connection.statements.append((" ".join(query.split()), params))
+        if "fold_stats_deltas_if_needed" in query:
+            self.result = (self.connection.folded,)
+        else:
+            self.result = STATS_ROW
+
+    def fetchone(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class _Connection:
+    def __init__(self, folded):
+        self.folded = folded
+        self.statements = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+class _DatabaseManager(DatabaseManager):
+    def __init__(self, connection):
+        super().__init__()
+        self.fake_connection = connection
+
+    @contextmanager
+    def borrow(self):
+        yield self.fake_connection
+
+
+class DashboardStatsTest(unittest.TestCase):
+    def get_stats(self, folded):
+        connection = _Connection(folded)
+        stats = _DatabaseManager(connection).get_dashboard_stats()
+        return stats, connection
+
+    def test_checks_deltas_before_reading(self):
+        stats, connection = self.get_stats(folded=False)
+        self.assertEqual(stats, {'total_users': 10, 'total_products': 5, 'total_orders': 3,
+                                 'total_revenue': 1500.0, 'monthly_revenue': 700.0})
+        fold, read = connection.statements
+        self.assertEqual(fold, ("SELECT fold_stats_deltas_if_needed(%s)",
+                                (DatabaseManager.STATS_FOLD_THRESHOLD,)))
+        self.assertIn("stats_counter_deltas", read[0])
+        self.assertEqual(connection.commits, 0)
+
+    def test_commits_fold_when_threshold_reached(self):
+        stats, connection = self.get_stats(folded=True)
+        self.assertEqual(stats['total_orders'], 3)
+        self.assertEqual(len(connection.statements), 2)
+        self.assertEqual(connection.commits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""EntityCache: поколения видов, точечный сброс, вытеснение LRU и TTL.
+
+Время подменено через clientapp.time.monotonic, ожидания нет.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientapp import EntityCache  # noqa: E402
+
+
+class EntityCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("clientapp.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = EntityCache(capacity=3, ttls={'category': 60})
+
+    def test_put_and_get_by_kind(self):
+        self.cache.put_rows('product', [(1, 'a'), (2, 'b')])
+        self.assertEqual(self.cache.get('product', 1), (1, 'a'))
+        self.assertIsNone(self.cache.get('user', 1))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['product']['hits'], stats['product']['size']), (1, 2))
+        self.assertEqual(stats['user']['misses'], 1)
+
+    def test_stale_generation_is_not_stored(self):
+        generation = self.cache.generation('product')
+        self.cache.invalidate('product', keys={1})
+        # Ответ запроса, начатого до сброса, в кэш не попадает
+        self.cache.put('product', 1, (1, 'old'), generation)
+        self.assertIsNone(self.cache.peek('product', 1))
+
+        self.cache.put('product', 1, (1, 'new'), self.cache.generation('product'))
+        self.assertEqual(self.cache.peek('product', 1), (1, 'new'))
+
+    def test_invalidate_by_keys_and_where(self):
+        self.cache.put_rows('product', [(1, 'a'), (2, 'b'), (3, 'c')])
+        self.cache.invalidate('product', keys={1})
+        self.assertIsNone(self.cache.peek('product', 1))
+        self.assertEqual(self.cache.peek('product', 2), (2, 'b'))
+
+        self.cache.invalidate('product', where=lambda row: row[1] == 'c')
+        self.assertIsNone(self.cache.peek('product', 3))
+        self.assertEqual(self.cache.peek('product', 2), (2, 'b'))
+        self.assertEqual(self.cache.get_stats()['product']['invalidations'], 2)
+
+    def test_invalidate_other_kind_keeps_generation(self):
+        generation = self.cache.generation('product')
+        self.cache.invalidate('user')
+        self.cache.put('product', 1, (1, 'a'), generation)
+        self.assertEqual(self.cache.peek('product', 1), (1, 'a'))
+
+    def test_clear_bumps_generations(self):
+        self.cache.put('product', 1, (1, 'a'))
+        generation = self.cache.generation('product')
+        self.cache.clear()
+        self.cache.put('product', 1, (1, 'a'), generation)
+        self.assertIsNone(self.cache.peek('product', 1))
+
+    def test_least_recently_read_is_evicted(self):
+        self.cache.put_rows('product', [(1, 'a'), (2, 'b'), (3, 'c')])
+        self.cache.get('product', 1)
+        self.cache.put('product', 4, (4, 'd'))
+        self.assertIsNone(self.cache.peek('product', 2))
+        for key in (1, 3, 4):
+            self.assertIsNotNone(self.cache.peek('product', key))
+        self.assertEqual(self.cache.get_stats()['product']['evictions'], 1)
+
+    def test_ttl_expires_only_listed_kinds(self):
+        self.cache.put('category', 1, (1, 'Телефоны'))
+        self.cache.put('product', 1, (1, 'a'))
+        self.now += 59
+        self.assertEqual(self.cache.get('category', 1), (1, 'Телефоны'))
+
+        self.now += 1
+        self.assertIsNone(self.cache.get('category', 1))
+        self.assertEqual(self.cache.get('product', 1), (1, 'a'))
+        stats = self.cache.get_stats()['category']
+        self.assertEqual((stats['expirations'], stats['size']), (1, 0))
+
+    def test_put_again_extends_ttl(self):
+        self.cache.put('category', 1, (1, 'a'))
+        self.now += 50
+        self.cache.put('category', 1, (1, 'b'))
+        self.now += 50
+        self.assertEqual(self.cache.get('category', 1), (1, 'b'))
+
+
+if __name__ == "__main__":
+    unittest.main()
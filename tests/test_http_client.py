@@ -0,0 +1,179 @@
+"""HttpClient и ImageDownloader против локального http.server.
+
+Проверяются повторное использование keep-alive соединения, переходы по
+редиректам и повтор запроса, когда сервер закрыл простаивавшее соединение.
+
+    python -m unittest discover tests
+"""
+import os
+import socket
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientapp import HttpClient, ImageDownloader  # noqa: E402
+
+IMAGE = b"\x89PNG fake image bytes"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.sockets.append(self.connection)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.path)
+        if self.path.startswith("/redirect/"):
+            # /redirect/N -> /redirect/N-1 -> ... -> /image
+            hops = int(self.path.rsplit("/", 1)[1])
+            location = f"/redirect/{hops - 1}" if hops > 1 else "/image"
+            self._send(302, b"", location=location)
+        elif self.path == "/close":
+            self._send(200, IMAGE, close=True)
+        elif self.path == "/image":
+            self._send(200, IMAGE)
+        else:
+            self._send(404, b"not found")
+
+    def _send(self, status, body, location=None, close=False):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if location:
+            self.send_header("Location", location)
+        if close:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.sockets = []
+        self.server.requests = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def connection_count(self):
+        with self.server.lock:
+            return len(self.server.sockets)
+
+    def drop_connections(self):
+        """Закрыть соединения со стороны сервера, как после keep-alive таймаута"""
+        with self.server.lock:
+            sockets = list(self.server.sockets)
+        for connection in sockets:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class HttpClientTest(HttpServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = HttpClient(timeout=5)
+        self.addCleanup(self.client.close)
+
+    def test_keep_alive_reuses_connection(self):
+        for _ in range(3):
+            status, _, body = self.client.get(self.base_url + "/image")
+            self.assertEqual(status, 200)
+            self.assertEqual(body, IMAGE)
+        self.assertEqual(self.connection_count(), 1)
+
+    def test_follows_redirects_on_same_connection(self):
+        status, _, body = self.client.get(self.base_url + "/redirect/2")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, IMAGE)
+        self.assertEqual(self.server.requests, ["/redirect/2", "/redirect/1", "/image"])
+        self.assertEqual(self.connection_count(), 1)
+
+    def test_too_many_redirects(self):
+        with self.assertRaises(OSError):
+            self.client.get(self.base_url + f"/redirect/{HttpClient.MAX_REDIRECTS + 1}")
+
+    def test_error_status_is_returned(self):
+        status, _, _ = self.client.get(self.base_url + "/missing")
+        self.assertEqual(status, 404)
+
+    def test_retries_when_reused_connection_is_stale(self):
+        self.client.get(self.base_url + "/image")
+        self.drop_connections()
+
+        status, _, body = self.client.get(self.base_url + "/image")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, IMAGE)
+        self.assertEqual(self.connection_count(), 2)
+        self.assertEqual(self.client.dead_hosts, {})
+
+    def test_connection_close_response_drops_connection(self):
+        self.client.get(self.base_url + "/close")
+        self.assertEqual(self.client.connections, {})
+
+        self.client.get(self.base_url + "/image")
+        self.assertEqual(self.connection_count(), 2)
+
+    def test_unreachable_host_is_marked_dead(self):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        url = f"http://127.0.0.1:{port}/image"
+        with self.assertRaises(OSError):
+            self.client.get(url)
+        self.assertIn(("http", f"127.0.0.1:{port}"), self.client.dead_hosts)
+
+
+class ImageDownloaderTest(HttpServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.downloader = ImageDownloader(workers=1, timeout=5)
+        self.addCleanup(self.downloader.shutdown)
+
+    def download(self, path):
+        """Загрузить path через планировщик, дождаться callback"""
+        done = threading.Event()
+        results = []
+
+        def callback(key, result, error):
+            results.append((result, error))
+            done.set()
+
+        self.downloader.submit(path, lambda client: client.get(self.base_url + path), callback)
+        self.assertTrue(done.wait(5))
+        result, error = results[0]
+        self.assertIsNone(error)
+        return result
+
+    def test_worker_reuses_connection(self):
+        for _ in range(3):
+            status, _, body = self.download("/image")
+            self.assertEqual((status, body), (200, IMAGE))
+        self.assertEqual(self.connection_count(), 1)
+
+    def test_worker_follows_redirect_and_retries_stale_connection(self):
+        self.assertEqual(self.download("/redirect/1")[2], IMAGE)
+        self.drop_connections()
+        self.assertEqual(self.download("/image")[2], IMAGE)
+        self.assertEqual(self.connection_count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""LazyTableModel: догрузка страниц, сверка при reload и повторы id.
+
+Модель проверяется QAbstractItemModelTester, который падает при любом
+нарушении контракта QAbstractItemModel. Запросы не выполняются - executor
+подменён заглушкой, страницы передаются в модель напрямую.
+
+    python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QPersistentModelIndex  # noqa: E402
+from PyQt5.QtTest import QAbstractItemModelTester  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from clientapp import LazyTableModel, format_value  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+
+class _Executor:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, key, fn, *args, on_result=None, **kwargs):
+        self.submitted.append((key, args, kwargs, on_result))
+
+    def cancel(self, key):
+        pass
+
+    def is_busy(self, key=None):
+        return False
+
+
+class LazyTableModelTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = _Executor()
+        self.model = LazyTableModel([('ID', 0, format_value), ('Название', 1, format_value)],
+                                    self.executor, None, "rows")
+        self.tester = QAbstractItemModelTester(
+            self.model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+
+    def rows(self):
+        return [self.model.row_values(row) for row in range(self.model.rowCount())]
+
+    def test_first_page_and_append(self):
+        self.model.set_page(([(1, 'a'), (2, 'b')], (2,)))
+        self.model.append_page(([(3, 'c')], None))
+        self.assertEqual(self.rows(), [(1, 'a'), (2, 'b'), (3, 'c')])
+        self.assertEqual(self.model.keys(), {1, 2, 3})
+        self.assertFalse(self.model.canFetchMore())
+
+    def test_duplicate_ids_are_dropped_on_reconcile(self):
+        self.model.set_page(([(1, 'a'), (2, 'b')], None))
+        self.model.set_page(([(1, 'a'), (2, 'b'), (2, 'b2')], None))
+        self.assertEqual(self.rows(), [(1, 'a'), (2, 'b')])
+
+        self.model.set_page(([(3, 'c'), (2, 'b3'), (3, 'c2'), (1, 'a')], None))
+        self.assertEqual(self.rows(), [(3, 'c'), (2, 'b3'), (1, 'a')])
+
+    def test_duplicate_ids_are_dropped_on_first_page_and_append(self):
+        self.model.set_page(([(1, 'a'), (1, 'a2'), (2, 'b')], (2,)))
+        self.model.append_page(([(2, 'b2'), (3, 'c'), (3, 'c2')], None))
+        self.assertEqual(self.rows(), [(1, 'a'), (2, 'b'), (3, 'c')])
+
+        # Следующая сверка видит строки ровно по одной на id
+        self.model.set_page(([(3, 'c'), (1, 'a')], None))
+        self.assertEqual(self.rows(), [(3, 'c'), (1, 'a')])
+        self.assertEqual(self.model.keys(), {1, 3})
+
+    def test_reload_requests_loaded_row_count(self):
+        self.model.set_page(([(row, str(row)) for row in range(5)], (4,)))
+        self.model.reload()
+        key, args, kwargs, _ = self.executor.submitted[-1]
+        self.assertEqual((key, args, kwargs), ("rows", (None,), {'limit': 5}))
+
+    def test_reconcile_keeps_rows_by_id(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            old = [(key, f"v{key}") for key in rng.sample(range(40), rng.randint(1, 20))]
+            self.model.set_page(([], None))
+            self.model.set_page((old, None))
+            persistent = {key: QPersistentModelIndex(self.model.index(row, 1))
+                          for row, (key, _) in enumerate(old)}
+
+            new = [(key, f"w{key}" if rng.random() < 0.3 else f"v{key}")
+                   for key in rng.sample(range(40), rng.randint(0, 20))]
+            self.model.set_page((new, None))
+            self.assertEqual(self.rows(), new)
+            for key, index in persistent.items():
+                if key in dict(new):
+                    self.assertEqual(self.model.row_values(index.row())[0], key)
+                else:
+                    self.assertFalse(index.isValid())
+
+    def test_update_rows_replaces_and_removes(self):
+        self.model.set_page(([(1, 'a'), (2, 'b'), (3, 'c')], None))
+        self.model.update_rows({2, 3}, [(2, 'b2')])
+        self.assertEqual(self.rows(), [(1, 'a'), (2, 'b2')])
+        self.assertEqual(self.model.keys(), {1, 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
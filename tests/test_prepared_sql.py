@@ -0,0 +1,42 @@
+"""to_prepared_sql: перевод плейсхолдеров psycopg2 в $1..$n для PREPARE.
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clientapp import to_prepared_sql  # noqa: E402
+
+
+class ToPreparedSqlTest(unittest.TestCase):
+    def test_without_params(self):
+        self.assertEqual(to_prepared_sql("SELECT 1"), ("SELECT 1", []))
+
+    def test_positional_params_are_numbered_in_order(self):
+        text, names = to_prepared_sql("SELECT * FROM products WHERE category_id = %s AND price < %s")
+        self.assertEqual(text, "SELECT * FROM products WHERE category_id = $1 AND price < $2")
+        self.assertEqual(names, [None, None])
+
+    def test_named_params_reuse_their_number(self):
+        text, names = to_prepared_sql(
+            "SELECT %(id)s, %(name)s WHERE product_id = %(id)s OR name ILIKE %(name)s")
+        self.assertEqual(text, "SELECT $1, $2 WHERE product_id = $1 OR name ILIKE $2")
+        self.assertEqual(names, ['id', 'name'])
+
+    def test_escaped_percent_becomes_literal(self):
+        text, names = to_prepared_sql("SELECT name ILIKE '%%' || %s || '%%'")
+        self.assertEqual(text, "SELECT name ILIKE '%' || $1 || '%'")
+        self.assertEqual(names, [None])
+
+    def test_escaped_percent_before_placeholder_text(self):
+        # '%%s' - экранированный процент и буква s, а не плейсхолдер
+        text, names = to_prepared_sql("SELECT '%%s', %(id)s")
+        self.assertEqual(text, "SELECT '%s', $1")
+        self.assertEqual(names, ['id'])
+
+
+if __name__ == "__main__":
+    unittest.main()
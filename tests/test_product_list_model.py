@@ -0,0 +1,131 @@
+"""ProductListModel: сверка перезагрузок каталога по product_id.
+
+Модель проверяется QAbstractItemModelTester. Кэш изображений и планировщик
+загрузок подменены заглушками, сеть не нужна.
+
+    python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+from decimal import Decimal
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QPersistentModelIndex, Qt  # noqa: E402
+from PyQt5.QtTest import QAbstractItemModelTester  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from clientapp import ImageLoadedEvent, ProductListModel  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+
+def product(product_id, name=None, image=True):
+    return (product_id, name or f"Товар {product_id}", "", Decimal("10.00"), "Телефоны", 5,
+            f"http://img/{product_id}.png" if image else None)
+
+
+class _ImageCache:
+    def cached(self, image_url, size):
+        return None
+
+
+class _Downloader:
+    def __init__(self):
+        self.submitted = []
+        self.cancelled = []
+
+    def submit(self, key, fn, callback, priority=0):
+        self.submitted.append(key[0])
+
+    def cancel(self, key, callback=None):
+        self.cancelled.append(key[0])
+
+    def set_priority(self, key, priority):
+        pass
+
+
+class ProductListModelTest(unittest.TestCase):
+    def setUp(self):
+        self.downloader = _Downloader()
+        self.model = ProductListModel(image_cache=_ImageCache(), downloader=self.downloader)
+        self.tester = QAbstractItemModelTester(
+            self.model, QAbstractItemModelTester.FailureReportingMode.Fatal)
+
+    def ids(self):
+        return [item[0] for item in self.model.products]
+
+    def deliver(self, product_id, image="готово"):
+        self.model.customEvent(ImageLoadedEvent(f"http://img/{product_id}.png", image))
+
+    def test_reconcile_keeps_rows_by_id(self):
+        rng = random.Random(11)
+        for _ in range(200):
+            old = [product(key) for key in rng.sample(range(40), rng.randint(1, 20))]
+            self.model.set_products([])
+            self.model.set_products(old)
+            persistent = {item[0]: QPersistentModelIndex(self.model.index(row))
+                          for row, item in enumerate(old)}
+
+            new = [product(key, f"Новый {key}" if rng.random() < 0.3 else None)
+                   for key in rng.sample(range(40), rng.randint(0, 20))]
+            self.model.set_products(new)
+            self.assertEqual(self.model.products, new)
+            new_ids = {item[0] for item in new}
+            for key, index in persistent.items():
+                if key in new_ids:
+                    self.assertEqual(self.model.products[index.row()][0], key)
+                else:
+                    self.assertFalse(index.isValid())
+
+    def test_changed_product_emits_data_changed(self):
+        self.model.set_products([product(1), product(2)])
+        changed = []
+        self.model.dataChanged.connect(lambda first, last, roles=(): changed.append(first.row()))
+        self.model.set_products([product(1), product(2, "Новое имя")])
+        self.assertEqual(changed, [1])
+        self.assertEqual(self.model.data(self.model.index(1)), "Новое имя")
+
+    def test_duplicate_ids_are_shown_once(self):
+        self.model.set_products([product(1), product(2), product(1, "повтор")])
+        self.assertEqual(self.ids(), [1, 2])
+
+        # Повтор, пришедший со следующей страницей, убирается при сверке
+        self.model.append_products([product(3), product(2, "повтор")])
+        self.model.set_products([product(3), product(2), product(1)])
+        self.assertEqual(self.ids(), [3, 2, 1])
+
+    def test_images_survive_reconcile_and_removed_downloads_are_cancelled(self):
+        self.model.set_products([product(1), product(2), product(3)])
+        for row in range(3):
+            self.model.request_image(row)
+        self.assertEqual(len(self.downloader.submitted), 3)
+        self.deliver(1)
+
+        self.model.set_products([product(3), product(1)])
+        self.assertEqual(self.downloader.cancelled, ["http://img/2.png"])
+        self.assertEqual(self.model.data(self.model.index(1), Qt.DecorationRole), "готово")
+
+        # Изображение, загруженное после перестановки, попадает в новую строку
+        self.deliver(3)
+        self.assertEqual(self.model.data(self.model.index(0), Qt.DecorationRole), "готово")
+        self.model.request_image(1)
+        self.assertEqual(len(self.downloader.submitted), 3)
+
+    def test_update_products_replaces_and_removes(self):
+        self.model.set_products([product(1), product(2), product(3), product(4)])
+        self.model.request_image(3)
+        self.model.update_products({1, 2}, [product(2, "Новое имя")])
+        self.assertEqual(self.ids(), [2, 3, 4])
+        self.assertEqual(self.model.products[0][1], "Новое имя")
+
+        # Строки изображений пересчитаны после удаления
+        self.deliver(4)
+        self.assertEqual(self.model.data(self.model.index(2), Qt.DecorationRole), "готово")
+
+
+if __name__ == "__main__":
+    unittest.main()